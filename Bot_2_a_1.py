@@ -1,19 +1,46 @@
 import config
 import time
-from pybit.unified_trading import HTTP
-from decimal import Decimal, ROUND_DOWN, ROUND_FLOOR
+from pybit.exceptions import InvalidRequestError
+from decimal import Decimal
+from grilla_precios import redondear_sl
+from cliente_bybit import ClienteBybit, crear_http
+from metricas import medir, observar, exportar_prometheus
+from actores import PlanificadorActores
+from reglas import (
+    calcular_monto_operacion,
+    calcular_precio_proteccion_1a1,
+    calcular_precio_sl_inicial,
+    calcular_precio_sl_1a1,
+    evaluar_proteccion,
+)
 import threading
+import heapq
+import asyncio
+import sqlite3
+import queue
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import telebot
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime, timedelta
 
 # ===== CONFIGURACIÓN =====
-session = HTTP(
-    testnet=False,
-    api_key=config.api_key,
-    api_secret=config.api_secret,
-    recv_window=20000  # Aumentado a 20000ms para manejar diferencias de timestamp
-)
+# Simulador local de Bybit para pruebas de carga sin dinero real (config.simulador_bybit = True)
+modo_simulador = getattr(config, "simulador_bybit", False)
+
+# Sesión con token buckets por endpoint, prioridad para órdenes/SL y reintentos de lecturas
+if modo_simulador:
+    from simulador_bybit import SimuladorBybit
+    session = ClienteBybit(SimuladorBybit(**getattr(config, "simulador_opciones", {})))
+else:
+    # Sin reintentos de pybit (los hace ClienteBybit) y con las cabeceras X-Bapi-Limit-* en cada respuesta
+    session = ClienteBybit(crear_http(
+        testnet=False,
+        api_key=config.api_key,
+        api_secret=config.api_secret,
+        recv_window=20000,  # Aumentado a 20000ms para manejar diferencias de timestamp
+    ))
 
 # PARAMETROS PARA OPERAR
 monto_base_usdt = Decimal(100)  # Monto base en USDT
@@ -24,38 +51,455 @@ margen_extra_sl = Decimal(0.5)  # Margen extra de 0.5% para alejar el SL
 # Diccionarios de control
 posiciones_con_stop = {}  # {symbol: True/False} - Si ya se activó protección 1:1
 tracking_posiciones = {}  # {symbol: {"precio_maximo": Decimal, "precio_entrada": Decimal, "side": str, "distancia_sl": Decimal}}
-monedas_operadas = {}  # {symbol: timestamp_operacion}
 cooldown_minutos = 60
+cooldown_minutos_por_symbol = {}  # {symbol: minutos} - Sobrescribe cooldown_minutos para monedas concretas
+
+# Persistencia del estado anterior (journal SQLite en modo WAL)
+ESTADO_DB_FILE = "bot_2a1_simulador.db" if modo_simulador else "bot_2a1_estado.db"
+journal_cola = queue.SimpleQueue()  # (sql, parametros) pendientes de escribir
+
+# Registro de instrumentos (tick size, qty step, price scale y status por symbol)
+instrumentos = {}  # {symbol: {"tick_size": Decimal, "qty_step": Decimal, "price_scale": int, "status": str}}
+instrumentos_lock = threading.Lock()
+instrumentos_actualizados = None  # time.monotonic() de la última carga completa
+ttl_instrumentos_segundos = 600  # Refrescar el registro cada 10 minutos
+instrumentos_inexistentes = {}  # {symbol: time.monotonic()} de consultas sin resultado (cache negativo)
+ttl_inexistentes_segundos = 60  # Un symbol desconocido se vuelve a consultar pasado este tiempo
+
+# Protección progresiva por WebSocket (el bucle REST queda como respaldo)
+usar_websocket_proteccion = not modo_simulador  # El simulador no tiene streams
+tickers_suscritos = set()
+tickers_lock = threading.Lock()
+ws_publico = None
+ws_privado = None
+
+# Libro local de posiciones abiertas (stream de posiciones o snapshot REST)
+libro_posiciones = {}  # {symbol: {"symbol": str, "side": str, "size": str, "avgPrice": str}}
+libro_actualizado = None  # time.monotonic() del último snapshot o evento
+libro_cambios = {}  # {symbol: time.monotonic()} de aperturas, eventos y cierres aún no cubiertos por un snapshot
+libro_lock = threading.Lock()
+max_antiguedad_libro_segundos = 10  # Si el libro es más viejo y no hay stream, se consulta REST
+
+# Confirmación de fills de las órdenes de entrada
+ordenes_ejecutadas = OrderedDict()  # {orderId: (avgPrice, time.monotonic())} - Llenado por el stream de órdenes
+retencion_ordenes_segundos = 60  # Fills que nadie reclamó (órdenes manuales, entradas que ya se confirmaron por REST)
+ordenes_condicion = threading.Condition()
+timeout_fill_segundos = 5
+
+# Ledger de PnL cerrado: cada consulta vuelve a pedir unos segundos antes del último updatedTime
+# (cierres que Bybit indexa con retraso); los repetidos los descarta INSERT OR IGNORE
+solape_pnl_segundos = 5
+intervalo_pnl_segundos = 10
+
+# True: el SL se envía dentro de place_order (1 paso). False: place_order + set_trading_stop (2 pasos)
+entrada_con_sl_adjunto = True
+
+# Cola de señales (el endpoint /signal responde al instante con un ticket)
+cola_senales = queue.Queue(maxsize=100)
+trabajadores_senales = 1  # Hilos que reparten las señales de la cola a los actores
+tickets_senales = OrderedDict()  # {ticket: {"estado": str, "status": str, "message": str, ...}}
+max_tickets_guardados = 1000
+tickets_lock = threading.Lock()
+
+# Un actor por symbol (precios, señales y cierres en orden) sobre un pool compartido
+hilos_actores = 16  # Máximo de actores trabajando a la vez (y de llamadas simultáneas a Bybit)
+planificador = PlanificadorActores(hilos_actores)
+# Señales entregadas a los actores y sin terminar: el resto espera en cola_senales (acotada, 503 si se llena).
+# Una señal ocupa un hilo del pool durante los chequeos, la orden y esperar_fill (hasta timeout_fill_segundos):
+# con un tope muy por debajo de hilos_actores la protección de las posiciones abiertas siempre tiene hilos libres
+max_senales_en_proceso = 4
+cupos_senales = threading.BoundedSemaphore(max_senales_en_proceso)
+senales_en_proceso = 0
+aperturas_en_curso = 0  # Cupos de Numero_de_posiciones reservados por aperturas sin terminar
+cupos_lock = threading.Lock()
+
+# Chequeos pre-trade en paralelo: un hilo por chequeo para cada señal en proceso, así ninguna
+# señal espera a que otra libere el pool antes de empezar sus chequeos
+chequeos_por_senal = 4  # symbol, posiciones abiertas, posición actual y último precio
+pool_pretrade = ThreadPoolExecutor(max_workers=max_senales_en_proceso * chequeos_por_senal,
+                                   thread_name_prefix="pretrade")
+ultimos_tiempos_pretrade = {}  # {chequeo: ms} - De la última señal procesada
+senales_procesadas = 0
+espera_total_ms = 0.0
+espera_max_ms = 0.0
 
 # Telegram
 bot_token = config.token_telegram
-bot = telebot.TeleBot(bot_token)
+bot = None if modo_simulador else telebot.TeleBot(bot_token)  # Con el simulador no se envía nada a Telegram
 chat_id = config.chat_id
 
-# Flask API
+# Bandeja de salida de Telegram (un hilo emisor, el trading solo encola)
+telegram_pendientes = OrderedDict()  # {clave: (chat_id, mensaje)}
+telegram_condicion = threading.Condition()
+telegram_secuencia = 0
+max_telegram_pendientes = 500
+intervalo_telegram_segundos = 1.0  # Telegram admite ~1 mensaje por segundo por chat
+reintentos_telegram = 5
+
+# API HTTP: "flask" (servidor de desarrollo) o "async" (aiohttp, requiere pip install aiohttp)
+modo_servidor = "flask"
+puerto_api = 5000
 app = Flask(__name__)
 
 # ===== FUNCIONES DE TELEGRAM =====
-def enviar_mensaje_telegram(chat_id, mensaje):
+def enviar_mensaje_telegram(chat_id, mensaje, clave=None):
+    """
+    Encola el mensaje para el hilo emisor sin bloquear al trading.
+    Los mensajes con la misma clave que aún no se enviaron se reemplazan por el más reciente.
+    """
+    global telegram_secuencia
+    with telegram_condicion:
+        if clave is None:
+            telegram_secuencia += 1
+            clave = telegram_secuencia
+        if clave not in telegram_pendientes and len(telegram_pendientes) >= max_telegram_pendientes:
+            telegram_pendientes.popitem(last=False)
+            print("⚠️ Cola de Telegram llena, se descartó el mensaje más antiguo")
+        telegram_pendientes[clave] = (chat_id, mensaje)
+        telegram_condicion.notify()
+
+def emisor_telegram():
+    """Envía los mensajes encolados respetando el límite por chat y reintentando con backoff"""
+    ultimo_envio = {}  # {chat_id: time.monotonic()}
+    while True:
+        with telegram_condicion:
+            while not telegram_pendientes:
+                telegram_condicion.wait()
+            if modo_simulador:
+                telegram_pendientes.clear()
+                continue
+            destino = next(iter(telegram_pendientes.values()))[0]
+
+        # Esperar el intervalo del chat antes de sacar el mensaje, así se siguen fusionando ráfagas
+        espera = intervalo_telegram_segundos - (time.monotonic() - ultimo_envio.get(destino, float("-inf")))
+        if espera > 0:
+            time.sleep(espera)
+
+        with telegram_condicion:
+            _, (destino, mensaje) = telegram_pendientes.popitem(last=False)
+
+        for intento in range(reintentos_telegram):
+            try:
+                bot.send_message(destino, mensaje, parse_mode='HTML')
+                break
+            except telebot.apihelper.ApiTelegramException as e:
+                if e.error_code == 429:
+                    retry_after = e.result_json.get("parameters", {}).get("retry_after", 2 ** intento)
+                    time.sleep(retry_after)
+                else:
+                    print(f"No se pudo enviar el mensaje a Telegram: {e}")
+                    break
+            except Exception as e:
+                print(f"No se pudo enviar el mensaje a Telegram (intento {intento + 1}): {e}")
+                time.sleep(2 ** intento)
+        ultimo_envio[destino] = time.monotonic()
+
+# ===== PERSISTENCIA DE ESTADO =====
+def init_estado_db():
+    """Crea la base de datos de estado (SQLite en modo WAL)"""
+    conn = sqlite3.connect(ESTADO_DB_FILE)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tracking_posiciones (
+            symbol TEXT PRIMARY KEY,
+            precio_maximo TEXT NOT NULL,
+            precio_entrada TEXT NOT NULL,
+            side TEXT NOT NULL,
+            distancia_sl TEXT
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS posiciones_con_stop (symbol TEXT PRIMARY KEY)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS monedas_operadas (
+            symbol TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pnl_cerrado (
+            order_id TEXT PRIMARY KEY,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,
+            closed_pnl TEXT NOT NULL,
+            avg_entry_price TEXT,
+            avg_exit_price TEXT,
+            created_time INTEGER NOT NULL,
+            updated_time INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pnl_cerrado_updated ON pnl_cerrado (updated_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pnl_cerrado_symbol ON pnl_cerrado (symbol, updated_time)")
+    conn.commit()
+    conn.close()
+
+def registrar_tracking(symbol):
+    """Encola el estado actual de tracking_posiciones[symbol] para el journal"""
+    info = tracking_posiciones.get(symbol)
+    if info is None:
+        return
+    distancia_sl = info.get("distancia_sl")
+    journal_cola.put((
+        "INSERT OR REPLACE INTO tracking_posiciones VALUES (?, ?, ?, ?, ?)",
+        (symbol, str(info["precio_maximo"]), str(info["precio_entrada"]), info["side"],
+         str(distancia_sl) if distancia_sl is not None else None),
+    ))
+
+def registrar_proteccion(symbol):
+    journal_cola.put(("INSERT OR REPLACE INTO posiciones_con_stop VALUES (?)", (symbol,)))
+
+def registrar_cooldown(symbol, momento_operacion):
+    journal_cola.put((
+        "INSERT OR REPLACE INTO monedas_operadas VALUES (?, ?)",
+        (symbol, momento_operacion.isoformat()),
+    ))
+
+def borrar_cooldown(symbol):
+    journal_cola.put(("DELETE FROM monedas_operadas WHERE symbol=?", (symbol,)))
+
+def borrar_estado_posicion(symbol):
+    """Elimina del estado (memoria y journal) el tracking y la protección de una posición cerrada"""
+    posiciones_con_stop.pop(symbol, None)
+    tracking_posiciones.pop(symbol, None)
+    journal_cola.put(("DELETE FROM posiciones_con_stop WHERE symbol=?", (symbol,)))
+    journal_cola.put(("DELETE FROM tracking_posiciones WHERE symbol=?", (symbol,)))
+
+def escribir_journal():
+    """Escribe en SQLite los cambios de estado encolados, agrupados en una transacción por lote"""
+    conn = sqlite3.connect(ESTADO_DB_FILE, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    while True:
+        lote = [journal_cola.get()]
+        while not journal_cola.empty():
+            lote.append(journal_cola.get())
+        try:
+            with conn:
+                for sql, parametros in lote:
+                    conn.execute(sql, parametros)
+        except Exception as e:
+            print(f"❌ Error al escribir el journal de estado: {e}")
+
+def restaurar_estado():
+    """
+    Restaura tracking_posiciones, posiciones_con_stop y monedas_operadas desde la base de datos
+    y los concilia con un único snapshot de get_positions
+    """
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(ESTADO_DB_FILE)
+    for symbol, precio_maximo, precio_entrada, side, distancia_sl in conn.execute("SELECT * FROM tracking_posiciones"):
+        tracking_posiciones[symbol] = {
+            "precio_maximo": Decimal(precio_maximo),
+            "precio_entrada": Decimal(precio_entrada),
+            "side": side,
+        }
+        if distancia_sl is not None:
+            tracking_posiciones[symbol]["distancia_sl"] = Decimal(distancia_sl)
+    for (symbol,) in conn.execute("SELECT symbol FROM posiciones_con_stop"):
+        posiciones_con_stop[symbol] = True
+    for symbol, timestamp in conn.execute("SELECT symbol, timestamp FROM monedas_operadas"):
+        if not monedas_operadas.registrar(symbol, datetime.fromisoformat(timestamp)):
+            borrar_cooldown(symbol)
+    conn.close()
+
+    # Conciliar con las posiciones realmente abiertas en Bybit
+    pedido_en = time.monotonic()
     try:
-        bot.send_message(chat_id, mensaje, parse_mode='HTML')
+        posiciones = session.get_positions(category="linear", settleCoin="USDT")
+        error = posiciones if posiciones["retCode"] != 0 else None
     except Exception as e:
-        print(f"No se pudo enviar el mensaje a Telegram: {e}")
+        error = e
+    if error is not None:
+        # Sin snapshot válido no se borra nada: el estado queda como estaba y el libro se carga después
+        print(f"⚠️ Estado restaurado sin conciliar, error en get_positions: {error}")
+        return
+    actualizar_libro_snapshot(posiciones["result"]["list"], pedido_en)
+    abiertas = {
+        posicion["symbol"]: posicion for posicion in posiciones["result"]["list"]
+        if Decimal(posicion["size"]) != 0
+    }
+    for symbol in set(tracking_posiciones) | set(posiciones_con_stop):
+        posicion = abiertas.get(symbol)
+        info = tracking_posiciones.get(symbol)
+        if posicion is None or (info is not None and info["side"] != posicion["side"]):
+            borrar_estado_posicion(symbol)
+
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    print(
+        f"💾 Estado restaurado en {duracion_ms:.1f} ms: {len(tracking_posiciones)} posiciones, "
+        f"{len(posiciones_con_stop)} con protección 1:1, {len(monedas_operadas)} en cooldown"
+    )
+
+# ===== REGISTRO DE INSTRUMENTOS =====
+def _parsear_instrumento(info):
+    """Extrae de la respuesta de Bybit los datos que usa el bot"""
+    return {
+        "tick_size": Decimal(info['priceFilter']['tickSize']),
+        "qty_step": Decimal(info['lotSizeFilter']['qtyStep']),
+        "price_scale": int(info['priceScale']),
+        "status": info['status'],
+    }
+
+def cargar_instrumentos():
+    """Carga todo el universo linear de Bybit (paginado) en el registro de instrumentos"""
+    global instrumentos_actualizados
+    nuevos = {}
+    cursor = ""
+    while True:
+        response = session.get_instruments_info(category="linear", limit=1000, cursor=cursor)
+        if response['retCode'] != 0:
+            raise Exception(f"Error al cargar instrumentos: {response}")
+        for info in response['result']['list']:
+            nuevos[info['symbol']] = _parsear_instrumento(info)
+        cursor = response['result'].get('nextPageCursor', "")
+        if not cursor:
+            break
+
+    with instrumentos_lock:
+        instrumentos.clear()
+        instrumentos.update(nuevos)
+        instrumentos_inexistentes.clear()
+        instrumentos_actualizados = time.monotonic()
+    print(f"📚 Registro de instrumentos cargado: {len(nuevos)} símbolos")
+    return len(nuevos)
+
+def refrescar_instrumentos():
+    """Recarga el registro de instrumentos cada ttl_instrumentos_segundos"""
+    while True:
+        time.sleep(ttl_instrumentos_segundos)
+        try:
+            cargar_instrumentos()
+        except Exception as e:
+            print(f"❌ Error al refrescar instrumentos: {e}")
+
+def obtener_instrumento(symbol):
+    """Devuelve los datos del instrumento desde el registro (consulta a Bybit solo si no está)"""
+    with instrumentos_lock:
+        instrumento = instrumentos.get(symbol)
+        consultado = instrumentos_inexistentes.get(symbol)
+    if instrumento is not None:
+        return instrumento
+    if consultado is not None and time.monotonic() - consultado < ttl_inexistentes_segundos:
+        return None
+
+    # Símbolo nuevo o registro aún sin cargar: consulta puntual y se guarda
+    try:
+        response = session.get_instruments_info(category="linear", symbol=symbol)
+    except InvalidRequestError as e:
+        # Bybit respondió con error (p. ej. symbol inválido): cuenta como desconocido. Los errores de red siguen
+        response = {"retCode": e.status_code, "result": {"list": []}}
+    if response['retCode'] != 0 or len(response['result']['list']) == 0:
+        # Desconocido o deslistado: no se vuelve a consultar en cada señal hasta que venza el TTL
+        with instrumentos_lock:
+            instrumentos_inexistentes[symbol] = time.monotonic()
+        return None
+    instrumento = _parsear_instrumento(response['result']['list'][0])
+    with instrumentos_lock:
+        instrumentos[symbol] = instrumento
+    return instrumento
 
 # ===== FUNCIONES DE BYBIT =====
 def verificar_symbol_en_bybit(symbol):
     """Verifica si el symbol existe en Bybit futuros"""
     try:
-        response = session.get_instruments_info(category="linear", symbol=symbol)
-        if response['retCode'] == 0 and len(response['result']['list']) > 0:
+        instrumento = obtener_instrumento(symbol)
+        if instrumento is not None and instrumento["status"] == "Trading":
             return True
         return False
     except Exception as e:
         print(f"Error al verificar symbol {symbol}: {e}")
         return False
 
-def get_current_position(symbol):
+# ===== LIBRO DE POSICIONES =====
+def _posicion_libro(posicion):
+    """Normaliza una posición (REST o stream) al formato de get_positions"""
+    return {
+        "symbol": posicion["symbol"],
+        "side": posicion["side"],
+        "size": posicion["size"],
+        "avgPrice": posicion.get("avgPrice") or posicion["entryPrice"],
+    }
+
+def actualizar_libro_snapshot(posiciones, pedido_en=None):
+    """
+    Reemplaza el libro con un snapshot completo de get_positions(settleCoin="USDT").
+    pedido_en es el time.monotonic() de antes de pedirlo: los symbols que cambiaron después
+    (aperturas, eventos del stream, cierres) conservan su estado local, más nuevo que el snapshot.
+    """
+    global libro_actualizado
+    abiertas = {
+        posicion["symbol"]: _posicion_libro(posicion)
+        for posicion in posiciones if Decimal(posicion["size"]) != 0
+    }
+    with libro_lock:
+        if pedido_en is not None:
+            for symbol, momento in list(libro_cambios.items()):
+                if momento < pedido_en:
+                    del libro_cambios[symbol]  # El snapshot ya lo incluye
+                elif symbol in libro_posiciones:
+                    abiertas[symbol] = libro_posiciones[symbol]
+                else:
+                    abiertas.pop(symbol, None)
+        cerradas = set(libro_posiciones) - set(abiertas)
+        libro_posiciones.clear()
+        libro_posiciones.update(abiertas)
+        libro_actualizado = time.monotonic()
+    for symbol in cerradas:
+        planificador.actor(symbol).enviar(al_cerrar_en_libro, symbol)
+
+def actualizar_libro_posicion(posicion):
+    """Aplica al libro un cambio de una posición (apertura propia o evento del stream)"""
+    global libro_actualizado
+    symbol = posicion["symbol"]
+    cerrada = False
+    with libro_lock:
+        if Decimal(posicion["size"]) == 0:
+            cerrada = libro_posiciones.pop(symbol, None) is not None
+        else:
+            libro_posiciones[symbol] = _posicion_libro(posicion)
+        libro_actualizado = libro_cambios[symbol] = time.monotonic()
+    if cerrada:
+        planificador.actor(symbol).enviar(al_cerrar_en_libro, symbol)
+
+def al_cerrar_en_libro(symbol):
+    """
+    Mensaje del actor cuando el libro ve la posición en tamaño 0 (stream o snapshot): recién entonces
+    se dan de baja su protección y su ticker. Va por el actor, así un precio viejo encolado antes
+    no vuelve a crear el tracking después
+    """
+    with libro_lock:
+        if symbol in libro_posiciones:
+            return  # Se volvió a abrir antes de que el mensaje llegara al actor
+    borrar_estado_posicion(symbol)
+    desuscribir_ticker_ws(symbol)
+
+def libro_fresco():
+    """El libro es válido si el stream privado está conectado o el último snapshot es reciente"""
+    if ws_privado is not None and ws_privado.is_connected():
+        return True
+    return libro_actualizado is not None and time.monotonic() - libro_actualizado <= max_antiguedad_libro_segundos
+
+def refrescar_libro():
+    """Carga el libro desde REST. Devuelve False si Bybit no respondió correctamente"""
+    pedido_en = time.monotonic()
     try:
+        response_positions = session.get_positions(category="linear", settleCoin="USDT")
+    except Exception as e:
+        print(f"Error al obtener las posiciones: {e}")
+        return False
+    if response_positions['retCode'] != 0:
+        print(f"Error al obtener las posiciones: {response_positions}")
+        return False
+    actualizar_libro_snapshot(response_positions['result']['list'], pedido_en)
+    return True
+
+# ===== FUNCIONES DE POSICIONES =====
+def get_current_position(symbol, usar_libro=True):
+    try:
+        if usar_libro and libro_fresco():
+            with libro_lock:
+                posicion = libro_posiciones.get(symbol)
+            return [dict(posicion)] if posicion else []
+
         response_positions = session.get_positions(category="linear", symbol=symbol)
         if response_positions['retCode'] == 0:
             return response_positions['result']['list']
@@ -68,28 +512,28 @@ def get_current_position(symbol):
 
 def get_open_positions_count():
     try:
-        response_positions = session.get_positions(category="linear", settleCoin="USDT")
-        if response_positions['retCode'] == 0:
-            positions = response_positions['result']['list']
-            open_positions = [position for position in positions if Decimal(position['size']) != 0]
-            return len(open_positions)
-        else:
-            print(f"Error al obtener el conteo de posiciones abiertas: {response_positions}")
+        if not libro_fresco() and not refrescar_libro():
             return 0
+        with libro_lock:
+            return len(libro_posiciones)
     except Exception as e:
         print(f"Error al obtener el conteo de posiciones abiertas: {e}")
         return 0
 
-def qty_step(symbol, amount_usdt):
+def obtener_ultimo_precio(symbol):
+    tickers = session.get_tickers(symbol=symbol, category="linear")
+    for ticker_data in tickers["result"]["list"]:
+        last_price = Decimal(ticker_data["lastPrice"])
+    return last_price
+
+def qty_step(symbol, amount_usdt, last_price=None):
     try:
-        tickers = session.get_tickers(symbol=symbol, category="linear")
-        for ticker_data in tickers["result"]["list"]:
-            last_price = float(ticker_data["lastPrice"])
+        if last_price is None:
+            last_price = obtener_ultimo_precio(symbol)
 
         last_price_decimal = Decimal(last_price)
 
-        step_info = session.get_instruments_info(category="linear", symbol=symbol)
-        qty_step = Decimal(step_info['result']['list'][0]['lotSizeFilter']['qtyStep'])
+        qty_step = obtener_instrumento(symbol)["qty_step"]
 
         base_asset_qty = amount_usdt / last_price_decimal
 
@@ -105,93 +549,146 @@ def qty_step(symbol, amount_usdt):
         print(f"Error al calcular la cantidad del activo base: {e}")
         return None
 
-def adjust_price(symbol, price):
+def adjust_price(symbol, price, side="Buy"):
+    """
+    Redondea un stop loss a la grilla de ticks del symbol, alejándolo del precio según el lado
+    de la posición. Devuelve el string exacto para enviar a Bybit.
+    """
     try:
-        instrument_info = session.get_instruments_info(category="linear", symbol=symbol)
-        tick_size = float(instrument_info['result']['list'][0]['priceFilter']['tickSize'])
-        price_scale = int(instrument_info['result']['list'][0]['priceScale'])
-
-        tick_dec = Decimal(f"{tick_size}")
-        precision = Decimal(f"{10**price_scale}")
-        price_decimal = Decimal(f"{price}")
-        adjusted_price = (price_decimal * precision) / precision
-        adjusted_price = (adjusted_price / tick_dec).quantize(Decimal('1'), rounding=ROUND_FLOOR) * tick_dec
-
-        return float(adjusted_price)
+        tick_size = obtener_instrumento(symbol)["tick_size"]
+        return redondear_sl(price, tick_size, side)
     except Exception as e:
         print(f"Error al ajustar el precio: {e}")
         return None
 
-# ===== CÁLCULO DE POSICIÓN 2 A 1 =====
-def calcular_monto_operacion(monto_base, distancia_sl_porcentaje):
+# ===== CONFIRMACIÓN DE FILL =====
+def on_orden_ws(message):
+    """Callback del stream privado de órdenes: registra las órdenes de entrada ejecutadas"""
+    try:
+        for orden in message.get("data", []):
+            # Solo interesan las entradas, no los SL disparados ni cierres
+            if orden.get("stopOrderType") or orden.get("reduceOnly"):
+                continue
+            if orden.get("orderStatus") == "Filled":
+                with ordenes_condicion:
+                    ahora = time.monotonic()
+                    ordenes_ejecutadas[orden["orderId"]] = (Decimal(orden["avgPrice"]), ahora)
+                    # El fill puede llegar antes de que esperar_fill conozca el orderId, así que se guardan
+                    # todos y se descartan los más viejos que la retención
+                    while next(iter(ordenes_ejecutadas.values()))[1] < ahora - retencion_ordenes_segundos:
+                        ordenes_ejecutadas.popitem(last=False)
+                    ordenes_condicion.notify_all()
+    except Exception as e:
+        print(f"❌ Error en stream de órdenes: {e}")
+
+def esperar_fill(symbol, order_id):
     """
-    Calcula el monto real de la operación para lograr el ratio 2:1
-    Ejemplo: Si monto_base = 100 USDT y SL = 1.5%, entonces operar con 66.67 USDT
-    Para que si pierde el 1.5%, pierda 1 USDT, pero si gana 3% (2x1.5%), gane 2 USDT
+    Espera a que la orden se ejecute y devuelve su precio medio.
+    Usa el stream de órdenes si está conectado y, en paralelo, consulta get_order_history
+    con backoff exponencial hasta timeout_fill_segundos. Devuelve None si no se confirma.
     """
-    monto_operacion = monto_base / Decimal(distancia_sl_porcentaje)
-    return monto_operacion
+    limite = time.monotonic() + timeout_fill_segundos
+    espera = 0.1
+    # Sin stream privado la primera consulta REST sale de inmediato: una orden a mercado suele estar ya ejecutada
+    primera = ws_privado is None or not ws_privado.is_connected()
+
+    while True:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            print(f"⚠️ No se confirmó el fill de {symbol} ({order_id}) en {timeout_fill_segundos}s")
+            return None
 
-def calcular_precio_proteccion_1a1(precio_entrada, distancia_sl_porcentaje, side):
+        # Stream de órdenes (si no hay WebSocket simplemente espera el backoff)
+        with ordenes_condicion:
+            if not primera:
+                ordenes_condicion.wait_for(lambda: order_id in ordenes_ejecutadas, timeout=min(espera, restante))
+            if order_id in ordenes_ejecutadas:
+                return ordenes_ejecutadas.pop(order_id)[0]
+        primera = False
+
+        # Consulta REST
+        try:
+            response = session.get_order_history(category="linear", symbol=symbol, orderId=order_id)
+            if response['retCode'] == 0 and response['result']['list']:
+                orden = response['result']['list'][0]
+                if orden['orderStatus'] in ("Filled", "PartiallyFilledCanceled") and Decimal(orden['cumExecQty']) > 0:
+                    with ordenes_condicion:
+                        ordenes_ejecutadas.pop(order_id, None)
+                    return Decimal(orden['avgPrice'])
+                if orden['orderStatus'] in ("Cancelled", "Rejected", "Deactivated"):
+                    print(f"❌ Orden {order_id} de {symbol} no ejecutada: {orden['orderStatus']}")
+                    return None
+        except Exception as e:
+            print(f"Error al consultar la orden {order_id}: {e}")
+
+        espera = min(espera * 2, 1.0)
+
+# ===== CHEQUEOS PRE-TRADE =====
+def validar_chequeo_pretrade(symbol, nombre, valor):
+    """Devuelve (status, mensaje) si el chequeo impide operar, o (None, None) si pasa"""
+    if nombre == "symbol_disponible" and not valor:
+        return "ignored", f"⚠️ {symbol} no está disponible en Bybit Futuros. Ignorando señal."
+    if nombre == "posiciones_abiertas" and valor >= Numero_de_posiciones:
+        mensaje_count = "⚠️ Se alcanzó el máximo de posiciones abiertas. No se abrirá una nueva posición."
+        enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje_count)
+        return "error", mensaje_count
+    if nombre == "posicion_actual" and valor and any(Decimal(position['size']) != 0 for position in valor):
+        return "error", f"Ya hay una posición abierta en {symbol}. No se abrirá otra posición."
+    return None, None
+
+def verificaciones_pretrade(symbol):
     """
-    Calcula el precio donde se debe colocar el SL en el precio de entrada (1 a 1)
-    Esto ocurre cuando el precio se mueve 2x la distancia del SL (2:1)
+    Ejecuta en paralelo los chequeos independientes previos a la orden y los evalúa en el orden
+    de chequeos, como la versión secuencial: el resultado es el del primero que falle en ese
+    orden, no el del que termine antes. Devuelve (snapshot, status, mensaje); status es None si
+    se puede operar.
     """
-    distancia_decimal = distancia_sl_porcentaje / Decimal(100)
+    global ultimos_tiempos_pretrade
+    chequeos = {
+        "symbol_disponible": lambda: verificar_symbol_en_bybit(symbol),
+        "posiciones_abiertas": get_open_positions_count,
+        "posicion_actual": lambda: get_current_position(symbol),
+        "ultimo_precio": lambda: obtener_ultimo_precio(symbol),
+    }
+
+    def medir_chequeo(nombre, funcion):
+        inicio = time.perf_counter()
+        valor = funcion()
+        duracion = time.perf_counter() - inicio
+        observar("bot_senal_etapa_segundos", duracion, etapa=nombre)
+        return nombre, valor, duracion * 1000
+
+    futuros = [pool_pretrade.submit(medir_chequeo, nombre, funcion) for nombre, funcion in chequeos.items()]
+    snapshot = {"tiempos_ms": {}}
+    status, mensaje = None, None
+    for futuro in futuros:
+        try:
+            nombre, valor, duracion_ms = futuro.result()
+        except Exception as e:
+            status, mensaje = "error", f"❌ Error en chequeo pre-trade de {symbol}: {e}"
+        else:
+            snapshot[nombre] = valor
+            snapshot["tiempos_ms"][nombre] = round(duracion_ms, 1)
+            status, mensaje = validar_chequeo_pretrade(symbol, nombre, valor)
 
-    if side == "Buy":
-        # Para Long: el precio debe subir 2x la distancia del SL
-        precio_objetivo_2a1 = precio_entrada * (Decimal(1) + (distancia_decimal * 2))
-        return precio_objetivo_2a1
-    elif side == "Sell":
-        # Para Short: el precio debe bajar 2x la distancia del SL
-        precio_objetivo_2a1 = precio_entrada * (Decimal(1) - (distancia_decimal * 2))
-        return precio_objetivo_2a1
+        if status is not None:
+            # Los chequeos siguientes que aún no empezaron se cancelan; los que están en curso se ignoran
+            for pendiente in futuros:
+                pendiente.cancel()
+            break
 
-    return None
+    ultimos_tiempos_pretrade = snapshot["tiempos_ms"]
+    print(f"⏱️ Chequeos pre-trade {symbol}: {snapshot['tiempos_ms']}")
+    return snapshot, status, mensaje
 
 # ===== APERTURA DE POSICIONES =====
-def abrir_posicion_long(symbol, monto_operacion, distancia_sl_porcentaje):
+def colocar_stop_loss(symbol, price_sl):
+    """Envía el stop loss de la posición. Devuelve True solo si Bybit lo aceptó"""
+    if price_sl is None:
+        print(f"❌ No se pudo calcular el SL de {symbol}")
+        return False
     try:
-        if get_open_positions_count() >= Numero_de_posiciones:
-            mensaje_count = "⚠️ Se alcanzó el máximo de posiciones abiertas. No se abrirá una nueva posición."
-            enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje_count)
-            print(mensaje_count)
-            return False
-
-        positions_list = get_current_position(symbol)
-        if positions_list and any(Decimal(position['size']) != 0 for position in positions_list):
-            print(f"Ya hay una posición abierta en {symbol}. No se abrirá otra posición.")
-            return False
-
-        # Calcular cantidad a operar
-        base_asset_qty_final = qty_step(symbol, monto_operacion)
-        if base_asset_qty_final is None:
-            return False
-
-        # Abrir posición a mercado
-        response_market_order = session.place_order(
-            category="linear",
-            symbol=symbol,
-            side="Buy",
-            orderType="Market",
-            qty=str(base_asset_qty_final),
-        )
-
-        time.sleep(3)
-        if response_market_order['retCode'] != 0:
-            print("❌ Error al abrir la posición: La orden de mercado no se completó correctamente.")
-            return False
-
-        # Obtener precio de entrada
-        positions_list = get_current_position(symbol)
-        current_price = Decimal(positions_list[0]['avgPrice'])
-
-        # Calcular y colocar stop loss
-        distancia_decimal = distancia_sl_porcentaje / Decimal(100)
-        price_sl = adjust_price(symbol, current_price * (Decimal(1) - distancia_decimal))
-
-        stop_loss_order = session.set_trading_stop(
+        response_sl = session.set_trading_stop(
             category="linear",
             symbol=symbol,
             stopLoss=str(price_sl),
@@ -199,114 +696,177 @@ def abrir_posicion_long(symbol, monto_operacion, distancia_sl_porcentaje):
             tpslMode="Full",
             slOrderType="Market",
         )
+    except InvalidRequestError as e:
+        # pybit lanza los retCode distintos de 0; 34040 (not modified) es que el SL ya estaba ahí
+        if e.status_code == 34040:
+            return True
+        print(f"❌ Bybit rechazó el SL {price_sl} de {symbol}: {e.message} (retCode {e.status_code})")
+        return False
+    except Exception as e:
+        print(f"❌ Error al enviar el SL {price_sl} de {symbol}: {e}")
+        return False
+    if response_sl['retCode'] not in (0, 34040):
+        print(f"❌ Bybit rechazó el SL {price_sl} de {symbol}: {response_sl['retMsg']}")
+        return False
+    return True
 
-        # Calcular precio objetivo para protección 1 a 1
-        precio_proteccion = calcular_precio_proteccion_1a1(current_price, distancia_sl_porcentaje, "Buy")
-
-        # Inicializar tracking de la posición
-        tracking_posiciones[symbol] = {
-            "precio_maximo": current_price,
-            "precio_entrada": current_price,
-            "side": "Buy",
-            "distancia_sl": distancia_sl_porcentaje
-        }
+def cerrar_posicion_sin_sl(symbol, side, qty, motivo):
+    """Cierra a mercado una posición recién abierta que quedó sin stop loss y avisa por Telegram"""
+    try:
+        response_cierre = session.place_order(
+            category="linear",
+            symbol=symbol,
+            side="Sell" if side == "Buy" else "Buy",
+            orderType="Market",
+            qty=str(qty),
+            reduceOnly=True,
+        )
+        cerrada = response_cierre['retCode'] == 0
+    except Exception as e:
+        print(f"❌ Error al cerrar {symbol} sin stop loss: {e}")
+        cerrada = False
 
-        Mensaje_market = (
-            f"<b>🟢 ¡POSICIÓN LONG ABIERTA! (2:1)</b>\n"
+    if cerrada:
+        mensaje = (
+            f"<b>⚠️ Posición cerrada: no se pudo colocar el Stop Loss</b>\n"
             f"🔹 Símbolo: <b>{symbol}</b>\n"
-            f"💰 Monto operado: <b>{monto_operacion:.2f} USDT</b>\n"
-            f"📍 Precio entrada: <b>{current_price}</b>\n"
-            f"🛡️ Stop Loss: <b>{price_sl}</b> (-{float(distancia_sl_porcentaje):.2f}%)\n"
-            f"🎯 Protección 1:1 en: <b>{precio_proteccion:.4f}</b> (+{float(distancia_sl_porcentaje * 2):.2f}%)\n"
-            f"📊 Sistema de protección progresiva activado\n"
-            f"✅ Estado: <i>Abierta con éxito</i>"
+            f"❌ Motivo: {motivo}"
         )
-        enviar_mensaje_telegram(chat_id=chat_id, mensaje=Mensaje_market)
-        print(Mensaje_market)
-
-        return True
-
-    except Exception as e:
-        print(f"❌ Error al abrir la posición long: {e}")
-        return False
+    else:
+        mensaje = (
+            f"<b>🚨 ¡POSICIÓN ABIERTA SIN STOP LOSS!</b>\n"
+            f"🔹 Símbolo: <b>{symbol}</b>\n"
+            f"❌ Motivo: {motivo}\n"
+            f"⚠️ No se pudo cerrar: revisarla a mano"
+        )
+    enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje)
+    print(mensaje)
+    return cerrada
 
-def abrir_posicion_short(symbol, monto_operacion, distancia_sl_porcentaje):
+def abrir_posicion(symbol, side, monto_operacion, distancia_sl_porcentaje, inicio_senal=None, pretrade=None):
+    """
+    Abre una posición a mercado (side "Buy" para long, "Sell" para short) con su stop loss inicial
+    y arranca su tracking. Nunca deja la posición sin SL en silencio: si el SL del fill no se puede
+    calcular o Bybit lo rechaza, se mantiene el SL adjunto a la orden (modo un paso) o se cierra la
+    posición, y en ambos casos se avisa por Telegram
+    """
+    if inicio_senal is None:
+        inicio_senal = time.monotonic()
+    es_long = side == "Buy"
     try:
-        if get_open_positions_count() >= Numero_de_posiciones:
-            mensaje_count = "⚠️ Se alcanzó el máximo de posiciones abiertas. No se abrirá una nueva posición."
-            enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje_count)
-            print(mensaje_count)
-            return False
-
-        positions_list = get_current_position(symbol)
-        if positions_list and any(Decimal(position['size']) != 0 for position in positions_list):
-            print(f"Ya hay una posición abierta en {symbol}. No se abrirá otra posición.")
-            return False
+        if pretrade is None:
+            pretrade, status, mensaje = verificaciones_pretrade(symbol)
+            if status is not None:
+                print(mensaje)
+                return False
 
         # Calcular cantidad a operar
-        base_asset_qty_final = qty_step(symbol, monto_operacion)
+        last_price = pretrade["ultimo_precio"]
+        with medir("bot_senal_etapa_segundos", etapa="calculo_cantidad"):
+            base_asset_qty_final = qty_step(symbol, monto_operacion, last_price)
         if base_asset_qty_final is None:
             return False
 
-        # Abrir posición a mercado
-        response_market_order = session.place_order(
+        parametros_orden = dict(
             category="linear",
             symbol=symbol,
-            side="Sell",
+            side=side,
             orderType="Market",
             qty=str(base_asset_qty_final),
         )
 
-        time.sleep(3)
+        # Modo un paso: el SL estimado con el último precio viaja en la misma orden
+        price_sl_estimado = None
+        if entrada_con_sl_adjunto:
+            price_sl_estimado = adjust_price(symbol, calcular_precio_sl_inicial(last_price, distancia_sl_porcentaje, side), side)
+            if price_sl_estimado is None:
+                print(f"❌ No se pudo calcular el SL de {symbol}: no se abre la posición")
+                return False
+            parametros_orden.update(
+                stopLoss=str(price_sl_estimado),
+                slTriggerBy="LastPrice",
+                tpslMode="Full",
+                slOrderType="Market",
+            )
+
+        # Abrir posición a mercado
+        with medir("bot_senal_etapa_segundos", etapa="orden_confirmada"):
+            response_market_order = session.place_order(**parametros_orden)
+
         if response_market_order['retCode'] != 0:
             print("❌ Error al abrir la posición: La orden de mercado no se completó correctamente.")
             return False
 
-        # Obtener precio de entrada
-        positions_list = get_current_position(symbol)
-        current_price = Decimal(positions_list[0]['avgPrice'])
-
-        # Calcular y colocar stop loss
-        distancia_decimal = distancia_sl_porcentaje / Decimal(100)
-        price_sl = adjust_price(symbol, current_price * (Decimal(1) + distancia_decimal))
-
-        stop_loss_order = session.set_trading_stop(
-            category="linear",
-            symbol=symbol,
-            stopLoss=str(price_sl),
-            slTriggerBy="LastPrice",
-            tpslMode="Full",
-            slOrderType="Market",
-        )
+        if entrada_con_sl_adjunto:
+            latencia_ms = (time.monotonic() - inicio_senal) * 1000
+
+        # Obtener precio de entrada en cuanto se confirme el fill
+        with medir("bot_senal_etapa_segundos", etapa="fill"):
+            current_price = esperar_fill(symbol, response_market_order['result']['orderId'])
+            if current_price is None:
+                positions_list = get_current_position(symbol, usar_libro=False)
+                current_price = Decimal(positions_list[0]['avgPrice'])
+
+        # Calcular stop loss con el precio real de entrada
+        price_sl = adjust_price(symbol, calcular_precio_sl_inicial(current_price, distancia_sl_porcentaje, side), side)
+
+        # Solo se llama a set_trading_stop si el SL adjunto no coincide con el del fill
+        if price_sl is None or price_sl != price_sl_estimado:
+            with medir("bot_senal_etapa_segundos", etapa="sl_colocado"):
+                sl_colocado = colocar_stop_loss(symbol, price_sl)
+            if not sl_colocado:
+                motivo = f"SL {price_sl} del precio de entrada {current_price} no calculado o rechazado por Bybit"
+                if price_sl_estimado is None:
+                    cerrar_posicion_sin_sl(symbol, side, base_asset_qty_final, motivo)
+                    return False
+                mensaje_sl = (
+                    f"<b>⚠️ Stop Loss sin ajustar al precio de entrada</b>\n"
+                    f"🔹 Símbolo: <b>{symbol}</b>\n"
+                    f"❌ Motivo: {motivo}\n"
+                    f"🛡️ Queda el SL adjunto a la orden: <b>{price_sl_estimado}</b>"
+                )
+                enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje_sl)
+                print(mensaje_sl)
+                price_sl = price_sl_estimado
+        if not entrada_con_sl_adjunto:
+            latencia_ms = (time.monotonic() - inicio_senal) * 1000
+        modo = "1 paso" if entrada_con_sl_adjunto else "2 pasos"
+        observar("bot_senal_a_proteccion_segundos", latencia_ms / 1000, modo=modo)
+        print(f"⚡ {symbol}: latencia señal → posición protegida ({modo}): {latencia_ms:.0f} ms")
 
         # Calcular precio objetivo para protección 1 a 1
-        precio_proteccion = calcular_precio_proteccion_1a1(current_price, distancia_sl_porcentaje, "Sell")
+        precio_proteccion = calcular_precio_proteccion_1a1(current_price, distancia_sl_porcentaje, side)
 
         # Inicializar tracking de la posición
         tracking_posiciones[symbol] = {
             "precio_maximo": current_price,  # Para short, es el precio mínimo
             "precio_entrada": current_price,
-            "side": "Sell",
+            "side": side,
             "distancia_sl": distancia_sl_porcentaje
         }
+        registrar_tracking(symbol)
+        actualizar_libro_posicion({"symbol": symbol, "side": side, "size": str(base_asset_qty_final), "avgPrice": str(current_price)})
 
+        signo_sl, signo_objetivo = ("-", "+") if es_long else ("+", "-")
         Mensaje_market = (
-            f"<b>🔴 ¡POSICIÓN SHORT ABIERTA! (2:1)</b>\n"
+            f"<b>{'🟢 ¡POSICIÓN LONG ABIERTA!' if es_long else '🔴 ¡POSICIÓN SHORT ABIERTA!'} (2:1)</b>\n"
             f"🔹 Símbolo: <b>{symbol}</b>\n"
             f"💰 Monto operado: <b>{monto_operacion:.2f} USDT</b>\n"
             f"📍 Precio entrada: <b>{current_price}</b>\n"
-            f"🛡️ Stop Loss: <b>{price_sl}</b> (+{float(distancia_sl_porcentaje):.2f}%)\n"
-            f"🎯 Protección 1:1 en: <b>{precio_proteccion:.4f}</b> (-{float(distancia_sl_porcentaje * 2):.2f}%)\n"
+            f"🛡️ Stop Loss: <b>{price_sl}</b> ({signo_sl}{float(distancia_sl_porcentaje):.2f}%)\n"
+            f"🎯 Protección 1:1 en: <b>{precio_proteccion:.4f}</b> ({signo_objetivo}{float(distancia_sl_porcentaje * 2):.2f}%)\n"
             f"📊 Sistema de protección progresiva activado\n"
+            f"⚡ Señal → SL: <b>{latencia_ms:.0f} ms</b>\n"
             f"✅ Estado: <i>Abierta con éxito</i>"
         )
-        enviar_mensaje_telegram(chat_id=chat_id, mensaje=Mensaje_market)
+        with medir("bot_senal_etapa_segundos", etapa="notificacion_encolada"):
+            enviar_mensaje_telegram(chat_id=chat_id, mensaje=Mensaje_market)
         print(Mensaje_market)
 
         return True
 
     except Exception as e:
-        print(f"❌ Error al abrir la posición short: {e}")
+        print(f"❌ Error al abrir la posición {'long' if es_long else 'short'}: {e}")
         return False
 
 # ===== PROTECCIÓN 1 A 1 =====
@@ -314,23 +874,11 @@ def colocar_sl_en_entrada(symbol, precio_entrada, side, distancia_sl_porcentaje)
     """Coloca el stop loss en 1:1 (protege ganancia igual al riesgo inicial)"""
     try:
         # Calcular el SL en 1:1 (a la mitad del camino hacia el objetivo 2:1)
-        distancia_decimal = distancia_sl_porcentaje / Decimal(100)
+        price_sl = adjust_price(symbol, calcular_precio_sl_1a1(precio_entrada, distancia_sl_porcentaje, side), side)
 
-        if side == "Buy":
-            # Para LONG: SL = entrada + distancia (protege ganancia = riesgo inicial)
-            price_sl = adjust_price(symbol, precio_entrada * (Decimal(1) + distancia_decimal))
-        else:  # Sell
-            # Para SHORT: SL = entrada - distancia (protege ganancia = riesgo inicial)
-            price_sl = adjust_price(symbol, precio_entrada * (Decimal(1) - distancia_decimal))
-
-        stop_loss_order = session.set_trading_stop(
-            category="linear",
-            symbol=symbol,
-            stopLoss=str(price_sl),
-            slTriggerBy="LastPrice",
-            tpslMode="Full",
-            slOrderType="Market",
-        )
+        # Si Bybit no lo acepta la 1:1 queda pendiente y se reintenta con el próximo precio
+        if not colocar_stop_loss(symbol, price_sl):
+            return False
 
         ganancia_protegida = float(distancia_sl_porcentaje)
         mensaje = (
@@ -350,255 +898,552 @@ def colocar_sl_en_entrada(symbol, precio_entrada, side, distancia_sl_porcentaje)
         return False
 
 
-def actualizar_sl_progresivo(symbol, nuevo_precio_sl):
+def actualizar_sl_progresivo(symbol, nuevo_precio_sl, side):
     """Actualiza el stop loss de forma progresiva"""
     try:
-        price_sl_adjusted = adjust_price(symbol, nuevo_precio_sl)
-
-        stop_loss_order = session.set_trading_stop(
-            category="linear",
-            symbol=symbol,
-            stopLoss=str(price_sl_adjusted),
-            slTriggerBy="LastPrice",
-            tpslMode="Full",
-            slOrderType="Market",
-        )
+        price_sl_adjusted = adjust_price(symbol, nuevo_precio_sl, side)
 
-        return True
+        # Si Bybit no lo acepta el máximo no avanza y se reintenta con el próximo precio
+        return colocar_stop_loss(symbol, price_sl_adjusted)
 
     except Exception as e:
         print(f"❌ Error al actualizar SL progresivo para {symbol}: {e}")
         return False
 
-def monitorear_proteccion_progresiva():
+def procesar_precio_posicion(symbol, side, entry_price, last_price):
     """
-    Monitorea las posiciones para activar la protección progresiva por niveles:
+    Aplica la protección progresiva a una posición con el último precio conocido:
     1. Primera protección (1:1): Cuando el precio avanza 2x el SL inicial
     2. Protecciones siguientes: Cada vez que el precio avanza 2% desde el último máximo,
        mueve el SL dejando un margen de 2%
+    Se ejecuta en el actor del symbol: nunca corre dos veces a la vez para la misma moneda.
+    """
+    # Verificar si tenemos tracking de esta posición
+    if symbol not in tracking_posiciones:
+        # Inicializar tracking si no existe
+        tracking_posiciones[symbol] = {
+            "precio_maximo": entry_price,
+            "precio_entrada": entry_price,
+            "side": side
+        }
+        registrar_tracking(symbol)
+
+    tracking_info = tracking_posiciones[symbol]
+    precio_maximo_alcanzado = tracking_info["precio_maximo"]
+    precio_entrada = tracking_info["precio_entrada"]
+    distancia_sl_porcentaje = tracking_info.get("distancia_sl", Decimal(1.5))  # Default 1.5% si no existe
+
+    accion, nuevo_sl = evaluar_proteccion(
+        side, precio_entrada, precio_maximo_alcanzado, distancia_sl_porcentaje,
+        symbol in posiciones_con_stop, last_price, margen_proteccion_progresiva,
+    )
+
+    # ===== FASE 1: PROTECCIÓN 1:1 (Primera protección) =====
+    if accion == "1a1":
+        print(f"🎯 Precio objetivo 2:1 alcanzado para {symbol}. Activando protección 1:1...")
+        if colocar_sl_en_entrada(symbol, precio_entrada, side, distancia_sl_porcentaje):
+            posiciones_con_stop[symbol] = True
+            tracking_posiciones[symbol]["precio_maximo"] = last_price
+            registrar_proteccion(symbol)
+            registrar_tracking(symbol)
+
+    # ===== FASE 2: PROTECCIÓN PROGRESIVA (Niveles siguientes) =====
+    elif accion == "progresiva":
+        if actualizar_sl_progresivo(symbol, nuevo_sl, side):
+            icono = "📈" if side == "Buy" else "📉"
+            print(f"{icono} {symbol} - SL progresivo actualizado: {nuevo_sl:.4f}")
+
+            # Actualizar el máximo (o mínimo, para short) alcanzado
+            tracking_posiciones[symbol]["precio_maximo"] = last_price
+            registrar_tracking(symbol)
+
+            if side == "Buy":
+                ganancia_acumulada = ((last_price - precio_entrada) / precio_entrada) * 100
+            else:
+                ganancia_acumulada = ((precio_entrada - last_price) / precio_entrada) * 100
+
+            mensaje = (
+                f"<b>🚀 Protección Progresiva Actualizada</b>\n"
+                f"🔹 {symbol} ({'LONG' if side == 'Buy' else 'SHORT'})\n"
+                f"📍 Nuevo SL: <b>{nuevo_sl:.4f}</b>\n"
+                f"💹 Precio actual: <b>{last_price:.4f}</b>\n"
+                f"📊 Ganancia protegida: <b>+{ganancia_acumulada:.2f}%</b>\n"
+                f"🛡️ Margen de seguridad: {margen_proteccion_progresiva}%"
+            )
+            enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje, clave=f"progresiva_{symbol}")
+
+def proteger_posicion(symbol, last_price):
+    """Mensaje de precio del actor: evalúa la protección con la posición actual del libro"""
+    with libro_lock:
+        posicion = libro_posiciones.get(symbol)
+    # La posición pudo cerrarse mientras el precio esperaba en el buzón
+    if posicion is None:
+        return
+    procesar_precio_posicion(symbol, posicion["side"], Decimal(posicion["avgPrice"]), last_price)
+
+# ===== PROTECCIÓN POR WEBSOCKET =====
+def suscribir_ticker_ws(symbol):
+    """Suscribe el ticker público del symbol una sola vez"""
+    with tickers_lock:
+        # Sin conexión pybit esperaría a reconectar; el ciclo de respaldo lo suscribe después
+        if ws_publico is None or symbol in tickers_suscritos or not ws_publico.is_connected():
+            return
+        try:
+            ws_publico.ticker_stream(symbol=symbol, callback=on_ticker_ws)
+        except Exception as e:
+            # Típicamente la baja de un cierre reciente aún sin confirmar: se reintenta en el próximo ciclo
+            print(f"⚠️ No se pudo suscribir el ticker de {symbol}: {e}")
+            return
+        tickers_suscritos.add(symbol)
+
+def desuscribir_ticker_ws(symbol):
+    """Da de baja el ticker público del symbol cuando ya no hay posición que proteger"""
+    with tickers_lock:
+        if ws_publico is None or symbol not in tickers_suscritos:
+            return
+        tickers_suscritos.discard(symbol)
+        try:
+            ws_publico.unsubscribe(f"tickers.{symbol}")
+        except Exception as e:
+            print(f"⚠️ No se pudo dar de baja el ticker de {symbol}: {e}")
+
+def on_posicion_ws(message):
+    """Callback del stream privado de posiciones: mantiene las posiciones abiertas conocidas"""
+    try:
+        for posicion in message.get("data", []):
+            if posicion.get("category", "linear") != "linear":
+                continue
+            actualizar_libro_posicion(posicion)
+            if Decimal(posicion["size"]) != 0:
+                suscribir_ticker_ws(posicion["symbol"])
+    except Exception as e:
+        print(f"❌ Error en stream de posiciones: {e}")
+
+def on_ticker_ws(message):
+    """Callback del stream público de tickers: evalúa la protección en cada precio nuevo"""
+    try:
+        data = message.get("data", {})
+        symbol = data.get("symbol")
+        with libro_lock:
+            abierta = symbol in libro_posiciones
+        # Los mensajes delta solo traen los campos que cambiaron
+        if not abierta or "lastPrice" not in data:
+            return
+
+        planificador.actor(symbol).enviar_precio(proteger_posicion, symbol, Decimal(data["lastPrice"]))
+    except Exception as e:
+        print(f"❌ Error en stream de tickers: {e}")
+
+def websocket_activo():
+    """Indica si ambos streams están conectados"""
+    return (
+        ws_publico is not None and ws_privado is not None
+        and ws_publico.is_connected() and ws_privado.is_connected()
+    )
+
+def iniciar_proteccion_websocket():
+    """Conecta los streams de posiciones y tickers de Bybit para la protección por eventos"""
+    global ws_publico, ws_privado
+    from pybit.unified_trading import WebSocket
+
+    ws_publico = WebSocket(testnet=False, channel_type="linear")
+    ws_privado = WebSocket(
+        testnet=False,
+        channel_type="private",
+        api_key=config.api_key,
+        api_secret=config.api_secret,
+    )
+
+    # Posiciones ya abiertas antes de conectar el stream
+    refrescar_libro()
+    with libro_lock:
+        abiertas = list(libro_posiciones)
+    for symbol in abiertas:
+        suscribir_ticker_ws(symbol)
+
+    ws_privado.position_stream(callback=on_posicion_ws)
+    ws_privado.order_stream(callback=on_orden_ws)
+    print(f"🔌 Protección por WebSocket activa ({len(abiertas)} posiciones)")
+
+def obtener_precios_linear():
+    """Devuelve el último precio de todos los símbolos linear en una sola llamada"""
+    tickers = session.get_tickers(category="linear")
+    return {ticker_data["symbol"]: Decimal(ticker_data["lastPrice"]) for ticker_data in tickers["result"]["list"]}
+
+def monitorear_proteccion_progresiva():
+    """
+    Respaldo REST de la protección progresiva: consulta posiciones y precios cada 5 segundos
+    solo mientras los streams WebSocket no estén disponibles
     """
     while True:
+        if usar_websocket_proteccion and websocket_activo():
+            # Posiciones cuyo ticker no se pudo suscribir al abrirse
+            with libro_lock:
+                abiertas = list(libro_posiciones)
+            for symbol in abiertas:
+                suscribir_ticker_ws(symbol)
+            time.sleep(5)
+            continue
+
+        inicio_ciclo = time.perf_counter()
         try:
+            pedido_en = time.monotonic()
             posiciones = session.get_positions(category="linear", settleCoin="USDT")
-            for posicion in posiciones["result"]["list"]:
-                size = Decimal(posicion["size"])
-                if size == 0:
-                    continue
+            actualizar_libro_snapshot(posiciones["result"]["list"], pedido_en)
+            abiertas = [posicion for posicion in posiciones["result"]["list"] if Decimal(posicion["size"]) != 0]
 
-                symbol = posicion["symbol"]
-                side = posicion["side"]
-                entry_price = Decimal(posicion["avgPrice"])
-
-                # Verificar si tenemos tracking de esta posición
-                if symbol not in tracking_posiciones:
-                    # Inicializar tracking si no existe
-                    tracking_posiciones[symbol] = {
-                        "precio_maximo": entry_price,
-                        "precio_entrada": entry_price,
-                        "side": side
-                    }
-
-                # Obtener precio actual
-                tickers = session.get_tickers(symbol=symbol, category="linear")
-                last_price = None
-                for ticker_data in tickers["result"]["list"]:
-                    if ticker_data["symbol"] == symbol:
-                        last_price = Decimal(ticker_data["lastPrice"])
-                        break
+            # Un solo snapshot de precios por ciclo, sin importar cuántas posiciones haya
+            precios = obtener_precios_linear() if abiertas else {}
 
+            # Cada posición se evalúa en su actor, en paralelo con las demás
+            for posicion in abiertas:
+                symbol = posicion["symbol"]
+                last_price = precios.get(symbol)
                 if last_price is None:
                     continue
 
-                tracking_info = tracking_posiciones[symbol]
-                precio_maximo_alcanzado = tracking_info["precio_maximo"]
-                precio_entrada = tracking_info["precio_entrada"]
-                distancia_sl_porcentaje = tracking_info.get("distancia_sl", Decimal(1.5))  # Default 1.5% si no existe
-
-                # ===== FASE 1: PROTECCIÓN 1:1 (Primera protección) =====
-                if symbol not in posiciones_con_stop:
-                    # Calcular precio objetivo para 1 a 1
-                    precio_objetivo_1a1 = calcular_precio_proteccion_1a1(precio_entrada, distancia_sl_porcentaje, side)
-
-                    # Verificar si se alcanzó el objetivo (2:1)
-                    if side == "Buy" and last_price >= precio_objetivo_1a1:
-                        print(f"🎯 Precio objetivo 2:1 alcanzado para {symbol}. Activando protección 1:1...")
-                        if colocar_sl_en_entrada(symbol, precio_entrada, side, distancia_sl_porcentaje):
-                            posiciones_con_stop[symbol] = True
-                            tracking_posiciones[symbol]["precio_maximo"] = last_price
-
-                    elif side == "Sell" and last_price <= precio_objetivo_1a1:
-                        print(f"🎯 Precio objetivo 2:1 alcanzado para {symbol}. Activando protección 1:1...")
-                        if colocar_sl_en_entrada(symbol, precio_entrada, side, distancia_sl_porcentaje):
-                            posiciones_con_stop[symbol] = True
-                            tracking_posiciones[symbol]["precio_maximo"] = last_price
-
-                # ===== FASE 2: PROTECCIÓN PROGRESIVA (Niveles siguientes) =====
-                else:
-                    margen_decimal = margen_proteccion_progresiva / Decimal(100)
-
-                    if side == "Buy":
-                        # Para LONG: Actualizar máximo si el precio actual es mayor
-                        if last_price > precio_maximo_alcanzado:
-                            # Calcular el avance desde el último máximo
-                            avance_porcentaje = ((last_price - precio_maximo_alcanzado) / precio_maximo_alcanzado) * 100
-
-                            # Si avanzó al menos 2%, actualizar SL
-                            if avance_porcentaje >= margen_proteccion_progresiva:
-                                # Nuevo SL: precio máximo anterior (dejando 2% de margen)
-                                nuevo_sl = precio_maximo_alcanzado
-
-                                if actualizar_sl_progresivo(symbol, nuevo_sl):
-                                    print(f"📈 {symbol} - SL progresivo actualizado: {nuevo_sl:.4f}")
-
-                                    # Actualizar el máximo alcanzado
-                                    tracking_posiciones[symbol]["precio_maximo"] = last_price
-
-                                    ganancia_acumulada = ((last_price - precio_entrada) / precio_entrada) * 100
-
-                                    mensaje = (
-                                        f"<b>🚀 Protección Progresiva Actualizada</b>\n"
-                                        f"🔹 {symbol} (LONG)\n"
-                                        f"📍 Nuevo SL: <b>{nuevo_sl:.4f}</b>\n"
-                                        f"💹 Precio actual: <b>{last_price:.4f}</b>\n"
-                                        f"📊 Ganancia protegida: <b>+{ganancia_acumulada:.2f}%</b>\n"
-                                        f"🛡️ Margen de seguridad: {margen_proteccion_progresiva}%"
-                                    )
-                                    enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje)
-
-                    elif side == "Sell":
-                        # Para SHORT: Actualizar mínimo si el precio actual es menor
-                        if last_price < precio_maximo_alcanzado:
-                            # Calcular el avance desde el último mínimo (para short)
-                            avance_porcentaje = ((precio_maximo_alcanzado - last_price) / precio_maximo_alcanzado) * 100
-
-                            # Si avanzó al menos 2%, actualizar SL
-                            if avance_porcentaje >= margen_proteccion_progresiva:
-                                # Nuevo SL: precio mínimo anterior (dejando 2% de margen)
-                                nuevo_sl = precio_maximo_alcanzado
-
-                                if actualizar_sl_progresivo(symbol, nuevo_sl):
-                                    print(f"📉 {symbol} - SL progresivo actualizado: {nuevo_sl:.4f}")
-
-                                    # Actualizar el mínimo alcanzado
-                                    tracking_posiciones[symbol]["precio_maximo"] = last_price
-
-                                    ganancia_acumulada = ((precio_entrada - last_price) / precio_entrada) * 100
-
-                                    mensaje = (
-                                        f"<b>🚀 Protección Progresiva Actualizada</b>\n"
-                                        f"🔹 {symbol} (SHORT)\n"
-                                        f"📍 Nuevo SL: <b>{nuevo_sl:.4f}</b>\n"
-                                        f"💹 Precio actual: <b>{last_price:.4f}</b>\n"
-                                        f"📊 Ganancia protegida: <b>+{ganancia_acumulada:.2f}%</b>\n"
-                                        f"🛡️ Margen de seguridad: {margen_proteccion_progresiva}%"
-                                    )
-                                    enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje)
+                planificador.actor(symbol).enviar_precio(proteger_posicion, symbol, last_price)
 
         except Exception as e:
             print(f"❌ Error al monitorear protección progresiva: {e}")
 
+        observar("bot_ciclo_proteccion_segundos", time.perf_counter() - inicio_ciclo)
         time.sleep(5)
 
 # ===== COOLDOWN DE MONEDAS =====
-def limpiar_cooldown():
-    """Limpia las monedas que ya pasaron el periodo de cooldown"""
-    while True:
-        try:
-            tiempo_actual = datetime.now()
-            monedas_a_eliminar = []
+class GestorCooldown:
+    """
+    Cooldown por moneda con expiración exacta.
+    Las consultas son O(1) sobre un dict de expiraciones (reloj monotónico) y un heap
+    ordena las expiraciones para que un solo hilo las libere justo a tiempo.
+    """
 
-            for symbol, timestamp in monedas_operadas.items():
-                tiempo_transcurrido = (tiempo_actual - timestamp).total_seconds() / 60
-                if tiempo_transcurrido >= cooldown_minutos:
-                    monedas_a_eliminar.append(symbol)
+    def __init__(self, minutos_por_defecto, minutos_por_symbol=None):
+        self.minutos_por_defecto = minutos_por_defecto
+        self.minutos_por_symbol = minutos_por_symbol if minutos_por_symbol is not None else {}
+        self._expiraciones = {}  # {symbol: expiración en time.monotonic()}
+        self._heap = []  # [(expiración, symbol)] - puede contener entradas obsoletas
+        self._condicion = threading.Condition()
+
+    def minutos(self, symbol):
+        return self.minutos_por_symbol.get(symbol, self.minutos_por_defecto)
+
+    def registrar(self, symbol, momento_operacion):
+        """Pone el symbol en cooldown desde momento_operacion (datetime). Devuelve False si ya expiró"""
+        transcurrido = (datetime.now() - momento_operacion).total_seconds()
+        expiracion = time.monotonic() + self.minutos(symbol) * 60 - transcurrido
+        if expiracion <= time.monotonic():
+            return False
 
-            for symbol in monedas_a_eliminar:
-                del monedas_operadas[symbol]
-                print(f"✅ {symbol} eliminado del cooldown. Puede volver a operarse.")
+        with self._condicion:
+            self._expiraciones[symbol] = expiracion
+            heapq.heappush(self._heap, (expiracion, symbol))
+            self._condicion.notify()
+        return True
 
-        except Exception as e:
-            print(f"❌ Error al limpiar cooldown: {e}")
+    def segundos_restantes(self, symbol):
+        """Segundos de cooldown que le quedan al symbol (0 si no está en cooldown)"""
+        expiracion = self._expiraciones.get(symbol)
+        if expiracion is None:
+            return 0.0
+        return max(expiracion - time.monotonic(), 0.0)
 
-        time.sleep(60)  # Revisar cada minuto
+    def en_cooldown(self, symbol):
+        return self.segundos_restantes(symbol) > 0
+
+    def simbolos(self):
+        with self._condicion:
+            return list(self._expiraciones)
+
+    def __len__(self):
+        return len(self._expiraciones)
+
+    def ejecutar_expiraciones(self, al_expirar):
+        """Bucle bloqueante: libera cada symbol en el momento en que vence su cooldown"""
+        while True:
+            with self._condicion:
+                while True:
+                    if not self._heap:
+                        self._condicion.wait()
+                        continue
+                    expiracion, symbol = self._heap[0]
+                    espera = expiracion - time.monotonic()
+                    if espera > 0:
+                        self._condicion.wait(espera)
+                        continue
+                    heapq.heappop(self._heap)
+                    # Ignorar entradas obsoletas (el symbol se volvió a registrar)
+                    if self._expiraciones.get(symbol) == expiracion:
+                        del self._expiraciones[symbol]
+                        break
+            al_expirar(symbol)
+
+monedas_operadas = GestorCooldown(cooldown_minutos, cooldown_minutos_por_symbol)
+
+def limpiar_cooldown():
+    """Elimina cada moneda del cooldown en el momento exacto en que vence"""
+    def al_expirar(symbol):
+        borrar_cooldown(symbol)
+        print(f"✅ {symbol} eliminado del cooldown. Puede volver a operarse.")
+
+    monedas_operadas.ejecutar_expiraciones(al_expirar)
 
 def verificar_cooldown(symbol):
     """Verifica si una moneda está en cooldown"""
-    if symbol in monedas_operadas:
-        tiempo_actual = datetime.now()
-        tiempo_transcurrido = (tiempo_actual - monedas_operadas[symbol]).total_seconds() / 60
-        tiempo_restante = cooldown_minutos - tiempo_transcurrido
-
-        if tiempo_transcurrido < cooldown_minutos:
-            print(f"⏳ {symbol} en cooldown. Tiempo restante: {tiempo_restante:.1f} minutos")
-            return True
+    segundos_restantes = monedas_operadas.segundos_restantes(symbol)
+    if segundos_restantes > 0:
+        print(f"⏳ {symbol} en cooldown. Tiempo restante: {segundos_restantes / 60:.1f} minutos")
+        return True
 
     return False
 
 # ===== NOTIFICACIÓN DE PNL =====
+def al_cerrar_posicion(registro):
+    """Evento por cada cierre nuevo del ledger: notifica el PNL y limpia el estado si la posición ya no está abierta"""
+    symbol = registro["symbol"]
+    closed_pnl = Decimal(registro["closedPnl"]).quantize(Decimal("0.01"))
+    side = registro["side"]
+
+    # Un registro de PNL puede ser un cierre parcial: el libro y el ticker solo se dan de baja cuando el
+    # stream o un snapshot informan tamaño 0 (al_cerrar_en_libro). Mientras la posición siga en el libro
+    # se conserva su tracking: reiniciarlo volvería a armar la 1:1 y llevaría el SL de vuelta a la entrada
+    with libro_lock:
+        abierta = symbol in libro_posiciones
+    if abierta:
+        print(f"ℹ️ {symbol} sigue abierta en el libro (cierre parcial o libro sin actualizar): se mantiene su protección")
+    else:
+        borrar_estado_posicion(symbol)
+
+    if closed_pnl >= 0:
+        mensaje = (
+            f"<b>✅ ¡Operación cerrada en ganancia!</b> 🎉💰\n"
+            f"Símbolo: <b>{symbol}</b>\n"
+            f"Lado: <b>{side}</b>\n"
+            f"PNL: <b>+{closed_pnl} USDT</b>"
+        )
+    else:
+        mensaje = (
+            f"<b>❌ Operación cerrada en pérdida</b> 😢💸\n"
+            f"Símbolo: <b>{symbol}</b>\n"
+            f"Lado: <b>{side}</b>\n"
+            f"PNL: <b>{closed_pnl} USDT</b>"
+        )
+
+    enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje)
+    print(f"📊 PNL notificado: {mensaje}")
+
+def ingerir_pnl_cerrado(conn, desde_ms):
+    """
+    Pagina get_closed_pnl desde desde_ms, guarda cada registro en el ledger y devuelve
+    los registros que no estaban (ordenados del más antiguo al más reciente)
+    """
+    registros = []
+    cursor = ""
+    while True:
+        response = session.get_closed_pnl(category="linear", startTime=desde_ms, limit=100, cursor=cursor)
+        if response["retCode"] != 0:
+            raise Exception(f"Error en get_closed_pnl: {response}")
+        registros.extend(response["result"]["list"])
+        cursor = response["result"].get("nextPageCursor", "")
+        if not cursor:
+            break
+
+    nuevos = []
+    with conn:
+        for registro in sorted(registros, key=lambda r: int(r["updatedTime"])):
+            insertado = conn.execute(
+                "INSERT OR IGNORE INTO pnl_cerrado VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (registro["orderId"], registro["symbol"], registro["side"], registro["closedPnl"],
+                 registro["avgEntryPrice"], registro["avgExitPrice"],
+                 int(registro["createdTime"]), int(registro["updatedTime"])),
+            )
+            if insertado.rowcount == 1:
+                nuevos.append(registro)
+    return nuevos
+
 def notificar_pnl_cerrado():
-    ultimo_order_id_reportado = None
+    """Ingiere de forma incremental los cierres de Bybit y emite un evento por cada uno"""
+    conn = sqlite3.connect(ESTADO_DB_FILE, timeout=5)
+    ultimo_ms = conn.execute("SELECT MAX(updated_time) FROM pnl_cerrado").fetchone()[0]
+    if ultimo_ms is None:
+        # Ledger vacío: solo se notifican los cierres a partir de ahora
+        ultimo_ms = int(time.time() * 1000)
 
     while True:
         try:
-            response = session.get_closed_pnl(category="linear", limit=1)
-            if response["retCode"] == 0 and response["result"]["list"]:
-                ultimo_pnl = response["result"]["list"][0]
-                order_id = ultimo_pnl["orderId"]
-
-                if ultimo_order_id_reportado is None:
-                    ultimo_order_id_reportado = order_id
-                elif order_id != ultimo_order_id_reportado:
-                    symbol = ultimo_pnl["symbol"]
-                    closed_pnl = Decimal(ultimo_pnl["closedPnl"]).quantize(Decimal("0.01"))
-                    side = ultimo_pnl["side"]
-
-                    # Limpiar el símbolo de las protecciones y tracking
-                    if symbol in posiciones_con_stop:
-                        del posiciones_con_stop[symbol]
-                    if symbol in tracking_posiciones:
-                        del tracking_posiciones[symbol]
-
-                    if closed_pnl >= 0:
-                        mensaje = (
-                            f"<b>✅ ¡Operación cerrada en ganancia!</b> 🎉💰\n"
-                            f"Símbolo: <b>{symbol}</b>\n"
-                            f"Lado: <b>{side}</b>\n"
-                            f"PNL: <b>+{closed_pnl} USDT</b>"
-                        )
-                    else:
-                        mensaje = (
-                            f"<b>❌ Operación cerrada en pérdida</b> 😢💸\n"
-                            f"Símbolo: <b>{symbol}</b>\n"
-                            f"Lado: <b>{side}</b>\n"
-                            f"PNL: <b>{closed_pnl} USDT</b>"
-                        )
-
-                    enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje)
-                    print(f"📊 PNL notificado: {mensaje}")
-
-                    ultimo_order_id_reportado = order_id
+            # Bybit limita la consulta a los últimos 7 días
+            desde_ms = max(ultimo_ms - solape_pnl_segundos * 1000,
+                           int(time.time() * 1000) - 7 * 24 * 60 * 60 * 1000 + 60000)
+            for registro in ingerir_pnl_cerrado(conn, desde_ms):
+                ultimo_ms = max(ultimo_ms, int(registro["updatedTime"]))
+                planificador.actor(registro["symbol"]).enviar(al_cerrar_posicion, registro)
 
         except Exception as e:
             print(f"❌ Error al obtener PNL cerrado: {e}")
 
-        time.sleep(10)
+        time.sleep(intervalo_pnl_segundos)
+
+# ===== COLA DE SEÑALES =====
+def crear_ticket(symbol, side):
+    """Registra una señal encolada y devuelve su ticket"""
+    ticket_id = uuid.uuid4().hex
+    with tickets_lock:
+        tickets_senales[ticket_id] = {
+            "ticket": ticket_id,
+            "symbol": symbol,
+            "side": side,
+            "estado": "en_cola",
+            "status": None,
+            "message": None,
+            "recibida": datetime.now().isoformat(),
+            "espera_ms": None,
+            "duracion_ms": None,
+        }
+        # Conservar solo los tickets más recientes
+        while len(tickets_senales) > max_tickets_guardados:
+            tickets_senales.popitem(last=False)
+    return ticket_id
+
+def actualizar_ticket(ticket_id, **campos):
+    with tickets_lock:
+        if ticket_id in tickets_senales:
+            tickets_senales[ticket_id].update(campos)
+
+def reservar_cupo():
+    """Reserva un cupo de Numero_de_posiciones para una apertura. Devuelve False si no quedan"""
+    global aperturas_en_curso
+    with cupos_lock:
+        with libro_lock:
+            abiertas = len(libro_posiciones)
+        if abiertas + aperturas_en_curso >= Numero_de_posiciones:
+            return False
+        aperturas_en_curso += 1
+        return True
 
-# ===== API FLASK PARA RECIBIR SEÑALES DEL ORÁCULO =====
-@app.route('/signal', methods=['POST'])
-def recibir_signal():
+def liberar_cupo():
+    """Libera el cupo (si la apertura tuvo éxito la posición ya está en el libro)"""
+    global aperturas_en_curso
+    with cupos_lock:
+        aperturas_en_curso -= 1
+
+def ejecutar_senal(symbol, side, distancia_sl_porcentaje, inicio_senal):
+    """Ejecuta una señal ya validada en el actor del symbol. Devuelve (status, message)"""
+    # Verificar cooldown
+    if verificar_cooldown(symbol):
+        mensaje = f"⏳ {symbol} está en cooldown. Esperando {monedas_operadas.minutos(symbol)} minutos desde la última operación."
+        return "ignored", mensaje
+
+    # Calcular monto de operación (ratio 2:1)
+    monto_operacion = calcular_monto_operacion(monto_base_usdt, distancia_sl_porcentaje)
+
+    print(f"💰 Monto base: {monto_base_usdt} USDT")
+    print(f"📊 Distancia SL Final: {float(distancia_sl_porcentaje):.2f}%")
+    print(f"💵 Monto a operar: {monto_operacion:.2f} USDT")
+
+    # Symbol, límite de posiciones, posición actual y precio en paralelo
+    pretrade, status, mensaje = verificaciones_pretrade(symbol)
+    if status is not None:
+        print(mensaje)
+        return status, mensaje
+
+    # Las aperturas de distintos symbols corren en paralelo; el cupo evita pasar Numero_de_posiciones
+    if not reservar_cupo():
+        mensaje = "⚠️ Se alcanzó el máximo de posiciones abiertas. No se abrirá una nueva posición."
+        print(mensaje)
+        return "error", mensaje
+
+    exito = False
+    try:
+        if side in ('long', 'short'):
+            exito = abrir_posicion(symbol, "Buy" if side == 'long' else "Sell", monto_operacion,
+                                   distancia_sl_porcentaje, inicio_senal, pretrade)
+    finally:
+        liberar_cupo()
+
+    if exito:
+        # Agregar a monedas operadas
+        momento_operacion = datetime.now()
+        monedas_operadas.registrar(symbol, momento_operacion)
+        registrar_cooldown(symbol, momento_operacion)
+        return "success", f"Posición {side} abierta en {symbol}"
+    return "error", f"No se pudo abrir la posición en {symbol}"
+
+def ejecutar_ticket(ticket_id, symbol, side, distancia_sl_porcentaje, inicio_senal):
+    """Mensaje de señal del actor: ejecuta la señal y deja el resultado en el ticket"""
+    global espera_total_ms, espera_max_ms, senales_procesadas
+    espera_ms = (time.monotonic() - inicio_senal) * 1000
+    with tickets_lock:
+        senales_procesadas += 1
+        espera_total_ms += espera_ms
+        espera_max_ms = max(espera_max_ms, espera_ms)
+    actualizar_ticket(ticket_id, estado="procesando", espera_ms=round(espera_ms, 1))
+
+    try:
+        status, mensaje = ejecutar_senal(symbol, side, distancia_sl_porcentaje, inicio_senal)
+    except Exception as e:
+        print(f"❌ Error al procesar señal: {e}")
+        status, mensaje = "error", str(e)
+
+    duracion_ms = (time.monotonic() - inicio_senal) * 1000
+    actualizar_ticket(ticket_id, estado="completada", status=status, message=mensaje, duracion_ms=round(duracion_ms, 1))
+
+def ejecutar_ticket_de_cola(ticket_id, symbol, side, distancia_sl_porcentaje, inicio_senal):
+    """ejecutar_ticket para una señal sacada de la cola: al terminar devuelve su cupo al repartidor"""
+    global senales_en_proceso
+    try:
+        ejecutar_ticket(ticket_id, symbol, side, distancia_sl_porcentaje, inicio_senal)
+    finally:
+        with tickets_lock:
+            senales_en_proceso -= 1
+        cupos_senales.release()
+
+def procesar_senales():
+    """
+    Reparte las señales de la cola al actor de cada symbol. Solo saca una señal cuando hay
+    cupo (max_senales_en_proceso): las demás siguen en cola_senales, que aplica el límite y el 503
+    """
+    global senales_en_proceso
+    while True:
+        cupos_senales.acquire()
+        ticket_id, symbol, side, distancia_sl_porcentaje, inicio_senal = cola_senales.get()
+        with tickets_lock:
+            senales_en_proceso += 1
+        planificador.actor(symbol).enviar(ejecutar_ticket_de_cola, ticket_id, symbol, side, distancia_sl_porcentaje, inicio_senal)
+        cola_senales.task_done()
+
+def metricas_cola():
+    """Profundidad de la cola y tiempos de espera de las señales"""
+    with tickets_lock:
+        espera_media = espera_total_ms / senales_procesadas if senales_procesadas else 0.0
+        return {
+            "senales_en_cola": cola_senales.qsize(),
+            "max_cola": cola_senales.maxsize,
+            "senales_en_proceso": senales_en_proceso,
+            "max_en_proceso": max_senales_en_proceso,
+            "senales_procesadas": senales_procesadas,
+            "espera_media_ms": round(espera_media, 1),
+            "espera_max_ms": round(espera_max_ms, 1),
+        }
+
+# ===== LÓGICA DE LA API (común a Flask y al servidor async) =====
+def encolar_senal(data, inicio_senal):
+    """Valida y encola una señal del Oráculo. Devuelve (respuesta, código HTTP)"""
+    with medir("bot_senal_etapa_segundos", etapa="validacion"):
+        return _encolar_senal(data, inicio_senal)
+
+def _encolar_senal(data, inicio_senal):
     try:
-        data = request.json
         symbol = data.get('symbol')
         side = data.get('side')  # "long" o "short"
         distancia_sl = data.get('distancia_sl')  # Distancia del SL en % (opcional)
 
         if not symbol or not side:
-            return jsonify({"status": "error", "message": "Faltan parámetros: symbol y side"}), 400
+            return {"status": "error", "message": "Faltan parámetros: symbol y side"}, 400
 
         # Normalizar side
         side = side.lower()
         if side not in ['long', 'short']:
-            return jsonify({"status": "error", "message": "side debe ser 'long' o 'short'"}), 400
+            return {"status": "error", "message": "side debe ser 'long' o 'short'"}, 400
 
         # Si no se proporciona distancia_sl, usar un valor por defecto de 1.5%
         if distancia_sl is None:
@@ -618,62 +1463,156 @@ def recibir_signal():
         if distancia_sl_porcentaje > Decimal("10.0"):
             mensaje = f"⚠️ Stop Loss de {float(distancia_sl_porcentaje):.2f}% es mayor al 10%. Señal rechazada por alto riesgo."
             print(mensaje)
-            return jsonify({"status": "rejected", "message": mensaje}), 200
-        # Verificar si el symbol está en Bybit
-        if not verificar_symbol_en_bybit(symbol):
-            mensaje = f"⚠️ {symbol} no está disponible en Bybit Futuros. Ignorando señal."
+            return {"status": "rejected", "message": mensaje}, 200
+
+        # Encolar la señal y responder de inmediato con el ticket
+        ticket_id = crear_ticket(symbol, side)
+        try:
+            cola_senales.put_nowait((ticket_id, symbol, side, distancia_sl_porcentaje, inicio_senal))
+        except queue.Full:
+            actualizar_ticket(ticket_id, estado="completada", status="rejected", message="Cola de señales llena")
+            mensaje = f"⚠️ Cola de señales llena ({cola_senales.maxsize}). Señal de {symbol} rechazada."
             print(mensaje)
-            return jsonify({"status": "ignored", "message": mensaje}), 200
-
-        # Verificar cooldown
-        if verificar_cooldown(symbol):
-            mensaje = f"⏳ {symbol} está en cooldown. Esperando 60 minutos desde la última operación."
-            return jsonify({"status": "ignored", "message": mensaje}), 200
-
-        # Calcular monto de operación (ratio 2:1)
-        monto_operacion = calcular_monto_operacion(monto_base_usdt, distancia_sl_porcentaje)
-
-        print(f"💰 Monto base: {monto_base_usdt} USDT")
-        print(f"📊 Distancia SL Final: {float(distancia_sl_porcentaje):.2f}%")
-        print(f"💵 Monto a operar: {monto_operacion:.2f} USDT")
-
-        # Abrir posición según la señal
-        exito = False
-        if side == 'long':
-            exito = abrir_posicion_long(symbol, monto_operacion, distancia_sl_porcentaje)
-        elif side == 'short':
-            exito = abrir_posicion_short(symbol, monto_operacion, distancia_sl_porcentaje)
-
-        if exito:
-            # Agregar a monedas operadas
-            monedas_operadas[symbol] = datetime.now()
-            return jsonify({"status": "success", "message": f"Posición {side} abierta en {symbol}"}), 200
-        else:
-            return jsonify({"status": "error", "message": f"No se pudo abrir la posición en {symbol}"}), 500
+            return {"status": "rejected", "message": mensaje, "ticket": ticket_id}, 503
+
+        return {
+            "status": "queued",
+            "message": f"Señal {side} de {symbol} encolada",
+            "ticket": ticket_id,
+            "senales_en_cola": cola_senales.qsize(),
+        }, 202
 
     except Exception as e:
         print(f"❌ Error al procesar señal: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-@app.route('/status', methods=['GET'])
-def get_status():
-    """Endpoint para verificar el estado del bot"""
+        return {"status": "error", "message": str(e)}, 500
+
+def estado_ticket(ticket_id):
+    """Progreso y resultado de una señal encolada. Devuelve (respuesta, código HTTP)"""
+    with tickets_lock:
+        ticket = tickets_senales.get(ticket_id)
+        ticket = dict(ticket) if ticket else None
+    if ticket is None:
+        return {"status": "error", "message": f"Ticket {ticket_id} no encontrado"}, 404
+    return ticket, 200
+
+def estado_bot():
+    """Estado general del bot. Devuelve (respuesta, código HTTP)"""
     try:
         posiciones_abiertas = get_open_positions_count()
-        return jsonify({
+        return {
             "status": "online",
             "posiciones_abiertas": posiciones_abiertas,
             "max_posiciones": Numero_de_posiciones,
-            "monedas_en_cooldown": list(monedas_operadas.keys()),
+            "monedas_en_cooldown": monedas_operadas.simbolos(),
             "monto_base": float(monto_base_usdt),
-            "margen_proteccion": float(margen_proteccion_progresiva)
-        }), 200
+            "margen_proteccion": float(margen_proteccion_progresiva),
+            "cola_senales": metricas_cola(),
+            "ultimos_tiempos_pretrade_ms": dict(ultimos_tiempos_pretrade),
+            "actores": planificador.metricas(),
+            "cliente_bybit": session.metricas()
+        }, 200
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return {"status": "error", "message": str(e)}, 500
+
+def texto_metricas():
+    """Histogramas de latencia y contadores en formato Prometheus"""
+    cliente = session.metricas()
+    cola = metricas_cola()
+    actores = planificador.metricas()
+    return exportar_prometheus(
+        contadores={
+            "bybit_llamadas_total": cliente["llamadas"],
+            "bybit_throttles_total": cliente["throttles"],
+            "bybit_reintentos_total": cliente["reintentos"],
+            "bybit_espera_cola_ms_total": cliente["espera_cola_ms"],
+            "bot_senales_procesadas_total": cola["senales_procesadas"],
+        },
+        gauges={
+            "bot_senales_en_cola": cola["senales_en_cola"],
+            "bot_senales_en_proceso": cola["senales_en_proceso"],
+            "bot_posiciones_abiertas": len(libro_posiciones),
+            "bot_actores_activos": actores["actores_activos"],
+            "bot_actores_mensajes_pendientes": actores["mensajes_pendientes"],
+        },
+    )
+
+# ===== API FLASK PARA RECIBIR SEÑALES DEL ORÁCULO =====
+@app.route('/signal', methods=['POST'])
+def recibir_signal():
+    inicio_senal = time.monotonic()
+    respuesta, codigo = encolar_senal(request.get_json(silent=True) or {}, inicio_senal)
+    return jsonify(respuesta), codigo
+
+@app.route('/signal/<ticket_id>', methods=['GET'])
+def consultar_signal(ticket_id):
+    """Endpoint para consultar el progreso y resultado de una señal encolada"""
+    respuesta, codigo = estado_ticket(ticket_id)
+    return jsonify(respuesta), codigo
+
+@app.route('/status', methods=['GET'])
+def get_status():
+    """Endpoint para verificar el estado del bot"""
+    respuesta, codigo = estado_bot()
+    return jsonify(respuesta), codigo
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Endpoint de métricas para Prometheus"""
+    return Response(texto_metricas(), mimetype="text/plain; version=0.0.4")
 
 def iniciar_flask():
     """Inicia el servidor Flask"""
-    app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+    app.run(host='0.0.0.0', port=puerto_api, debug=False, use_reloader=False)
+
+# ===== SERVIDOR ASYNC (aiohttp) =====
+def crear_app_async():
+    """Crea la aplicación aiohttp con los mismos endpoints que Flask"""
+    from aiohttp import web
+
+    async def signal_async(req):
+        inicio_senal = time.monotonic()
+        try:
+            data = await req.json()
+        except Exception:
+            data = {}
+        respuesta, codigo = encolar_senal(data or {}, inicio_senal)
+        return web.json_response(respuesta, status=codigo)
+
+    async def consultar_signal_async(req):
+        respuesta, codigo = estado_ticket(req.match_info['ticket_id'])
+        return web.json_response(respuesta, status=codigo)
+
+    async def status_async(req):
+        # Con el libro al día estado_bot no toca la red; si no, puede consultar Bybit: fuera del event loop
+        if libro_fresco():
+            respuesta, codigo = estado_bot()
+        else:
+            respuesta, codigo = await asyncio.get_running_loop().run_in_executor(None, estado_bot)
+        return web.json_response(respuesta, status=codigo)
+
+    async def metrics_async(req):
+        return web.Response(text=texto_metricas(), content_type="text/plain")
+
+    app_async = web.Application()
+    app_async.router.add_post('/signal', signal_async)
+    app_async.router.add_get('/signal/{ticket_id}', consultar_signal_async)
+    app_async.router.add_get('/status', status_async)
+    app_async.router.add_get('/metrics', metrics_async)
+    return app_async
+
+def iniciar_servidor_async():
+    """Inicia el servidor aiohttp (keep-alive, sin un hilo por petición) en su propio event loop"""
+    from aiohttp import web
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    web.run_app(
+        crear_app_async(),
+        host='0.0.0.0',
+        port=puerto_api,
+        keepalive_timeout=75,
+        handle_signals=False,
+        print=None,
+    )
 
 # ===== MAIN =====
 if __name__ == "__main__":
@@ -686,7 +1625,9 @@ if __name__ == "__main__":
     print(f"📈 Margen protección progresiva: {margen_proteccion_progresiva}%")
     print(f"🔢 Máximo posiciones simultáneas: {Numero_de_posiciones}")
     print(f"⏳ Cooldown por moneda: {cooldown_minutos} minutos")
-    print(f"🌐 API escuchando en: http://0.0.0.0:5000")
+    print(f"🌐 API escuchando en: http://0.0.0.0:{puerto_api} (servidor {modo_servidor})")
+    if modo_simulador:
+        print("🧪 MODO SIMULADOR: órdenes contra el simulador local de Bybit, sin Telegram")
     print("=" * 60)
 
     mensaje_inicio = (
@@ -699,8 +1640,41 @@ if __name__ == "__main__":
     )
     enviar_mensaje_telegram(chat_id=chat_id, mensaje=mensaje_inicio)
 
+    telegram_thread = threading.Thread(target=emisor_telegram)
+    telegram_thread.daemon = True
+    telegram_thread.start()
+
+    # Restaurar el estado anterior y arrancar el journal
+    init_estado_db()
+    journal_thread = threading.Thread(target=escribir_journal)
+    journal_thread.daemon = True
+    journal_thread.start()
+    try:
+        restaurar_estado()
+    except Exception as e:
+        print(f"❌ Error al restaurar el estado: {e}")
+
+    # Precargar instrumentos para no consultar metadatos en cada señal
+    try:
+        cargar_instrumentos()
+    except Exception as e:
+        print(f"❌ Error al cargar instrumentos: {e}")
+
+    # Protección por eventos (si falla, el bucle REST sigue protegiendo)
+    if usar_websocket_proteccion:
+        try:
+            iniciar_proteccion_websocket()
+        except Exception as e:
+            print(f"❌ Error al iniciar protección por WebSocket, usando REST: {e}")
+
     # Iniciar hilos
-    flask_thread = threading.Thread(target=iniciar_flask)
+    for _ in range(trabajadores_senales):
+        senales_thread = threading.Thread(target=procesar_senales)
+        senales_thread.daemon = True
+        senales_thread.start()
+
+    servidor = iniciar_servidor_async if modo_servidor == "async" else iniciar_flask
+    flask_thread = threading.Thread(target=servidor)
     flask_thread.daemon = True
     flask_thread.start()
 
@@ -716,6 +1690,10 @@ if __name__ == "__main__":
     pnl_thread.daemon = True
     pnl_thread.start()
 
+    instrumentos_thread = threading.Thread(target=refrescar_instrumentos)
+    instrumentos_thread.daemon = True
+    instrumentos_thread.start()
+
     print("\n✅ Todos los servicios iniciados correctamente")
     print("📡 Esperando señales del Oráculo...\n")
 
@@ -1,22 +1,29 @@
 """
 🚀 BOT MONITOR BINANCE - ENVÍA SEÑALES AL BOT 2 A 1
-Monitorea precios en Binance Futures y envía alertas al bot 2 a 1
+Monitorea precios en Binance Futures y envía alertas al bot 2 a 1.
+La ventana es un cliente del Oráculo (oraculo_servicio.py): si no hay un servicio corriendo,
+levanta uno propio dentro del mismo proceso.
 """
 
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import sqlite3
 import threading
 import time
 from datetime import datetime
-from binance.client import Client
+from urllib.parse import urlparse
 import requests
-from decimal import Decimal
-import json
+
+import oraculo_motor
+from feed_binance import BINANCE_WS_URL
+from oraculo_motor import MotorOraculo
+from oraculo_servicio import ORACULO_URL, iniciar_servidor, servicio_activo
 
 # ===== CONFIGURACIÓN =====
-BOT_2A1_URL = "http://localhost:5000"
-DATABASE_FILE = "monitor_binance.db"
+# Interfaz: el hilo de sondeo solo guarda lo último del servicio; Tk pinta todo junto a ritmo fijo
+INTERVALO_UI_MS = 100  # 10 cuadros por segundo
+INTERVALO_SONDEO = 0.5  # Segundos entre consultas de monedas, estado y log al servicio
+MAX_LINEAS_LOG = 1000
 
 # Colores
 COLOR_BG = "#1e1e1e"
@@ -29,49 +36,54 @@ COLOR_ENTRY = "#3d3d3d"
 COLOR_BUTTON = "#4CAF50"
 COLOR_BUTTON_HOVER = "#66BB6A"
 
+
 class MonitorBinanceBot:
-    def __init__(self, root):
+    def __init__(self, root, url=ORACULO_URL, database_file=None, ws_url=BINANCE_WS_URL):
         self.root = root
         self.root.title("🚀 BOT MONITOR BINANCE → BOT 2 A 1")
         self.root.geometry("1200x700")
         self.root.configure(bg=COLOR_BG)
 
         # Variables de control
-        self.monitoring = False
-        self.binance_client = None
-        self.monitored_coins = {}  # {symbol: {"long_entry": price, "long_sl": price, "short_entry": price, "short_sl": price, "current_price": price}}
-        self.triggered_signals = set()  # Para evitar enviar la misma señal múltiples veces
-
-        # Base de datos
-        self.init_database()
+        self.url = url  # API del Oráculo
+        self.sesion = requests.Session()  # Conexión reutilizada para el sondeo
+        self.motor = None  # MotorOraculo propio si no había un servicio corriendo
+        self.servidor = None
+        self.monitoring = False  # Según el último sondeo del servicio
+        self.monitored_coins = {}  # Copia de las monedas del servicio: {symbol: {..., "current_price", "disparada"}}
+        self.numero_log = 0  # Última línea del log del servicio ya mostrada
+
+        # Lo que trae el hilo de sondeo (se aplica en drenar_ui)
+        self.ui_lock = threading.Lock()
+        self.monedas_pendientes = None  # Último /monedas sin pintar - varios sondeos, un solo repintado
+        self.estado_pendiente = None
+        self.lineas_log = []
+        self.filas = {}  # {symbol: item de la tabla}
+        self.filas_pintadas = {}  # {symbol: (valores, disparada)} para no repintar lo mismo
 
         # Interfaz gráfica
         self.create_gui()
 
-        # Cargar monedas guardadas
-        self.load_coins_from_db()
+        # Conectar con el Oráculo (o levantar uno propio con la base de datos local)
+        self.conectar_servicio(database_file, ws_url)
 
         # Verificar conexión con Bot 2 a 1
         self.check_bot_2a1_connection()
 
-    def init_database(self):
-        """Inicializa la base de datos SQLite"""
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS monitored_coins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT UNIQUE NOT NULL,
-                long_entry REAL,
-                long_sl REAL,
-                short_entry REAL,
-                short_sl REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
-        conn.close()
+        # Sondeo del servicio y refresco de la interfaz a ritmo fijo
+        threading.Thread(target=self.sondear_servicio, daemon=True).start()
+        self.root.after(INTERVALO_UI_MS, self.drenar_ui)
+
+    def conectar_servicio(self, database_file, ws_url):
+        """Usa el Oráculo que escucha en self.url; si no hay ninguno, levanta uno en este proceso"""
+        if servicio_activo(self.url):
+            self.log(f"🔌 Conectado al Oráculo en {self.url}")
+            return
+
+        direccion = urlparse(self.url)
+        self.motor = MotorOraculo(database_file, eco_consola=False, ws_url=ws_url)
+        self.servidor = iniciar_servidor(self.motor, direccion.hostname, direccion.port)
+        self.log(f"🔮 Oráculo propio en {self.url} ({self.motor.database_file})")
 
     def create_gui(self):
         """Crea la interfaz gráfica"""
@@ -261,6 +273,7 @@ class MonitorBinanceBot:
         style.map("Treeview", background=[("selected", COLOR_BUTTON)])
 
         # Eventos
+        self.tree.tag_configure('triggered', background='#ff5555', foreground='#ffffff')
         self.tree.bind("<Double-1>", self.on_tree_double_click)
         self.tree.bind("<Button-3>", self.on_tree_right_click)
 
@@ -310,17 +323,103 @@ class MonitorBinanceBot:
         self.log("📊 Listo para agregar monedas y comenzar el monitoreo")
 
     def log(self, message):
-        """Escribe en el log"""
+        """Escribe en el log (desde cualquier hilo: aparece en el próximo cuadro)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        with self.ui_lock:
+            self.lineas_log.append(f"[{timestamp}] {message}\n")
+
+    def sondear_servicio(self):
+        """Trae estado, monedas y log nuevo del servicio; se pintan en el próximo cuadro"""
+        sin_servicio = False
+        while True:
+            inicio = time.monotonic()
+            try:
+                estado = self.sesion.get(f"{self.url}/status", timeout=5).json()
+                monedas = self.sesion.get(f"{self.url}/monedas", timeout=5).json()
+                log = self.sesion.get(f"{self.url}/log", params={"desde": self.numero_log}, timeout=5).json()
+            except (requests.RequestException, ValueError) as e:
+                if not sin_servicio:
+                    self.log(f"⚠️ No se pudo consultar el Oráculo: {e}")
+                    sin_servicio = True
+            else:
+                if sin_servicio:
+                    self.log("✅ Oráculo disponible de nuevo")
+                    sin_servicio = False
+                self.numero_log = log["ultimo"]
+                with self.ui_lock:
+                    self.estado_pendiente = estado
+                    self.monedas_pendientes = monedas
+                    self.lineas_log.extend(f"{linea}\n" for linea in log["lineas"])
+
+            time.sleep(max(0.0, INTERVALO_SONDEO - (time.monotonic() - inicio)))
+
+    def drenar_ui(self):
+        """Aplica lo que trajeron los otros hilos: último estado del servicio y el log"""
+        with self.ui_lock:
+            estado, self.estado_pendiente = self.estado_pendiente, None
+            monedas, self.monedas_pendientes = self.monedas_pendientes, None
+            lineas, self.lineas_log = self.lineas_log, []
+
+        if estado is not None and estado["monitoreando"] != self.monitoring:
+            self.monitoring = estado["monitoreando"]
+            self.pintar_monitoreo()
+
+        if monedas is not None:
+            self.pintar_monedas(monedas)
+
+        if lineas:
+            self.log_text.config(state=tk.NORMAL)
+            self.log_text.insert(tk.END, "".join(lineas))
+            self.log_text.delete("1.0", f"end-{MAX_LINEAS_LOG + 1}lines")
+            self.log_text.see(tk.END)
+            self.log_text.config(state=tk.DISABLED)
+
+        self.root.after(INTERVALO_UI_MS, self.drenar_ui)
+
+    def pintar_monitoreo(self):
+        """Botón y barra de estado según self.monitoring (hilo de Tk)"""
+        if self.monitoring:
+            self.start_button.config(text="⏸️ DETENER MONITOREO", bg="#ff5555")
+            self.status_label.config(text="🟢 Monitoreando", fg=COLOR_LONG)
+        else:
+            self.start_button.config(text="▶️ INICIAR MONITOREO", bg=COLOR_BUTTON)
+            self.status_label.config(text="⚪ Detenido", fg="#ffaa00")
+
+    def pintar_monedas(self, monedas):
+        """Lleva la tabla al estado del servicio: altas, bajas y solo las filas que cambiaron (hilo de Tk)"""
+        self.monitored_coins = {moneda["symbol"]: moneda for moneda in monedas}
+
+        # Monedas que el servicio ya no tiene (eliminadas o disparadas)
+        for symbol in [symbol for symbol in self.filas if symbol not in self.monitored_coins]:
+            self.tree.delete(self.filas.pop(symbol))
+            self.filas_pintadas.pop(symbol, None)
+
+        for symbol, moneda in self.monitored_coins.items():
+            valores = (
+                symbol,
+                moneda["long_distance"],
+                moneda["short_distance"],
+                moneda["long_entry"] if moneda["long_entry"] else "---",
+                moneda["long_sl"] if moneda["long_sl"] else "---",
+                moneda["short_entry"] if moneda["short_entry"] else "---",
+                moneda["short_sl"] if moneda["short_sl"] else "---"
+            )
+            pintada = (valores, bool(moneda["disparada"]))
+            if self.filas_pintadas.get(symbol) == pintada:
+                continue
+            self.filas_pintadas[symbol] = pintada
+
+            tags = ('triggered',) if moneda["disparada"] else ()
+            item = self.filas.get(symbol)
+            if item is None:
+                self.filas[symbol] = self.tree.insert("", tk.END, values=valores, tags=tags)
+            else:
+                self.tree.item(item, values=valores, tags=tags)
 
     def check_bot_2a1_connection(self):
         """Verifica la conexión con el Bot 2 a 1"""
         try:
-            response = requests.get(f"{BOT_2A1_URL}/status", timeout=3)
+            response = requests.get(f"{oraculo_motor.BOT_2A1_URL}/status", timeout=3)
             if response.status_code == 200:
                 data = response.json()
                 self.bot_2a1_status.config(
@@ -338,6 +437,23 @@ class MonitorBinanceBot:
             self.log(f"⚠️ No se pudo conectar con Bot 2 a 1: {e}")
             return False
 
+    def llamar_servicio(self, metodo, ruta, **kwargs):
+        """Pide una operación al Oráculo; devuelve (ok, respuesta)"""
+        try:
+            response = requests.request(metodo, f"{self.url}{ruta}", timeout=10, **kwargs)
+            return response.ok, response.json()
+        except (requests.RequestException, ValueError) as e:
+            return False, {"message": f"No se pudo contactar al Oráculo: {e}"}
+
+    def leer_niveles(self):
+        """Niveles de los campos de entrada (float o None); ValueError si no son números"""
+        return {
+            "long_entry": float(self.long_entry.get()) if self.long_entry.get() else None,
+            "long_sl": float(self.long_sl.get()) if self.long_sl.get() else None,
+            "short_entry": float(self.short_entry.get()) if self.short_entry.get() else None,
+            "short_sl": float(self.short_sl.get()) if self.short_sl.get() else None,
+        }
+
     def add_coin(self):
         """Agrega una moneda a la lista de monitoreo"""
         symbol = self.symbol_entry.get().strip().upper()
@@ -347,37 +463,19 @@ class MonitorBinanceBot:
             return
 
         try:
-            long_entry = float(self.long_entry.get()) if self.long_entry.get() else None
-            long_sl = float(self.long_sl.get()) if self.long_sl.get() else None
-            short_entry = float(self.short_entry.get()) if self.short_entry.get() else None
-            short_sl = float(self.short_sl.get()) if self.short_sl.get() else None
-
-            # Validar que al menos un lado esté configurado
-            if not (long_entry and long_sl) and not (short_entry and short_sl):
-                messagebox.showerror("Error", "Debes configurar al menos un lado (LONG o SHORT)")
-                return
-
-            # Guardar en base de datos
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO monitored_coins (symbol, long_entry, long_sl, short_entry, short_sl)
-                VALUES (?, ?, ?, ?, ?)
-            """, (symbol, long_entry, long_sl, short_entry, short_sl))
-            conn.commit()
-            conn.close()
-
-            # Actualizar tabla
-            self.load_coins_from_db()
-            self.clear_inputs()
-
-            self.log(f"✅ {symbol} agregado correctamente")
-            messagebox.showinfo("Éxito", f"{symbol} agregado correctamente")
-
+            niveles = self.leer_niveles()
         except ValueError:
             messagebox.showerror("Error", "Los precios deben ser números válidos")
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", f"{symbol} ya está en la lista")
+            return
+
+        # El servicio valida (al menos un lado, moneda repetida) y guarda en la base de datos
+        ok, resultado = self.llamar_servicio("POST", "/monedas", json=dict(niveles, symbol=symbol))
+        if not ok:
+            messagebox.showerror("Error", resultado["message"])
+            return
+
+        self.clear_inputs()
+        messagebox.showinfo("Éxito", resultado["message"])
 
     def update_coin(self):
         """Actualiza una moneda existente"""
@@ -392,31 +490,18 @@ class MonitorBinanceBot:
             return
 
         try:
-            long_entry = float(self.long_entry.get()) if self.long_entry.get() else None
-            long_sl = float(self.long_sl.get()) if self.long_sl.get() else None
-            short_entry = float(self.short_entry.get()) if self.short_entry.get() else None
-            short_sl = float(self.short_sl.get()) if self.short_sl.get() else None
-
-            # Actualizar en base de datos
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE monitored_coins
-                SET long_entry=?, long_sl=?, short_entry=?, short_sl=?, updated_at=CURRENT_TIMESTAMP
-                WHERE symbol=?
-            """, (long_entry, long_sl, short_entry, short_sl, symbol))
-            conn.commit()
-            conn.close()
-
-            # Actualizar tabla
-            self.load_coins_from_db()
-            self.clear_inputs()
-
-            self.log(f"✏️ {symbol} actualizado correctamente")
-            messagebox.showinfo("Éxito", f"{symbol} actualizado correctamente")
-
+            niveles = self.leer_niveles()
         except ValueError:
             messagebox.showerror("Error", "Los precios deben ser números válidos")
+            return
+
+        ok, resultado = self.llamar_servicio("PUT", f"/monedas/{symbol}", json=niveles)
+        if not ok:
+            messagebox.showerror("Error", resultado["message"])
+            return
+
+        self.clear_inputs()
+        messagebox.showinfo("Éxito", resultado["message"])
 
     def clear_inputs(self):
         """Limpia los campos de entrada"""
@@ -466,50 +551,9 @@ class MonitorBinanceBot:
         symbol = values[0]
 
         if messagebox.askyesno("Confirmar", f"¿Eliminar {symbol}?"):
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM monitored_coins WHERE symbol=?", (symbol,))
-            conn.commit()
-            conn.close()
-
-            self.load_coins_from_db()
-            self.log(f"🗑️ {symbol} eliminado")
-
-    def load_coins_from_db(self):
-        """Carga las monedas desde la base de datos"""
-        # Limpiar tabla
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Cargar desde DB
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT symbol, long_entry, long_sl, short_entry, short_sl FROM monitored_coins")
-        rows = cursor.fetchall()
-        conn.close()
-
-        # Actualizar diccionario de monedas monitoreadas
-        self.monitored_coins = {}
-        for row in rows:
-            symbol, long_entry, long_sl, short_entry, short_sl = row
-            self.monitored_coins[symbol] = {
-                "long_entry": long_entry,
-                "long_sl": long_sl,
-                "short_entry": short_entry,
-                "short_sl": short_sl,
-                "current_price": None
-            }
-
-            # Agregar a la tabla
-            self.tree.insert("", tk.END, values=(
-                symbol,
-                "---",  # Distancia Long
-                "---",  # Distancia Short
-                long_entry if long_entry else "---",
-                long_sl if long_sl else "---",
-                short_entry if short_entry else "---",
-                short_sl if short_sl else "---"
-            ))
+            ok, resultado = self.llamar_servicio("DELETE", f"/monedas/{symbol}")
+            if not ok:
+                messagebox.showerror("Error", resultado["message"])
 
     def toggle_monitoring(self):
         """Inicia o detiene el monitoreo"""
@@ -519,7 +563,7 @@ class MonitorBinanceBot:
             self.stop_monitoring()
 
     def start_monitoring(self):
-        """Inicia el monitoreo"""
+        """Inicia el monitoreo en el servicio"""
         if not self.monitored_coins:
             messagebox.showwarning("Advertencia", "No hay monedas para monitorear")
             return
@@ -529,209 +573,31 @@ class MonitorBinanceBot:
             if not messagebox.askyesno("Advertencia", "No se detectó el Bot 2 a 1. ¿Continuar de todos modos?"):
                 return
 
+        ok, resultado = self.llamar_servicio("POST", "/monitoreo/iniciar")
+        if not ok:
+            messagebox.showerror("Error", resultado["message"])
+            return
         self.monitoring = True
-        self.start_button.config(text="⏸️ DETENER MONITOREO", bg="#ff5555")
-        self.status_label.config(text="🟢 Monitoreando", fg=COLOR_LONG)
-
-        self.log("🚀 Iniciando monitoreo...")
-
-        # Iniciar hilo de monitoreo
-        monitor_thread = threading.Thread(target=self.monitor_prices, daemon=True)
-        monitor_thread.start()
+        self.pintar_monitoreo()
 
     def stop_monitoring(self):
-        """Detiene el monitoreo"""
-        self.monitoring = False
-        self.start_button.config(text="▶️ INICIAR MONITOREO", bg=COLOR_BUTTON)
-        self.status_label.config(text="⚪ Detenido", fg="#ffaa00")
-        self.log("⏸️ Monitoreo detenido")
-
-    def monitor_prices(self):
-        """Monitorea los precios de las monedas usando la API REST de Binance"""
-        try:
-            # Crear cliente de Binance (sin API keys, solo para datos públicos)
-            self.binance_client = Client()
-
-            self.log(f"📊 Monitoreando {len(self.monitored_coins)} monedas...")
-
-            while self.monitoring:
-                for symbol in list(self.monitored_coins.keys()):
-                    try:
-                        # Obtener precio actual
-                        ticker = self.binance_client.futures_symbol_ticker(symbol=symbol)
-                        current_price = float(ticker['price'])
-
-                        # Actualizar precio actual
-                        self.monitored_coins[symbol]["current_price"] = current_price
-
-                        # Actualizar tabla
-                        self.update_table_price(symbol, current_price)
-
-                        # Verificar si se alcanzó algún nivel
-                        self.check_price_levels(symbol, current_price)
-
-                    except Exception as e:
-                        self.log(f"❌ Error al obtener precio de {symbol}: {e}")
-
-                time.sleep(0.5)  # Actualizar cada 0.5 segundos (2 veces por segundo)
-
-        except Exception as e:
-            self.log(f"❌ Error en el monitoreo: {e}")
-            self.monitoring = False
-            self.start_button.config(text="▶️ INICIAR MONITOREO", bg=COLOR_BUTTON)
-            self.status_label.config(text="⚪ Detenido", fg="#ffaa00")
-
-    def update_table_price(self, symbol, current_price):
-        """Actualiza las distancias en la tabla"""
-        coin = self.monitored_coins.get(symbol)
-        if not coin:
+        """Detiene el monitoreo en el servicio"""
+        ok, resultado = self.llamar_servicio("POST", "/monitoreo/detener")
+        if not ok:
+            messagebox.showerror("Error", resultado["message"])
             return
-
-        # Calcular distancia LONG (misma fórmula que el Oráculo)
-        long_distance_text = "---"
-        if coin["long_entry"]:
-            long_entry = coin["long_entry"]
-            distance_pct = abs((long_entry - current_price) / current_price * 100)
-            # Determinar si está por encima o por debajo
-            if current_price > long_entry:
-                long_distance_text = f"+{distance_pct:.2f}%"  # Precio por encima del entry
-            else:
-                long_distance_text = f"-{distance_pct:.2f}%"  # Precio por debajo del entry (activado)
-
-        # Calcular distancia SHORT (misma fórmula que el Oráculo)
-        short_distance_text = "---"
-        if coin["short_entry"]:
-            short_entry = coin["short_entry"]
-            distance_pct = abs((short_entry - current_price) / current_price * 100)
-            # Determinar si está por encima o por debajo
-            if current_price < short_entry:
-                short_distance_text = f"-{distance_pct:.2f}%"  # Precio por debajo del entry
-            else:
-                short_distance_text = f"+{distance_pct:.2f}%"  # Precio por encima del entry (activado)
-
-        # Actualizar tabla
-        for item in self.tree.get_children():
-            values = self.tree.item(item)['values']
-            if values[0] == symbol:
-                self.tree.item(item, values=(
-                    values[0],
-                    long_distance_text,   # Distancia Long
-                    short_distance_text,  # Distancia Short
-                    values[3],            # Long Entry
-                    values[4],            # Long SL
-                    values[5],            # Short Entry
-                    values[6]             # Short SL
-                ))
-                break
-
-    def check_price_levels(self, symbol, current_price):
-        """Verifica si el precio alcanzó algún nivel de entrada"""
-        coin = self.monitored_coins[symbol]
-
-        # Verificar LONG Entry
-        if coin["long_entry"] and coin["long_sl"]:
-            signal_key = f"{symbol}_LONG"
-            if signal_key not in self.triggered_signals and current_price <= coin["long_entry"]:
-                self.log(f"🟢 {symbol}: Precio {current_price:.8f} alcanzó LONG Entry {coin['long_entry']}")
-                self.send_signal_to_bot_2a1(symbol, "long", coin["long_entry"], coin["long_sl"])
-                self.triggered_signals.add(signal_key)
-                # Marcar en rojo y eliminar después de 3 segundos
-                self.mark_and_remove_coin(symbol)
-                return  # Salir para no verificar SHORT
-
-        # Verificar SHORT Entry
-        if coin["short_entry"] and coin["short_sl"]:
-            signal_key = f"{symbol}_SHORT"
-            if signal_key not in self.triggered_signals and current_price >= coin["short_entry"]:
-                self.log(f"🔴 {symbol}: Precio {current_price:.8f} alcanzó SHORT Entry {coin['short_entry']}")
-                self.send_signal_to_bot_2a1(symbol, "short", coin["short_entry"], coin["short_sl"])
-                self.triggered_signals.add(signal_key)
-                # Marcar en rojo y eliminar después de 3 segundos
-                self.mark_and_remove_coin(symbol)
-                return  # Salir
-
-    def mark_and_remove_coin(self, symbol):
-        """Marca la moneda en rojo y la elimina después de 3 segundos"""
-        # Marcar en rojo en la tabla
-        for item in self.tree.get_children():
-            values = self.tree.item(item)['values']
-            if values[0] == symbol:
-                self.tree.item(item, tags=('triggered',))
-                self.tree.tag_configure('triggered', background='#ff5555', foreground='#ffffff')
-                break
-
-        self.log(f"🔴 {symbol} marcado - Se eliminará en 3 segundos...")
-
-        # Programar eliminación después de 3 segundos
-        threading.Timer(3.0, lambda: self.remove_coin_from_monitoring(symbol)).start()
-
-    def remove_coin_from_monitoring(self, symbol):
-        """Elimina la moneda del monitoreo y de la base de datos"""
-        try:
-            # Eliminar de la base de datos
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM monitored_coins WHERE symbol=?", (symbol,))
-            conn.commit()
-            conn.close()
-
-            # Eliminar del diccionario
-            if symbol in self.monitored_coins:
-                del self.monitored_coins[symbol]
-
-            # Eliminar de la tabla
-            for item in self.tree.get_children():
-                values = self.tree.item(item)['values']
-                if values[0] == symbol:
-                    self.tree.delete(item)
-                    break
-
-            self.log(f"🗑️ {symbol} eliminado del monitoreo")
-
-        except Exception as e:
-            self.log(f"❌ Error al eliminar {symbol}: {e}")
-
-    def send_signal_to_bot_2a1(self, symbol, side, entry_price, sl_price):
-        """Envía la señal al Bot 2 a 1"""
-        try:
-            # Calcular distancia del SL en porcentaje
-            if side == "long":
-                distancia_sl = ((entry_price - sl_price) / entry_price) * 100
-            else:  # short
-                distancia_sl = ((sl_price - entry_price) / entry_price) * 100
-
-            # Preparar datos
-            url = f"{BOT_2A1_URL}/signal"
-            data = {
-                "symbol": symbol,
-                "side": side,
-                "distancia_sl": round(distancia_sl, 2)
-            }
-
-            self.log(f"📡 Enviando señal al Bot 2 a 1: {symbol} {side.upper()} (SL: {distancia_sl:.2f}%)")
-
-            # Enviar señal
-            response = requests.post(url, json=data, timeout=10)
-            resultado = response.json()
-
-            if response.status_code == 200:
-                if resultado['status'] == 'success':
-                    self.log(f"✅ Señal enviada exitosamente: {resultado['message']}")
-                    # Removido messagebox para no bloquear el monitoreo
-                elif resultado['status'] == 'ignored':
-                    self.log(f"⚠️ Señal ignorada: {resultado['message']}")
-                elif resultado['status'] == 'rejected':
-                    self.log(f"⚠️ Señal rechazada: {resultado['message']}")
-            else:
-                self.log(f"❌ Error al enviar señal: {resultado['message']}")
-
-        except Exception as e:
-            self.log(f"❌ Error al enviar señal al Bot 2 a 1: {e}")
-            # Removido messagebox para no bloquear el monitoreo
+        self.monitoring = False
+        self.pintar_monitoreo()
 
 
 # ===== MAIN =====
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ventana del Oráculo (cliente de oraculo_servicio.py)")
+    parser.add_argument("--url", default=ORACULO_URL, help="Servicio del Oráculo; si no responde, se levanta uno propio ahí")
+    parser.add_argument("--db", default=oraculo_motor.DATABASE_FILE, help="Base de datos del Oráculo propio")
+    parser.add_argument("--ws-url", default=BINANCE_WS_URL, help="Streams de precios del Oráculo propio (pruebas)")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = MonitorBinanceBot(root)
+    app = MonitorBinanceBot(root, args.url, args.db, args.ws_url)
     root.mainloop()
@@ -0,0 +1,111 @@
+"""
+🎭 ACTORES POR SÍMBOLO - UN BUZÓN POR MONEDA SOBRE UN POOL COMPARTIDO
+Cada symbol tiene un actor que procesa sus mensajes (precios, señales, cierres) de a uno
+y en orden, así su estado nunca se toca desde dos hilos a la vez. Los actores no tienen hilo
+propio: se ejecutan en un pool acotado, que además limita las llamadas simultáneas al exchange.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metricas import observar
+
+MENSAJES_POR_TURNO = 8  # Tras este lote el actor cede el hilo a otros actores
+
+
+class ActorSimbolo:
+    """
+    Buzón de un symbol. Los precios consecutivos se fusionan: si llegan varios antes de
+    procesarse, solo se evalúa el último (sin adelantarse a señales o cierres ya encolados)
+    """
+
+    def __init__(self, symbol, planificador):
+        self.symbol = symbol
+        self.planificador = planificador
+        self.buzon = deque()  # [funcion, args, momento_recibido, es_precio]
+        self.precio_pendiente = None  # Último mensaje de precio aún en el buzón
+        self.programado = False
+        self.procesados = 0
+        self._lock = threading.Lock()
+
+    def enviar(self, funcion, *args):
+        """Encola un mensaje (señal, cierre...) que se procesará en orden de llegada"""
+        with self._lock:
+            self.buzon.append([funcion, args, time.perf_counter(), False])
+            self.precio_pendiente = None
+            self._programar()
+
+    def enviar_precio(self, funcion, *args):
+        """Encola un precio; reemplaza al anterior si todavía no se procesó"""
+        with self._lock:
+            if self.precio_pendiente is not None:
+                self.precio_pendiente[1] = args
+                self.precio_pendiente[2] = time.perf_counter()
+            else:
+                self.precio_pendiente = [funcion, args, time.perf_counter(), True]
+                self.buzon.append(self.precio_pendiente)
+            self._programar()
+
+    def pendientes(self):
+        with self._lock:
+            return len(self.buzon)
+
+    def _programar(self):
+        if not self.programado:
+            self.programado = True
+            self.planificador.ejecutor.submit(self._procesar)
+
+    def _procesar(self):
+        for _ in range(MENSAJES_POR_TURNO):
+            with self._lock:
+                if not self.buzon:
+                    self.programado = False
+                    return
+                mensaje = self.buzon.popleft()
+                if mensaje is self.precio_pendiente:
+                    self.precio_pendiente = None
+            funcion, args, recibido, es_precio = mensaje
+
+            try:
+                funcion(*args)
+            except Exception as e:
+                print(f"❌ Error en el actor de {self.symbol}: {e}")
+            self.procesados += 1
+            if es_precio:
+                observar("bot_proteccion_precio_segundos", time.perf_counter() - recibido)
+
+        # Quedan mensajes: vuelve a la cola del pool para no acaparar un hilo
+        with self._lock:
+            if self.buzon:
+                self.planificador.ejecutor.submit(self._procesar)
+            else:
+                self.programado = False
+
+
+class PlanificadorActores:
+    """Registro de actores por symbol y pool de hilos compartido que los ejecuta"""
+
+    def __init__(self, hilos):
+        self.hilos = hilos
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="actor")
+        self.actores = {}
+        self._lock = threading.Lock()
+
+    def actor(self, symbol):
+        actor = self.actores.get(symbol)
+        if actor is None:
+            with self._lock:
+                actor = self.actores.setdefault(symbol, ActorSimbolo(symbol, self))
+        return actor
+
+    def metricas(self):
+        with self._lock:
+            actores = list(self.actores.values())
+        return {
+            "actores": len(actores),
+            "hilos": self.hilos,
+            "actores_activos": sum(1 for actor in actores if actor.programado),
+            "mensajes_pendientes": sum(actor.pendientes() for actor in actores),
+        }
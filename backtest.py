@@ -0,0 +1,259 @@
+"""
+🧪 BACKTEST VECTORIZADO - REGLAS 2:1 Y PROTECCIÓN PROGRESIVA
+Reproduce series OHLC o de ticks desde archivos locales con las mismas reglas del Bot 2 a 1
+(reglas.py). Cada archivo es un symbol-day; todos se simulan a la vez con NumPy.
+
+Uso:
+    python backtest.py datos/ --side long --distancia-sl 1.5
+    python backtest.py datos/ --side ambos --salida trades.csv
+    python backtest.py --consistencia
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import reglas
+
+# Parámetros por defecto (los mismos que Bot_2_a_1.py)
+MONTO_BASE_USDT = 100.0
+MARGEN_EXTRA_SL = 0.5
+MARGEN_PROTECCION_PROGRESIVA = 2.0
+
+# Motivo de salida de cada trade
+SALIDA_SL_INICIAL = 0
+SALIDA_SL_PROTEGIDO = 1
+SALIDA_FIN_DATOS = 2
+
+
+# ===== CARGA DE DATOS =====
+def cargar_serie(ruta):
+    """
+    Lee un CSV con columnas open,high,low,close (OHLC) o una sola columna de precios (ticks).
+    Devuelve un array (n_barras, 4) para OHLC o (n_ticks,) para ticks.
+    """
+    with open(ruta) as archivo:
+        cabecera = archivo.readline().strip().lower().split(",")
+    columnas = [c.strip() for c in cabecera]
+
+    if {"open", "high", "low", "close"} <= set(columnas):
+        indices = [columnas.index(c) for c in ("open", "high", "low", "close")]
+        return np.loadtxt(ruta, delimiter=",", skiprows=1, usecols=indices, ndmin=2)
+
+    # Ticks: la columna "price" o la última columna
+    indice = columnas.index("price") if "price" in columnas else len(columnas) - 1
+    return np.loadtxt(ruta, delimiter=",", skiprows=1, usecols=[indice], ndmin=1)
+
+
+def ohlc_a_recorrido(barras, es_long):
+    """
+    Convierte barras OHLC en un recorrido de precios por barra, en el orden pesimista
+    para la posición: LONG open→low→high→close, SHORT open→high→low→close
+    """
+    abiertos, altos, bajos, cierres = barras[:, 0], barras[:, 1], barras[:, 2], barras[:, 3]
+    primero, segundo = (bajos, altos) if es_long else (altos, bajos)
+    return np.column_stack([abiertos, primero, segundo, cierres]).ravel()
+
+
+def construir_matriz(recorridos, destino=None):
+    """
+    Apila recorridos de distinta longitud en una matriz (n_caminos, n_pasos) repitiendo el último precio.
+    Con destino (p. ej. un array sobre memoria compartida) se rellena ese array en lugar de crear uno.
+    """
+    largo = max(len(r) for r in recorridos)
+    matriz = np.empty((len(recorridos), largo)) if destino is None else destino
+    for i, recorrido in enumerate(recorridos):
+        matriz[i, :len(recorrido)] = recorrido
+        matriz[i, len(recorrido):] = recorrido[-1]
+    return matriz
+
+
+# ===== SIMULACIÓN VECTORIZADA =====
+def simular(precios, es_long, distancia_sl, margen_progresivo=MARGEN_PROTECCION_PROGRESIVA,
+            monto_base=MONTO_BASE_USDT):
+    """
+    Simula todas las operaciones a la vez. precios es (n_caminos, n_pasos); cada camino entra
+    a mercado en precios[:, 0]. es_long y distancia_sl (SL final en %, ya con el margen extra)
+    son escalares o arrays de n_caminos.
+
+    En cada paso, igual que en vivo: primero el exchange ejecuta el SL si el precio lo cruza
+    y después el bot evalúa la protección con ese mismo precio.
+    """
+    n_caminos, n_pasos = precios.shape
+    es_long = np.broadcast_to(np.asarray(es_long, dtype=bool), (n_caminos,))
+    distancia_sl = np.broadcast_to(np.asarray(distancia_sl, dtype=float), (n_caminos,))
+    signo = np.where(es_long, 1.0, -1.0)
+
+    entrada = precios[:, 0].copy()
+    d = distancia_sl / 100
+    sl = entrada * (1 - signo * d)                      # reglas.calcular_precio_sl_inicial
+    objetivo_1a1 = entrada * (1 + signo * d * 2)        # reglas.calcular_precio_proteccion_1a1
+    sl_1a1 = entrada * (1 + signo * d)                  # reglas.calcular_precio_sl_1a1
+    maximo = entrada.copy()
+    con_stop = np.zeros(n_caminos, dtype=bool)
+    activo = np.ones(n_caminos, dtype=bool)
+    salida = np.full(n_caminos, np.nan)
+    paso_salida = np.full(n_caminos, n_pasos - 1)
+    motivo = np.full(n_caminos, SALIDA_FIN_DATOS)
+
+    for t in range(1, n_pasos):
+        if not activo.any():
+            break
+        p = precios[:, t]
+
+        # SL ejecutado por el exchange
+        tocado = activo & (signo * (p - sl) <= 0)
+        if tocado.any():
+            salida[tocado] = sl[tocado]
+            paso_salida[tocado] = t
+            motivo[tocado] = np.where(con_stop[tocado], SALIDA_SL_PROTEGIDO, SALIDA_SL_INICIAL)
+            activo &= ~tocado
+
+        # FASE 1: protección 1:1
+        fase1 = activo & ~con_stop & (signo * (p - objetivo_1a1) >= 0)
+
+        # FASE 2: protección progresiva (solo posiciones que ya tenían la 1:1)
+        avance = signo * (p - maximo) / maximo * 100
+        fase2 = activo & con_stop & (avance > 0) & (avance >= margen_progresivo)
+
+        sl = np.where(fase1, sl_1a1, np.where(fase2, maximo, sl))
+        maximo = np.where(fase1 | fase2, p, maximo)
+        con_stop |= fase1
+
+    # Posiciones abiertas al final de los datos: se cierran al último precio
+    salida = np.where(np.isnan(salida), precios[:, -1], salida)
+
+    monto = monto_base / distancia_sl                   # reglas.calcular_monto_operacion
+    retorno = signo * (salida - entrada) / entrada
+    pnl = monto * retorno
+    return {
+        "es_long": es_long.copy(),
+        "distancia_sl": distancia_sl.copy(),
+        "entrada": entrada,
+        "salida": salida,
+        "paso_salida": paso_salida,
+        "motivo": motivo,
+        "pnl_usdt": pnl,
+        "r": pnl / (monto_base / 100),  # 1R = pérdida del SL inicial = monto_base / 100
+    }
+
+
+def resumen(trades):
+    """Estadísticas agregadas de los trades"""
+    pnl = trades["pnl_usdt"]
+    ganadores = pnl > 0
+    n = len(pnl)
+    return {
+        "trades": n,
+        "win_rate": float(ganadores.mean()) if n else 0.0,
+        "expectancy_usdt": float(pnl.mean()) if n else 0.0,
+        "expectancy_r": float(trades["r"].mean()) if n else 0.0,
+        "pnl_total_usdt": float(pnl.sum()),
+        "ganancia_media_usdt": float(pnl[ganadores].mean()) if ganadores.any() else 0.0,
+        "perdida_media_usdt": float(pnl[~ganadores].mean()) if (~ganadores).any() else 0.0,
+        "salidas_sl_inicial": int((trades["motivo"] == SALIDA_SL_INICIAL).sum()),
+        "salidas_sl_protegido": int((trades["motivo"] == SALIDA_SL_PROTEGIDO).sum()),
+        "salidas_fin_datos": int((trades["motivo"] == SALIDA_FIN_DATOS).sum()),
+    }
+
+
+# ===== REFERENCIA ESCALAR (reglas en vivo) =====
+def simular_escalar(recorrido, side, distancia_sl, margen_progresivo=MARGEN_PROTECCION_PROGRESIVA):
+    """Simula un solo camino paso a paso con reglas.evaluar_proteccion, igual que el bot en vivo"""
+    entrada = recorrido[0]
+    sl = reglas.calcular_precio_sl_inicial(entrada, distancia_sl, side)
+    maximo = entrada
+    con_stop = False
+    for t in range(1, len(recorrido)):
+        p = recorrido[t]
+        if (side == "Buy" and p <= sl) or (side == "Sell" and p >= sl):
+            return sl, t
+        accion, nuevo_sl = reglas.evaluar_proteccion(side, entrada, maximo, distancia_sl, con_stop, p, margen_progresivo)
+        if accion is not None:
+            sl = nuevo_sl
+            maximo = p
+            con_stop = True
+    return recorrido[-1], len(recorrido) - 1
+
+
+def verificar_consistencia(n_caminos=500, n_pasos=2000, semilla=0):
+    """Compara el motor vectorizado con las reglas en vivo sobre caminos aleatorios"""
+    rng = np.random.default_rng(semilla)
+    retornos = rng.normal(0, 0.004, size=(n_caminos, n_pasos))
+    precios = 100 * np.exp(np.cumsum(retornos, axis=1))
+    es_long = rng.random(n_caminos) < 0.5
+    distancia_sl = rng.uniform(0.5, 4.0, n_caminos)
+
+    trades = simular(precios, es_long, distancia_sl)
+    errores = 0
+    for i in range(n_caminos):
+        salida, paso = simular_escalar(precios[i], "Buy" if es_long[i] else "Sell", distancia_sl[i])
+        if paso != trades["paso_salida"][i] or not np.isclose(salida, trades["salida"][i], rtol=1e-12):
+            errores += 1
+    return errores
+
+
+# ===== CLI =====
+def main():
+    parser = argparse.ArgumentParser(description="Backtest vectorizado de las reglas del Bot 2 a 1")
+    parser.add_argument("datos", nargs="?", help="Archivo CSV o carpeta con un CSV por symbol-day")
+    parser.add_argument("--side", choices=["long", "short", "ambos"], default="ambos")
+    parser.add_argument("--distancia-sl", type=float, default=1.5, help="SL del Oráculo en % (sin margen extra)")
+    parser.add_argument("--margen-extra-sl", type=float, default=MARGEN_EXTRA_SL)
+    parser.add_argument("--margen-progresivo", type=float, default=MARGEN_PROTECCION_PROGRESIVA)
+    parser.add_argument("--monto-base", type=float, default=MONTO_BASE_USDT)
+    parser.add_argument("--salida", help="CSV donde guardar los trades")
+    parser.add_argument("--consistencia", action="store_true", help="Comparar el motor vectorizado con las reglas en vivo")
+    args = parser.parse_args()
+
+    if args.consistencia:
+        errores = verificar_consistencia()
+        print("✅ Motor vectorizado consistente con las reglas en vivo" if errores == 0
+              else f"❌ {errores} caminos no coinciden con las reglas en vivo")
+        return
+
+    if not args.datos:
+        parser.error("falta la ruta de datos")
+
+    if os.path.isdir(args.datos):
+        rutas = sorted(os.path.join(args.datos, f) for f in os.listdir(args.datos) if f.endswith(".csv"))
+    else:
+        rutas = [args.datos]
+
+    sides = {"long": [True], "short": [False], "ambos": [True, False]}[args.side]
+    series = [cargar_serie(ruta) for ruta in rutas]
+    recorridos, es_long, nombres = [], [], []
+    for ruta, serie in zip(rutas, series):
+        for lado in sides:
+            recorridos.append(ohlc_a_recorrido(serie, lado) if serie.ndim == 2 else serie)
+            es_long.append(lado)
+            nombres.append(os.path.basename(ruta))
+
+    inicio = time.perf_counter()
+    precios = construir_matriz(recorridos)
+    trades = simular(
+        precios, np.array(es_long), args.distancia_sl + args.margen_extra_sl,
+        args.margen_progresivo, args.monto_base,
+    )
+    duracion = time.perf_counter() - inicio
+
+    for clave, valor in resumen(trades).items():
+        print(f"{clave}: {valor:.4f}" if isinstance(valor, float) else f"{clave}: {valor}")
+    print(f"⏱️ {len(recorridos)} trades ({precios.shape[1]} pasos) simulados en {duracion:.3f}s")
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            archivo.write("archivo,side,entrada,salida,paso_salida,motivo,pnl_usdt,r\n")
+            for i, nombre in enumerate(nombres):
+                archivo.write(
+                    f"{nombre},{'long' if trades['es_long'][i] else 'short'},{trades['entrada'][i]},"
+                    f"{trades['salida'][i]},{trades['paso_salida'][i]},{trades['motivo'][i]},"
+                    f"{trades['pnl_usdt'][i]:.6f},{trades['r'][i]:.6f}\n"
+                )
+        print(f"💾 Trades guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
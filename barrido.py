@@ -0,0 +1,415 @@
+"""
+🔬 BARRIDO DE PARÁMETROS - BACKTEST MULTI-NÚCLEO
+Busca margen_extra_sl, margen_proteccion_progresiva, cooldown_minutos y monto_base_usdt
+con el motor vectorizado de backtest.py, repartiendo el trabajo en un pool de procesos.
+
+Datos:
+- Una carpeta con un CSV de velas de 1 minuto por moneda (<SYMBOL>.csv con open,high,low,close)
+- Un CSV de señales (symbol,minuto,side,distancia_sl), o --senales-cada N para generar
+  una señal long y una short cada N minutos
+
+Los caminos de precio de todas las señales se cargan una vez en memoria compartida y los
+trabajadores los leen sin copiarlos. Los resultados se escriben por partes en formato columnar
+(.npz) dentro de la carpeta de salida; si el barrido se interrumpe, al relanzarlo continúa
+donde se quedó.
+
+Uso:
+    python barrido.py datos/ --senales senales.csv --salida barrido_resultados/
+    python barrido.py datos/ --senales-cada 240 --aleatorio 500 --procesos 8
+    python barrido.py datos/ --senales-cada 240 --benchmark
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import signal
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from backtest import MONTO_BASE_USDT, cargar_serie, construir_matriz, ohlc_a_recorrido, simular
+
+PASOS_POR_BARRA = 4  # open, low/high, high/low, close
+
+# Espacio de búsqueda por defecto (grilla). Con --espacio se carga uno propio en JSON:
+# listas para grilla o {"min": x, "max": y} para búsqueda aleatoria
+ESPACIO_POR_DEFECTO = {
+    "margen_extra_sl": [0.25, 0.5, 0.75, 1.0],
+    "margen_proteccion_progresiva": [1.0, 1.5, 2.0, 2.5, 3.0],
+    "cooldown_minutos": [0, 30, 60, 120, 240],
+    "monto_base_usdt": [float(MONTO_BASE_USDT)],
+}
+PARAMETROS = ("margen_extra_sl", "margen_proteccion_progresiva", "cooldown_minutos", "monto_base_usdt")
+METRICAS = ("trades", "win_rate", "expectancy_usdt", "expectancy_r", "pnl_total_usdt", "max_drawdown_usdt")
+
+RESULTADOS_POR_PARTE = 200
+SEGUNDOS_POR_PARTE = 10  # como mucho se pierden estos segundos de trabajo si se interrumpe
+
+
+# ===== DATOS =====
+def cargar_barras(carpeta):
+    """Carga {symbol: velas (n, 4)} desde una carpeta con un CSV por moneda"""
+    barras = {}
+    for archivo in sorted(os.listdir(carpeta)):
+        if archivo.endswith(".csv"):
+            serie = cargar_serie(os.path.join(carpeta, archivo))
+            if serie.ndim == 2:
+                barras[archivo[:-4].upper()] = serie
+    return barras
+
+
+def cargar_senales(ruta):
+    """Lee señales symbol,minuto,side,distancia_sl (side: long/short o Buy/Sell)"""
+    senales = []
+    with open(ruta) as archivo:
+        columnas = [c.strip().lower() for c in archivo.readline().split(",")]
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            fila = dict(zip(columnas, (v.strip() for v in linea.split(","))))
+            senales.append((
+                fila["symbol"].upper(),
+                int(fila["minuto"]),
+                fila["side"].lower() in ("long", "buy"),
+                float(fila["distancia_sl"]),
+            ))
+    return senales
+
+
+def generar_senales(barras, cada, distancia_sl):
+    """Una señal long y una short cada `cada` minutos en cada moneda"""
+    senales = []
+    for symbol, velas in barras.items():
+        for minuto in range(0, len(velas), cada):
+            senales.append((symbol, minuto, True, distancia_sl))
+            senales.append((symbol, minuto, False, distancia_sl))
+    return senales
+
+
+def preparar_caminos(barras, senales, horizonte, destino=None):
+    """
+    Ordena las señales por (symbol, minuto) y construye la matriz de caminos de precio
+    (una fila por señal, horizonte velas). Devuelve (matriz, metadatos)
+    """
+    senales = sorted(
+        (s for s in senales if s[0] in barras and 0 <= s[1] < len(barras[s[0]])),
+        key=lambda s: (s[0], s[1], not s[2]),
+    )
+    if not senales:
+        raise ValueError("No hay señales con datos de precio")
+
+    recorridos = [
+        ohlc_a_recorrido(barras[symbol][minuto:minuto + horizonte], es_long)
+        for symbol, minuto, es_long, _ in senales
+    ]
+    simbolos = sorted({s[0] for s in senales})
+    indice_simbolo = {symbol: i for i, symbol in enumerate(simbolos)}
+    metadatos = {
+        "simbolo": np.array([indice_simbolo[s[0]] for s in senales], dtype=np.int32),
+        "minuto": np.array([s[1] for s in senales], dtype=np.int64),
+        "es_long": np.array([s[2] for s in senales], dtype=bool),
+        "distancia_sl": np.array([s[3] for s in senales], dtype=float),
+    }
+    return construir_matriz(recorridos, destino), metadatos
+
+
+def forma_caminos(barras, senales, horizonte):
+    """Forma que tendrá la matriz de caminos (para reservar la memoria compartida)"""
+    validas = [s for s in senales if s[0] in barras and 0 <= s[1] < len(barras[s[0]])]
+    largo = max(min(horizonte, len(barras[s[0]]) - s[1]) for s in validas) * PASOS_POR_BARRA
+    return len(validas), largo
+
+
+# ===== ESPACIO DE BÚSQUEDA =====
+def generar_combinaciones(espacio, aleatorio=0, semilla=0):
+    """Lista de dicts de parámetros: grilla completa o `aleatorio` muestras uniformes"""
+    if aleatorio:
+        rng = random.Random(semilla)
+        combinaciones = []
+        for _ in range(aleatorio):
+            combinacion = {}
+            for parametro in PARAMETROS:
+                valores = espacio[parametro]
+                if isinstance(valores, dict):
+                    valor = rng.uniform(valores["min"], valores["max"])
+                    combinacion[parametro] = round(valor) if parametro == "cooldown_minutos" else valor
+                else:
+                    combinacion[parametro] = rng.choice(valores)
+            combinaciones.append(combinacion)
+        return combinaciones
+
+    return [dict(zip(PARAMETROS, valores)) for valores in itertools.product(*(espacio[p] for p in PARAMETROS))]
+
+
+def agrupar_trabajos(combinaciones, hechos):
+    """
+    Agrupa las combinaciones pendientes por (margen_extra_sl, margen_proteccion_progresiva):
+    la simulación solo depende de esos dos; cooldown y monto se aplican después sobre los trades
+    """
+    grupos = {}
+    for id_combinacion, c in enumerate(combinaciones):
+        if id_combinacion in hechos:
+            continue
+        clave = (c["margen_extra_sl"], c["margen_proteccion_progresiva"])
+        grupos.setdefault(clave, []).append((id_combinacion, c["cooldown_minutos"], c["monto_base_usdt"]))
+    return [(margen_extra, margen_progresivo, lista) for (margen_extra, margen_progresivo), lista in grupos.items()]
+
+
+# ===== TRABAJADORES =====
+_trabajador = {}
+
+
+def _iniciar_trabajador(nombre_memoria, forma, metadatos):
+    """Se engancha a la memoria compartida con los caminos de precio (sin copiarlos)"""
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    _trabajador["memoria"] = memoria
+    _trabajador["precios"] = np.ndarray(forma, dtype=np.float64, buffer=memoria.buf)
+    _trabajador.update(metadatos)
+
+
+def filtrar_senales(simbolo, minuto, minuto_salida, cooldown_minutos):
+    """
+    Aplica las reglas de entrada del bot sobre las señales ordenadas por (symbol, minuto):
+    se descarta la señal si la moneda está en cooldown o si ya hay una posición abierta en ella
+    """
+    simbolo, minuto, minuto_salida = simbolo.tolist(), minuto.tolist(), minuto_salida.tolist()
+    aceptadas = []
+    simbolo_actual = -1
+    ultima_entrada = ultima_salida = 0
+    for i in range(len(minuto)):
+        if simbolo[i] != simbolo_actual:
+            simbolo_actual = simbolo[i]
+            aceptadas.append(i)
+            ultima_entrada, ultima_salida = minuto[i], minuto_salida[i]
+        elif minuto[i] - ultima_entrada >= cooldown_minutos and minuto[i] > ultima_salida:
+            aceptadas.append(i)
+            ultima_entrada, ultima_salida = minuto[i], minuto_salida[i]
+    return np.array(aceptadas, dtype=np.int64)
+
+
+def metricas_trades(pnl, orden_salida):
+    """Métricas agregadas de un conjunto de trades (pnl en USDT)"""
+    n = len(pnl)
+    if n == 0:
+        return {"trades": 0, "win_rate": 0.0, "expectancy_usdt": 0.0, "pnl_total_usdt": 0.0, "max_drawdown_usdt": 0.0}
+    curva = np.cumsum(pnl[orden_salida])
+    drawdown = np.maximum.accumulate(np.maximum(curva, 0)) - curva
+    return {
+        "trades": n,
+        "win_rate": float((pnl > 0).mean()),
+        "expectancy_usdt": float(pnl.mean()),
+        "pnl_total_usdt": float(curva[-1]),
+        "max_drawdown_usdt": float(drawdown.max()),
+    }
+
+
+def evaluar_grupo(trabajo):
+    """Simula una vez por (margen_extra_sl, margen_proteccion_progresiva) y evalúa cada cooldown/monto"""
+    margen_extra, margen_progresivo, combinaciones = trabajo
+    datos = _trabajador
+    trades = simular(datos["precios"], datos["es_long"], datos["distancia_sl"] + margen_extra, margen_progresivo, 1.0)
+    minuto_salida = datos["minuto"] + trades["paso_salida"] // PASOS_POR_BARRA
+
+    resultados = []
+    aceptadas_por_cooldown = {}
+    for id_combinacion, cooldown, monto in combinaciones:
+        if cooldown not in aceptadas_por_cooldown:
+            aceptadas_por_cooldown[cooldown] = filtrar_senales(datos["simbolo"], datos["minuto"], minuto_salida, cooldown)
+        aceptadas = aceptadas_por_cooldown[cooldown]
+
+        pnl = trades["pnl_usdt"][aceptadas] * monto
+        fila = metricas_trades(pnl, np.argsort(minuto_salida[aceptadas], kind="stable"))
+        fila["expectancy_r"] = float(trades["r"][aceptadas].mean()) if len(aceptadas) else 0.0
+        fila["id"] = id_combinacion
+        resultados.append(fila)
+    return resultados
+
+
+# ===== RESULTADOS (COLUMNAR, REANUDABLE) =====
+def leer_partes(carpeta):
+    """Carga todas las partes ya escritas como columnas {nombre: array}"""
+    partes = sorted(f for f in os.listdir(carpeta) if f.startswith("parte_") and f.endswith(".npz"))
+    columnas = {}
+    for parte in partes:
+        with np.load(os.path.join(carpeta, parte)) as datos:
+            for nombre in datos.files:
+                columnas.setdefault(nombre, []).append(datos[nombre])
+    return {nombre: np.concatenate(valores) for nombre, valores in columnas.items()}, len(partes)
+
+
+def escribir_parte(carpeta, numero, filas, combinaciones):
+    """Escribe un bloque de resultados como .npz columnar (escritura atómica)"""
+    columnas = {"id": np.array([f["id"] for f in filas], dtype=np.int64)}
+    for parametro in PARAMETROS:
+        columnas[parametro] = np.array([combinaciones[f["id"]][parametro] for f in filas], dtype=float)
+    for metrica in METRICAS:
+        columnas[metrica] = np.array([f[metrica] for f in filas], dtype=np.int64 if metrica == "trades" else float)
+
+    ruta = os.path.join(carpeta, f"parte_{numero:05d}.npz")
+    temporal = ruta + ".tmp.npz"
+    np.savez_compressed(temporal, **columnas)
+    os.replace(temporal, ruta)
+
+
+def preparar_salida(carpeta, definicion):
+    """Crea la carpeta de salida o comprueba que la definición del barrido no cambió. Devuelve ids hechos"""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_definicion = os.path.join(carpeta, "barrido.json")
+    if os.path.exists(ruta_definicion):
+        with open(ruta_definicion) as archivo:
+            if json.load(archivo) != definicion:
+                raise ValueError(f"La definición del barrido cambió respecto a la guardada en {ruta_definicion}")
+    else:
+        with open(ruta_definicion, "w") as archivo:
+            json.dump(definicion, archivo, indent=2)
+
+    columnas, numero_partes = leer_partes(carpeta)
+    hechos = set(columnas["id"].tolist()) if columnas else set()
+    return hechos, numero_partes
+
+
+# ===== EJECUCIÓN =====
+def publicar_caminos(barras, senales, horizonte):
+    """Construye los caminos directamente en memoria compartida. Devuelve (memoria, forma, metadatos)"""
+    forma = forma_caminos(barras, senales, horizonte)
+    memoria = shared_memory.SharedMemory(create=True, size=max(int(np.prod(forma)) * 8, 1))
+    try:
+        destino = np.ndarray(forma, dtype=np.float64, buffer=memoria.buf)
+        _, metadatos = preparar_caminos(barras, senales, horizonte, destino)
+    except Exception:
+        memoria.close()
+        memoria.unlink()
+        raise
+    return memoria, forma, metadatos
+
+
+def ejecutar(memoria, forma, metadatos, trabajos, procesos, al_recibir=None):
+    """
+    Reparte los grupos en un pool cuyos trabajadores leen los caminos de la memoria compartida.
+    al_recibir(filas) se llama en el proceso principal con cada grupo terminado. Devuelve evaluaciones
+    """
+    evaluaciones = 0
+    with Pool(procesos, initializer=_iniciar_trabajador, initargs=(memoria.name, forma, metadatos)) as pool:
+        for filas in pool.imap_unordered(evaluar_grupo, trabajos):
+            evaluaciones += len(filas)
+            if al_recibir:
+                al_recibir(filas)
+    return evaluaciones
+
+
+def benchmark(memoria, forma, metadatos, combinaciones, max_procesos):
+    """Evaluaciones por segundo con 1, 2, 4... procesos"""
+    trabajos = agrupar_trabajos(combinaciones, set())
+    procesos = 1
+    base = None
+    while True:
+        inicio = time.perf_counter()
+        evaluaciones = ejecutar(memoria, forma, metadatos, trabajos, procesos)
+        por_segundo = evaluaciones / (time.perf_counter() - inicio)
+        base = base or por_segundo
+        print(f"⚙️ {procesos} procesos: {por_segundo:.1f} evaluaciones/s (x{por_segundo / base:.2f})")
+        if procesos >= max_procesos:
+            break
+        procesos = min(procesos * 2, max_procesos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros del Bot 2 a 1 sobre el backtest vectorizado")
+    parser.add_argument("datos", help="Carpeta con un CSV de velas de 1 minuto por moneda")
+    parser.add_argument("--senales", help="CSV de señales symbol,minuto,side,distancia_sl")
+    parser.add_argument("--senales-cada", type=int, help="Generar una señal long y una short cada N minutos")
+    parser.add_argument("--distancia-sl", type=float, default=1.5, help="SL de las señales generadas en %%")
+    parser.add_argument("--horizonte", type=int, default=1440, help="Velas simuladas por señal como máximo")
+    parser.add_argument("--espacio", help="JSON con el espacio de búsqueda")
+    parser.add_argument("--aleatorio", type=int, default=0, help="Número de muestras aleatorias (0 = grilla)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    parser.add_argument("--salida", default="barrido_resultados", help="Carpeta de resultados")
+    parser.add_argument("--benchmark", action="store_true", help="Medir evaluaciones/s con distinto número de procesos")
+    args = parser.parse_args()
+
+    if not args.senales and not args.senales_cada:
+        parser.error("indica --senales o --senales-cada")
+
+    # SIGTERM también libera la memoria compartida y guarda lo ya evaluado
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+
+    espacio = dict(ESPACIO_POR_DEFECTO)
+    if args.espacio:
+        with open(args.espacio) as archivo:
+            espacio.update(json.load(archivo))
+    combinaciones = generar_combinaciones(espacio, args.aleatorio, args.semilla)
+
+    barras = cargar_barras(args.datos)
+    senales = cargar_senales(args.senales) if args.senales else generar_senales(barras, args.senales_cada, args.distancia_sl)
+    memoria, forma, metadatos = publicar_caminos(barras, senales, args.horizonte)
+    print(f"📊 {len(barras)} monedas, {forma[0]} señales, {len(combinaciones)} combinaciones")
+    try:
+        if args.benchmark:
+            benchmark(memoria, forma, metadatos, combinaciones, args.procesos)
+        else:
+            barrer(args, espacio, combinaciones, memoria, forma, metadatos)
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+def barrer(args, espacio, combinaciones, memoria, forma, metadatos):
+    """Barrido completo con resultados por partes y reanudación"""
+    definicion = {
+        "datos": os.path.abspath(args.datos),
+        "senales": os.path.abspath(args.senales) if args.senales else f"cada {args.senales_cada} min, SL {args.distancia_sl}%",
+        "horizonte": args.horizonte,
+        "espacio": espacio,
+        "aleatorio": args.aleatorio,
+        "semilla": args.semilla,
+    }
+    try:
+        hechos, numero_partes = preparar_salida(args.salida, definicion)
+    except ValueError as e:
+        print(f"❌ {e}. Usa otra carpeta de --salida")
+        return
+    trabajos = agrupar_trabajos(combinaciones, hechos)
+    if hechos:
+        print(f"♻️ Reanudando: {len(hechos)} combinaciones ya evaluadas")
+
+    pendientes = []
+    ultima_escritura = time.monotonic()
+
+    def guardar():
+        nonlocal numero_partes, ultima_escritura
+        if pendientes:
+            escribir_parte(args.salida, numero_partes, pendientes, combinaciones)
+            numero_partes += 1
+            pendientes.clear()
+        ultima_escritura = time.monotonic()
+
+    def al_recibir(filas):
+        pendientes.extend(filas)
+        if len(pendientes) >= RESULTADOS_POR_PARTE or time.monotonic() - ultima_escritura >= SEGUNDOS_POR_PARTE:
+            guardar()
+
+    inicio = time.perf_counter()
+    try:
+        evaluaciones = ejecutar(memoria, forma, metadatos, trabajos, args.procesos, al_recibir)
+    finally:
+        guardar()
+    duracion = time.perf_counter() - inicio
+    print(f"⏱️ {evaluaciones} evaluaciones en {duracion:.2f}s ({evaluaciones / max(duracion, 1e-9):.1f} evaluaciones/s, {args.procesos} procesos)")
+
+    columnas, _ = leer_partes(args.salida)
+    np.savez_compressed(os.path.join(args.salida, "resultados.npz"), **columnas)
+    mejores = np.argsort(-columnas["expectancy_r"])[:10]
+    print("🏆 Mejores combinaciones por expectancy (R):")
+    for i in mejores:
+        parametros = ", ".join(f"{p}={columnas[p][i]:g}" for p in PARAMETROS)
+        print(f"   {parametros} → {columnas['expectancy_r'][i]:.3f}R en {columnas['trades'][i]} trades, "
+              f"DD máx {columnas['max_drawdown_usdt'][i]:.2f} USDT")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+⏳ MICROBENCHMARK DEL COOLDOWN - GestorCooldown CON 100K SYMBOLS
+Mide el GestorCooldown del Bot 2 a 1 frente al dict + barrido cada 60 s de la versión anterior:
+  - registrar y consultar (en_cooldown) con N symbols en cooldown
+  - costo de una pasada del barrido anterior sobre N symbols
+  - retraso de cada expiración: el gestor libera cada symbol al vencer; el barrido, hasta 60 s tarde
+Comprueba que cada symbol se libera una sola vez, nunca antes de tiempo, y que un symbol re-registrado
+no se libera con su vencimiento viejo.
+
+Uso:
+    python bench_cooldown.py --simbolos 100000 --segundos 3
+"""
+
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from simulador_bybit import config_simulador
+from utilidades_prueba import percentil
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GestorCooldown del Bot 2 a 1 con muchos symbols")
+    parser.add_argument("--simbolos", type=int, default=100000)
+    parser.add_argument("--segundos", type=float, default=3, help="Ventana en la que vencen los cooldowns")
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(simbolos=1, latencia_ms=None)
+    from Bot_2_a_1 import GestorCooldown
+
+    n = args.simbolos
+    simbolos = [f"C{i:06d}USDT" for i in range(n)]
+    minutos = args.segundos / 60
+    errores = []
+
+    # ===== REGISTRAR Y CONSULTAR =====
+    gestor = GestorCooldown(minutos)
+    ahora = datetime.now()
+    # Vencimientos repartidos en la ventana: el symbol i operó hace i/n de la ventana
+    momentos = [ahora - timedelta(seconds=args.segundos * i / n * 0.9) for i in range(n)]
+    inicio = time.perf_counter()
+    for symbol, momento in zip(simbolos, momentos):
+        gestor.registrar(symbol, momento)
+    registrar = time.perf_counter() - inicio
+    esperado = dict(gestor._expiraciones)
+
+    # Los vencimientos cerca del borde de la ventana pueden caer mientras se consulta: cada resultado
+    # se contrasta con esperado en el intervalo [inicio, fin] de la pasada, no con "todos en cooldown"
+    desde = time.monotonic()
+    inicio = time.perf_counter()
+    activos = [gestor.en_cooldown(symbol) for symbol in simbolos]
+    consultar = time.perf_counter() - inicio
+    hasta = time.monotonic()
+    incorrectos = sum(1 for symbol, activo in zip(simbolos, activos)
+                      if (activo and esperado[symbol] <= desde) or (not activo and esperado[symbol] > hasta))
+
+    anterior = dict(zip(simbolos, momentos))  # Versión anterior: {symbol: timestamp_operacion}
+
+    def en_cooldown_anterior(symbol):
+        if symbol in anterior:
+            return (datetime.now() - anterior[symbol]).total_seconds() / 60 < minutos
+        return False
+
+    desde = datetime.now()
+    inicio = time.perf_counter()
+    activos_anterior = [en_cooldown_anterior(symbol) for symbol in simbolos]
+    consultar_anterior = time.perf_counter() - inicio
+    hasta = datetime.now()
+    vigencia = timedelta(minutes=minutos)
+    incorrectos_anterior = sum(1 for symbol, activo in zip(simbolos, activos_anterior)
+                               if (activo and anterior[symbol] + vigencia <= desde)
+                               or (not activo and anterior[symbol] + vigencia > hasta))
+
+    inicio = time.perf_counter()
+    tiempo_actual = datetime.now()
+    vencidos = [symbol for symbol, timestamp in anterior.items()
+                if (tiempo_actual - timestamp).total_seconds() / 60 >= minutos]
+    barrido = time.perf_counter() - inicio
+
+    print(f"🧪 {n:,} symbols en cooldown, vencen en {args.segundos:.0f} s")
+    print("=" * 78)
+    print(f"📥 registrar      | {registrar / n * 1e6:6.2f} µs/symbol ({registrar * 1000:.0f} ms en total)")
+    print(f"🔎 en_cooldown    | {consultar / n * 1e6:6.2f} µs/consulta (anterior: {consultar_anterior / n * 1e6:.2f} µs)")
+    print(f"🧹 barrido previo | {barrido * 1000:6.1f} ms por pasada cada 60 s ({len(vencidos)} vencidos al pasar)")
+    if incorrectos or incorrectos_anterior:
+        errores.append(f"Consultas: {incorrectos} y {incorrectos_anterior} resultados que no coinciden "
+                       f"con el vencimiento de {n}")
+
+    # ===== EXPIRACIONES =====
+    # Un symbol re-registrado a mitad de la ventana no se libera con su vencimiento viejo
+    re_registrado = simbolos[0]
+    gestor.registrar(re_registrado, datetime.now())
+    esperado[re_registrado] = gestor._expiraciones[re_registrado]
+
+    retrasos = {}
+    liberados = []
+
+    def al_expirar(symbol):
+        liberados.append(symbol)
+        retrasos[symbol] = time.monotonic() - esperado[symbol]
+
+    threading.Thread(target=gestor.ejecutar_expiraciones, args=(al_expirar,), daemon=True).start()
+    limite = max(esperado.values()) + 5
+    while len(liberados) < n and time.monotonic() < limite:
+        time.sleep(0.05)
+
+    if len(liberados) != n or len(set(liberados)) != n:
+        errores.append(f"Liberados {len(liberados)} ({len(set(liberados))} distintos) de {n}")
+    adelantados = [symbol for symbol, retraso in retrasos.items() if retraso < 0]
+    if adelantados:
+        errores.append(f"{len(adelantados)} symbols liberados antes de vencer (p. ej. {adelantados[0]})")
+    if len(gestor):
+        errores.append(f"Quedaron {len(gestor)} symbols en el gestor")
+    if retrasos:
+        valores = [retraso * 1000 for retraso in retrasos.values()]
+        print(f"⏰ expiraciones   | retraso p50 {percentil(valores, 50):.2f} ms | p99 {percentil(valores, 99):.2f} ms | "
+              f"máx {max(valores):.2f} ms (barrido previo: hasta 60000 ms)")
+    print("=" * 78)
+
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print(f"✅ {n:,} cooldowns liberados una sola vez, al vencer y nunca antes")
+
+
+if __name__ == "__main__":
+    main()
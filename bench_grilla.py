@@ -0,0 +1,117 @@
+"""
+📐 PRUEBA Y BENCHMARK DE LA GRILLA DE PRECIOS
+1) Propiedades: para precios y tick sizes al azar (de 1e-8 a 1000, ticks como 0.5 o 0.025 y precios
+   con más decimales que el tick), redondear_sl coincide con Decimal.quantize exacto:
+   LONG con ROUND_FLOOR, SHORT con ROUND_CEILING, y el string tiene los decimales del tick.
+   Los precios que ya están en la grilla no se mueven.
+2) Rendimiento: redondeo con la grilla entera frente al adjust_price anterior (float + quantize),
+   sin la consulta a Bybit que este hacía en cada llamada.
+
+Uso:
+    python bench_grilla.py --casos 200000
+"""
+
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, localcontext
+
+from grilla_precios import a_ticks, redondear_sl
+
+TICKS = ["1", "5", "0.5", "0.1", "0.05", "0.025", "0.01", "0.005", "0.001", "0.0005", "0.0001",
+         "0.00001", "0.000001", "0.0000001", "0.00000001", "10", "1000"]
+
+
+def quantize_exacto(precio, tick_size, side):
+    """Referencia: múltiplo del tick con Decimal.quantize y precisión suficiente para no redondear antes"""
+    with localcontext() as contexto:
+        contexto.prec = 60
+        redondeo = ROUND_CEILING if side == "Sell" else ROUND_FLOOR
+        return (precio / tick_size).quantize(Decimal(1), rounding=redondeo) * tick_size
+
+
+def adjust_price_anterior(price, tick_size, price_scale):
+    """adjust_price antes de la grilla, sin la llamada a get_instruments_info"""
+    tick_dec = Decimal(f"{float(tick_size)}")
+    precision = Decimal(f"{10 ** price_scale}")
+    price_decimal = Decimal(f"{price}")
+    adjusted_price = (price_decimal * precision) / precision
+    adjusted_price = (adjusted_price / tick_dec).quantize(Decimal('1'), rounding=ROUND_FLOOR) * tick_dec
+    return float(adjusted_price)
+
+
+def precio_aleatorio(rng, tick_size):
+    """Precio positivo con hasta 6 decimales más que el tick; uno de cada diez ya en la grilla"""
+    ticks = rng.randint(1, 10 ** rng.randint(1, 9))
+    precio = ticks * tick_size
+    if rng.random() < 0.1:
+        return precio
+    return precio + Decimal(rng.randint(0, 10 ** 6 - 1)).scaleb(tick_size.as_tuple().exponent - 6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grilla de precios entera frente a Decimal.quantize")
+    parser.add_argument("--casos", type=int, default=200000)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semilla)
+    errores = []
+
+    # ===== PROPIEDADES =====
+    casos = []
+    for _ in range(args.casos):
+        tick_size = Decimal(rng.choice(TICKS))
+        casos.append((precio_aleatorio(rng, tick_size), tick_size, rng.choice(["Buy", "Sell"])))
+
+    en_grilla = 0
+    for precio, tick_size, side in casos:
+        resultado = redondear_sl(precio, tick_size, side)
+        esperado = quantize_exacto(precio, tick_size, side)
+        decimales = max(-tick_size.normalize().as_tuple().exponent, 0)
+        if Decimal(resultado) != esperado:
+            errores.append(f"{side} {precio} tick {tick_size}: {resultado} (quantize: {esperado})")
+        elif len(resultado.partition(".")[2]) != decimales:
+            errores.append(f"{precio} tick {tick_size}: '{resultado}' no tiene {decimales} decimales")
+        if precio % tick_size == 0:
+            en_grilla += 1
+            if Decimal(resultado) != precio:
+                errores.append(f"{side} {precio} ya estaba en la grilla {tick_size} y se movió a {resultado}")
+        if a_ticks(precio, tick_size, "floor") > a_ticks(precio, tick_size, "ceil"):
+            errores.append(f"{precio} tick {tick_size}: floor por encima de ceil")
+    print(f"🧪 {len(casos):,} precios al azar ({en_grilla:,} ya en la grilla) en {len(TICKS)} tick sizes")
+
+    # ===== RENDIMIENTO =====
+    muestra = [(precio, tick_size) for precio, tick_size, _ in casos[:50000]]
+    escalas = {tick_size: max(-tick_size.normalize().as_tuple().exponent, 0) for _, tick_size in muestra}
+
+    inicio = time.perf_counter()
+    for precio, tick_size in muestra:
+        redondear_sl(precio, tick_size, "Buy")
+    grilla = (time.perf_counter() - inicio) / len(muestra)
+
+    inicio = time.perf_counter()
+    for precio, tick_size in muestra:
+        adjust_price_anterior(float(precio), tick_size, escalas[tick_size])
+    anterior = (time.perf_counter() - inicio) / len(muestra)
+
+    distintos = sum(1 for precio, tick_size in muestra
+                    if Decimal(str(adjust_price_anterior(float(precio), tick_size, escalas[tick_size])))
+                    != quantize_exacto(precio, tick_size, "Buy"))
+
+    print("=" * 78)
+    print(f"📐 grilla entera      | {grilla * 1e6:6.2f} µs/precio")
+    print(f"🐢 adjust_price previo | {anterior * 1e6:6.2f} µs/precio sin contar la consulta a Bybit "
+          f"({distintos:,} de {len(muestra):,} fuera del quantize exacto)")
+    print("=" * 78)
+
+    if errores:
+        for error in errores[:20]:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ La grilla entera coincide con Decimal.quantize en todos los casos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+🎯 BENCHMARK Y PRUEBA DEL ÍNDICE DE NIVELES
+1) Correctitud: reproduce la misma secuencia de ticks (con saltos de precio), altas, cambios y bajas
+   de monedas contra la check_price_levels lineal anterior y contra la del monitor con IndiceNiveles,
+   y exige exactamente las mismas señales en el mismo orden.
+2) Rendimiento: 100k niveles armados; ticks por segundo del índice frente a recorrer todos los
+   niveles del symbol, y costo de armar/mover/desarmar.
+
+Uso:
+    python bench_niveles.py
+    python bench_niveles.py --niveles 100000 --simbolos 1000 --ticks 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from indice_niveles import IndiceNiveles
+from oraculo_motor import MotorOraculo
+
+TICKS_HASTA_BORRAR = 3  # Como los 3 segundos de mark_and_remove_coin, medido en eventos
+
+
+# ===== REFERENCIA: LA VERSIÓN LINEAL ANTERIOR =====
+def check_price_levels_lineal(coins, triggered_signals, symbol, current_price):
+    """check_price_levels antes del índice; devuelve (symbol, side) disparado o None"""
+    coin = coins[symbol]
+
+    if coin["long_entry"] and coin["long_sl"]:
+        signal_key = f"{symbol}_LONG"
+        if signal_key not in triggered_signals and current_price <= coin["long_entry"]:
+            triggered_signals.add(signal_key)
+            return symbol, "long"
+
+    if coin["short_entry"] and coin["short_sl"]:
+        signal_key = f"{symbol}_SHORT"
+        if signal_key not in triggered_signals and current_price >= coin["short_entry"]:
+            triggered_signals.add(signal_key)
+            return symbol, "short"
+    return None
+
+
+def crear_monitor():
+    """MotorOraculo con base de datos temporal y las señales registradas (los borrados los hace la prueba)"""
+    monitor = MotorOraculo(os.path.join(tempfile.mkdtemp(prefix="bench_niveles_"), "monitor_binance.db"),
+                           eco_consola=False)
+    monitor.log = lambda mensaje: None
+    monitor.senales = []
+    monitor.send_signal_to_bot_2a1 = lambda symbol, side, entry, sl: monitor.senales.append((symbol, side))
+    monitor.mark_and_remove_coin = lambda symbol, side: None
+    return monitor
+
+
+def niveles_aleatorios(rng, precio):
+    lados = {}
+    for side, signo in (("long", -1), ("short", 1)):
+        if rng.random() < 0.8:
+            entry = round(precio * (1 + signo * rng.uniform(0, 0.03)), 4)
+            sl = round(entry * (1 + signo * 0.02), 4) if rng.random() < 0.9 else None
+        else:
+            entry = sl = None
+        lados[f"{side}_entry"], lados[f"{side}_sl"] = entry, sl
+    return lados
+
+
+def prueba_correctitud(eventos, semilla):
+    rng = random.Random(semilla)
+    referencia_coins, referencia_disparadas, referencia_senales = {}, set(), []
+    monitor = crear_monitor()
+    precios = {}
+    borrados = []  # [(evento en que se borra, symbol)]
+
+    def borrar(symbol):
+        referencia_coins.pop(symbol, None)
+        monitor.monitored_coins.pop(symbol, None)
+        monitor.indice_niveles.desarmar(f"{symbol}_LONG")
+        monitor.indice_niveles.desarmar(f"{symbol}_SHORT")
+
+    for numero in range(eventos):
+        while borrados and borrados[0][0] <= numero:
+            borrar(borrados.pop(0)[1])
+
+        symbol = f"C{rng.randrange(1000):03d}USDT"
+        accion = rng.random()
+        if accion < 0.06 or (symbol not in referencia_coins and accion < 0.5):
+            # Alta o cambio de niveles (como agregar_moneda/actualizar_moneda, sin la base de datos)
+            precio = precios.setdefault(symbol, rng.uniform(1, 1000))
+            coin = dict(niveles_aleatorios(rng, precio), current_price=None)
+            referencia_coins[symbol] = dict(coin)
+            monitor.monitored_coins[symbol] = dict(coin)
+            monitor.armar_niveles_moneda(symbol)
+        elif accion < 0.08:
+            borrar(symbol)
+        elif symbol in referencia_coins:
+            # Tick; uno de cada diez es un salto grande (gap)
+            salto = rng.gauss(0, 0.03) if rng.random() < 0.1 else rng.gauss(0, 0.003)
+            precios[symbol] *= 1 + salto
+            disparo = check_price_levels_lineal(referencia_coins, referencia_disparadas, symbol, precios[symbol])
+            antes = len(monitor.senales)
+            monitor.check_price_levels(symbol, precios[symbol])
+            if disparo:
+                referencia_senales.append(disparo)
+                borrados.append((numero + TICKS_HASTA_BORRAR, symbol))
+            if (disparo is None) != (len(monitor.senales) == antes):
+                return False, f"Evento {numero}: {symbol} a {precios[symbol]:.4f} - lineal {disparo}, " \
+                              f"índice {monitor.senales[antes:]}"
+
+    if referencia_senales != monitor.senales:
+        return False, "Las secuencias de señales difieren"
+    return True, f"{len(referencia_senales)} señales idénticas en {eventos} eventos"
+
+
+# ===== RENDIMIENTO =====
+def benchmark(total_niveles, simbolos, ticks, semilla):
+    rng = random.Random(semilla)
+    symbols = [f"C{i:05d}USDT" for i in range(simbolos)]
+    precios = {symbol: 100.0 for symbol in symbols}
+    por_symbol = total_niveles // simbolos
+
+    def nivel_nuevo(symbol):
+        side = rng.choice(["long", "short"])
+        signo = -1 if side == "long" else 1
+        return side, precios[symbol] * (1 + signo * rng.uniform(0.0005, 0.05))
+
+    indice = IndiceNiveles()
+    lineal = {symbol: [] for symbol in symbols}  # {symbol: [[clave, side, precio]]}
+    inicio = time.perf_counter()
+    for symbol in symbols:
+        for n in range(por_symbol):
+            side, precio = nivel_nuevo(symbol)
+            indice.armar((symbol, n), symbol, side, precio)
+            lineal[symbol].append([(symbol, n), side, precio])
+    armado = time.perf_counter() - inicio
+
+    secuencia = [(rng.choice(symbols), rng.gauss(0, 0.002)) for _ in range(ticks)]
+
+    def correr(evaluar):
+        for symbol in symbols:
+            precios[symbol] = 100.0
+        disparos = 0
+        inicio = time.perf_counter()
+        for symbol, salto in secuencia:
+            precios[symbol] *= 1 + salto
+            disparos += evaluar(symbol, precios[symbol])
+        return time.perf_counter() - inicio, disparos
+
+    def evaluar_indice(symbol, precio):
+        cruzados = indice.cruzados(symbol, precio)
+        for clave, _, _ in cruzados:  # Se rearma otro nivel para mantener el total
+            side, nuevo = nivel_nuevo(symbol)
+            indice.armar(clave, symbol, side, nuevo)
+        return len(cruzados)
+
+    def evaluar_lineal(symbol, precio):
+        disparos = 0
+        for nivel in lineal[symbol]:
+            clave, side, entry = nivel
+            if (precio <= entry) if side == "long" else (precio >= entry):
+                nivel[1], nivel[2] = nivel_nuevo(symbol)
+                disparos += 1
+        return disparos
+
+    rng.seed(semilla + 1)
+    segundos_indice, disparos_indice = correr(evaluar_indice)
+    rng.seed(semilla + 1)
+    segundos_lineal, disparos_lineal = correr(evaluar_lineal)
+
+    # Costo por operación con el índice lleno
+    claves = [(rng.choice(symbols), rng.randrange(por_symbol)) for _ in range(50000)]
+    inicio = time.perf_counter()
+    for clave in claves:
+        side, precio = nivel_nuevo(clave[0])
+        indice.armar(clave, clave[0], side, precio)
+    mover = (time.perf_counter() - inicio) / len(claves)
+    inicio = time.perf_counter()
+    for clave in claves:
+        indice.desarmar(clave)
+    desarmar = (time.perf_counter() - inicio) / len(claves)
+
+    print(f"📦 {total_niveles} niveles en {simbolos} symbols ({por_symbol} por symbol), armados en {armado:.2f}s")
+    print(f"⚡ Índice: {ticks / segundos_indice:12,.0f} ticks/s ({disparos_indice} disparos, rearmados)")
+    print(f"🐢 Lineal: {ticks / segundos_lineal:12,.0f} ticks/s ({disparos_lineal} disparos)")
+    print(f"🔧 Mover nivel: {mover * 1e6:.2f} µs | Desarmar: {desarmar * 1e6:.2f} µs (quedan {len(indice)} armados)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba y benchmark del índice de niveles del Oráculo")
+    parser.add_argument("--niveles", type=int, default=100000)
+    parser.add_argument("--simbolos", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--eventos", type=int, default=200000, help="Eventos de la prueba de correctitud")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    correcto, detalle = prueba_correctitud(args.eventos, args.semilla)
+    print(f"{'✅' if correcto else '❌'} Correctitud contra la versión lineal: {detalle}")
+    print("=" * 70)
+    benchmark(args.niveles, args.simbolos, args.ticks, args.semilla)
+    if not correcto:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
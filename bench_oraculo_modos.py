@@ -0,0 +1,128 @@
+"""
+⚖️ BENCHMARK DEL ORÁCULO: SERVICIO HEADLESS FRENTE A VENTANA
+Arranca el Oráculo como proceso aparte en cada modo, con N monedas en una base de datos temporal
+y precios de un servidor WebSocket local (los ticks sintéticos de prueba_feed_binance.py):
+  - headless: python oraculo_servicio.py servir
+  - ventana:  python Bot_Monitor_ORACULO.py (con su Oráculo propio, pintando la tabla)
+Mide el arranque (hasta que /status responde) y la CPU del proceso por cada 1000 ticks evaluados.
+
+Uso:
+    python bench_oraculo_modos.py --monedas 200 --ticks-por-segundo 20 --segundos 10
+    xvfb-run python bench_oraculo_modos.py   # la ventana necesita pantalla
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from oraculo_motor import MotorOraculo
+from prueba_feed_binance import ServidorReplay, esperar, generar_ticks
+from utilidades_prueba import puerto_libre
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+
+
+def crear_base(archivo, symbols, precios):
+    """Monedas con niveles lejos del precio: se mide el costo de evaluar, no el de enviar señales"""
+    MotorOraculo(archivo, eco_consola=False)  # Crea la tabla
+    conn = sqlite3.connect(archivo)
+    conn.executemany(
+        "INSERT INTO monitored_coins (symbol, long_entry, long_sl, short_entry, short_sl) VALUES (?, ?, ?, ?, ?)",
+        [(symbol, precios[symbol] * 0.5, precios[symbol] * 0.4, precios[symbol] * 2, precios[symbol] * 2.1)
+         for symbol in symbols],
+    )
+    conn.commit()
+    conn.close()
+
+
+def estado(url):
+    try:
+        respuesta = requests.get(f"{url}/status", timeout=1)
+        return respuesta.json() if respuesta.ok else None
+    except requests.RequestException:
+        return None
+
+
+def medir_modo(modo, base, ws_url, segundos):
+    """Arranca el modo, espera /status, inicia el monitoreo y mide CPU por ticks. None si no arrancó"""
+    puerto = puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    if modo == "headless":
+        comando = [sys.executable, "oraculo_servicio.py", "servir", "--puerto", str(puerto),
+                   "--db", base, "--ws-url", ws_url, "--sin-monitoreo"]
+    else:
+        comando = [sys.executable, "Bot_Monitor_ORACULO.py", "--url", url, "--db", base, "--ws-url", ws_url]
+
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(comando, cwd=CARPETA, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        if not esperar(lambda: proceso.poll() is not None or estado(url) is not None, 30) or proceso.poll() is not None:
+            error = proceso.stderr.read().strip().splitlines() if proceso.poll() is not None else ["sin respuesta"]
+            print(f"⚠️ {modo}: no arrancó ({error[-1] if error else 'sin detalle'})")
+            return None
+        arranque = time.perf_counter() - inicio
+
+        requests.post(f"{url}/monitoreo/iniciar", timeout=5)
+        if not esperar(lambda: (estado(url) or {}).get("websocket_conectado"), 10):
+            print(f"⚠️ {modo}: el WebSocket no conectó con el servidor local")
+            return None
+        time.sleep(1)  # Suscripciones en curso
+
+        antes = estado(url)
+        time.sleep(segundos)
+        despues = estado(url)
+        ticks = despues["ticks"] - antes["ticks"]
+        cpu = despues["cpu_segundos"] - antes["cpu_segundos"]
+        return {
+            "arranque": arranque,
+            "ticks": ticks,
+            "cpu_por_mil": cpu * 1000 / (ticks / 1000) if ticks else None,
+            "cpu_pct": cpu / segundos * 100,
+        }
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque y CPU del Oráculo headless frente a la ventana")
+    parser.add_argument("--monedas", type=int, default=200)
+    parser.add_argument("--ticks-por-segundo", type=float, default=20, help="Por moneda")
+    parser.add_argument("--segundos", type=float, default=10, help="Duración de la medición de CPU")
+    parser.add_argument("--modos", default="headless,ventana")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    symbols = [f"SIM{i:04d}USDT" for i in range(args.monedas)]
+    ticks = generar_ticks(symbols, 30, args.ticks_por_segundo, args.semilla)
+    precios = {}
+    for _, mensaje in ticks:
+        precios.setdefault(mensaje["data"]["s"], float(mensaje["data"]["b"]))
+    servidor = ServidorReplay(ticks)
+    ws_url = servidor.iniciar()
+
+    resultados = {}
+    for modo in args.modos.split(","):
+        base = os.path.join(tempfile.mkdtemp(prefix=f"bench_{modo}_"), "monitor_binance.db")
+        crear_base(base, symbols, precios)
+        resultados[modo] = medir_modo(modo, base, ws_url, args.segundos)
+
+    print("=" * 70)
+    print(f"📊 {args.monedas} monedas, ~{args.monedas * args.ticks_por_segundo:,.0f} ticks/s del servidor local")
+    for modo, resultado in resultados.items():
+        if resultado is None:
+            print(f"{modo:<9} sin medición")
+            continue
+        cpu_por_mil = f"{resultado['cpu_por_mil']:.1f} ms" if resultado["cpu_por_mil"] is not None else "---"
+        print(f"{modo:<9} arranque {resultado['arranque'] * 1000:6.0f} ms | {resultado['ticks'] / args.segundos:8,.0f} ticks/s "
+              f"| CPU {cpu_por_mil} por 1000 ticks ({resultado['cpu_pct']:.0f}% de un núcleo)")
+
+
+if __name__ == "__main__":
+    main()
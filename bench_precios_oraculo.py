@@ -0,0 +1,119 @@
+"""
+⏱️ BENCHMARK DE PRECIOS DEL ORÁCULO - MASIVO VS POR SÍMBOLO
+Levanta un servidor local que imita GET /fapi/v2/ticker/price de Binance Futures (con latencia
+simulada) y mide cuánto tarda un ciclo de precios del Bot Monitor con 10, 100 y 1000 monedas
+vigiladas en cada modo, usando el mismo cliente de python-binance y las mismas funciones del monitor.
+
+Uso:
+    python bench_precios_oraculo.py
+    python bench_precios_oraculo.py --tamanos 10,100,1000 --latencia-ms 30 --ciclos 3
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from binance.client import Client
+
+from oraculo_motor import obtener_precios_masivo, obtener_precios_por_simbolo
+
+PESO_LIMITE_MINUTO = 2400  # Límite de peso por IP de Binance Futures
+
+
+def crear_servidor(simbolos, latencia_ms):
+    """Servidor HTTP local con el endpoint de precios; devuelve (servidor, url_base)"""
+    precios = {symbol: round(random.uniform(0.01, 50000), 4) for symbol in simbolos}
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como la sesión de requests del cliente
+
+        def setup(self):
+            super().setup()
+            # Sin Nagle: cabeceras y cuerpo van en escrituras separadas
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/fapi/v2/ticker/price":
+                self.send_error(404)
+                return
+            time.sleep(latencia_ms / 1000)
+            symbol = parse_qs(url.query).get("symbol", [None])[0]
+            if symbol is None:
+                cuerpo = [{"symbol": s, "price": str(p), "time": 0} for s, p in precios.items()]
+                codigo = 200
+            elif symbol in precios:
+                cuerpo = {"symbol": symbol, "price": str(precios[symbol]), "time": 0}
+                codigo = 200
+            else:
+                cuerpo = {"code": -1121, "msg": "Invalid symbol."}
+                codigo = 400
+            datos = json.dumps(cuerpo).encode()
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/fapi"
+
+
+def medir(funcion, client, symbols, ciclos):
+    """Segundos por ciclo (mediana) y precios obtenidos en el último"""
+    tiempos = []
+    for _ in range(ciclos):
+        inicio = time.perf_counter()
+        precios = funcion(client, symbols)
+        tiempos.append(time.perf_counter() - inicio)
+    return sorted(tiempos)[len(tiempos) // 2], precios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ciclo de precios del Oráculo: masivo vs por símbolo")
+    parser.add_argument("--tamanos", default="10,100,1000", help="Monedas vigiladas, separadas por coma")
+    parser.add_argument("--latencia-ms", type=float, default=30, help="Latencia simulada por petición")
+    parser.add_argument("--ciclos", type=int, default=3)
+    parser.add_argument("--intervalo", type=float, default=0.5, help="Ciclo objetivo del monitor en segundos")
+    args = parser.parse_args()
+
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    # El universo de futuros no depende de la lista vigilada: el masivo siempre descarga todo
+    universo = [f"C{i:04d}USDT" for i in range(max(tamanos) + 100)]
+    servidor, url = crear_servidor(universo, args.latencia_ms)
+
+    client = Client(ping=False)
+    client.FUTURES_URL = url
+
+    modos = (
+        ("masivo", obtener_precios_masivo, 2),
+        ("por_simbolo", lambda c, s: obtener_precios_por_simbolo(c, s, log=lambda m: None), None),
+    )
+
+    print(f"🌐 Servidor local con {len(universo)} symbols, latencia {args.latencia_ms:.0f} ms por petición")
+    print("=" * 78)
+    for tamano in tamanos:
+        symbols = universo[:tamano]
+        for nombre, funcion, peso in modos:
+            segundos, precios = medir(funcion, client, symbols, args.ciclos)
+            peso = peso if peso is not None else tamano
+            ciclo = max(segundos, args.intervalo)
+            peso_minuto = peso * 60 / ciclo
+            aviso = " ⚠️ supera el límite" if peso_minuto > PESO_LIMITE_MINUTO else ""
+            print(f"📊 {tamano:>5} monedas | {nombre:<11} | {segundos * 1000:9.1f} ms/ciclo | "
+                  f"{1 / ciclo:5.2f} Hz | peso {peso_minuto:7.0f}/min{aviso} | precios {len(precios)}")
+    print("=" * 78)
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+⏱️ BENCHMARK DEL CICLO DE PROTECCIÓN - SNAPSHOT MASIVO VS POR SÍMBOLO
+Corre el ciclo de respaldo REST de la protección progresiva del Bot 2 a 1 contra el simulador local
+de Bybit con 1, 10 y 100 posiciones abiertas:
+  - masivo:      get_positions + un get_tickers de todo linear (obtener_precios_linear)
+  - por_simbolo: get_positions + un get_tickers por posición (obtener_ultimo_precio, el modo anterior)
+Cada ciclo evalúa la protección de todas las posiciones en sus actores, como monitorear_proteccion_progresiva.
+Reporta duración del ciclo (mediana) y llamadas a Bybit por ciclo, con el rate limit del cliente activo.
+
+Uso:
+    python bench_proteccion.py
+    python bench_proteccion.py --tamanos 1,10,100 --simbolos 500 --ciclos 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from simulador_bybit import config_simulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ciclo de protección del Bot 2 a 1: snapshot masivo vs por símbolo")
+    parser.add_argument("--tamanos", default="1,10,100", help="Posiciones abiertas, separadas por coma")
+    parser.add_argument("--simbolos", type=int, default=500, help="Universo linear del simulador")
+    parser.add_argument("--latencia-ms", type=float, default=30, help="Latencia simulada por petición")
+    parser.add_argument("--ciclos", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    # Sin movimientos de precio: se mide el costo del ciclo, no el de mover SL
+    sys.modules["config"] = config_simulador(simbolos=max(args.simbolos, max(tamanos)),
+                                             latencia_ms=(args.latencia_ms, args.latencia_ms),
+                                             volatilidad_por_segundo=0.0, semilla=args.semilla)
+    import Bot_2_a_1 as bot
+
+    bot.ESTADO_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="bench_proteccion_"), "estado.db")
+    bot.init_estado_db()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    bot.cargar_instrumentos()
+    simulador = bot.session.http
+    simbolos = sorted(simulador.instrumentos)
+
+    def esperar_actores():
+        while bot.planificador.metricas()["actores_activos"]:
+            time.sleep(0.001)
+
+    def ciclo(por_simbolo):
+        """El cuerpo de monitorear_proteccion_progresiva con la forma de pedir precios elegida"""
+        posiciones = bot.session.get_positions(category="linear", settleCoin="USDT")
+        bot.actualizar_libro_snapshot(posiciones["result"]["list"])
+        abiertas = [posicion for posicion in posiciones["result"]["list"] if Decimal(posicion["size"]) != 0]
+        if por_simbolo:
+            precios = {posicion["symbol"]: bot.obtener_ultimo_precio(posicion["symbol"]) for posicion in abiertas}
+        else:
+            precios = bot.obtener_precios_linear() if abiertas else {}
+        for posicion in abiertas:
+            symbol = posicion["symbol"]
+            bot.planificador.actor(symbol).enviar_precio(bot.proteger_posicion, symbol, precios[symbol])
+        esperar_actores()
+        return len(abiertas)
+
+    print(f"🧪 Simulador con {len(simbolos)} symbols, latencia {args.latencia_ms:.0f} ms por petición")
+    print("=" * 78)
+    abiertas = 0
+    for tamano in tamanos:
+        # Se abren directamente en el simulador: el benchmark mide el ciclo, no las entradas
+        with simulador.lock:
+            for symbol in simbolos[abiertas:tamano]:
+                simulador._ejecutar(symbol, "Buy", simulador.instrumentos[symbol]["qty_step"] * 10)
+        abiertas = max(abiertas, tamano)
+
+        for nombre, por_simbolo in (("masivo", False), ("por_simbolo", True)):
+            tiempos = []
+            llamadas_antes = bot.session.metricas()["llamadas"]
+            for _ in range(args.ciclos):
+                time.sleep(1)  # Ventana de rate limit limpia, como entre ciclos de 5 s
+                inicio = time.perf_counter()
+                evaluadas = ciclo(por_simbolo)
+                tiempos.append(time.perf_counter() - inicio)
+            llamadas = (bot.session.metricas()["llamadas"] - llamadas_antes) / args.ciclos
+            segundos = sorted(tiempos)[len(tiempos) // 2]
+            print(f"📊 {tamano:>4} posiciones | {nombre:<11} | {segundos * 1000:8.1f} ms/ciclo | "
+                  f"{llamadas:5.0f} llamadas/ciclo | evaluadas {evaluadas}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+⏱️ BENCHMARK DE SEÑALES - RÁFAGAS CONTRA /signal
+Dispara ráfagas de señales contra el Bot 2 a 1 y sigue cada ticket hasta que se completa.
+Sin --url arranca su propio bot como proceso aparte contra el simulador local de Bybit, con un
+symbol distinto por señal y Numero_de_posiciones igual al total de señales: las completadas son
+aperturas, no rechazos por el límite de posiciones o por una posición ya abierta en el symbol.
+Con --url usa un bot ya corriendo (en modo simulador: config.simulador_bybit = True).
+
+Mide:
+- Señales aceptadas por segundo (respuestas 202 de /signal)
+- Señales completadas por segundo (ráfaga completa hasta el último ticket resuelto)
+- Latencia de /signal y latencia extremo a extremo (duracion_ms del ticket) en percentiles
+
+Uso:
+    python bench_senales.py --senales 200 --concurrencia 20 --rafagas 3
+    python bench_senales.py --url http://localhost:5000 --simbolos 50 --distancia-sl 1.5
+
+Termina con código 1 si ninguna señal fue aceptada (bot caído o sin responder).
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from simulador_bybit import config_simulador, nombres_simbolos
+from utilidades_prueba import percentil, puerto_libre
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+
+_sesiones = threading.local()
+
+
+def _sesion():
+    """Una sesión HTTP keep-alive por hilo"""
+    if not hasattr(_sesiones, "sesion"):
+        _sesiones.sesion = requests.Session()
+    return _sesiones.sesion
+
+
+# ===== PROCESO DEL BOT =====
+def servir(puerto, simbolos):
+    """Bot 2 a 1 con el simulador y sin límite efectivo de posiciones: una por symbol simulado"""
+    sys.modules["config"] = config_simulador(simbolos=simbolos, latencia_ms=(20, 60), aplicar_rate_limit=False)
+    import Bot_2_a_1 as bot
+
+    bot.Numero_de_posiciones = simbolos
+    bot.puerto_api = puerto
+    bot.ESTADO_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="bench_senales_"), "estado.db")
+    bot.init_estado_db()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    bot.cargar_instrumentos()
+    bot.refrescar_libro()
+    for _ in range(bot.trabajadores_senales):
+        threading.Thread(target=bot.procesar_senales, daemon=True).start()
+    threading.Thread(target=bot.monitorear_proteccion_progresiva, daemon=True).start()
+    bot.iniciar_flask()
+
+
+def arrancar_bot(simbolos):
+    """Lanza el bot propio y espera /status. Devuelve (proceso, url) o termina si no arrancó"""
+    puerto = puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    # El servidor de desarrollo de Flask escribe una línea por petición: a un archivo, no a un pipe sin leer
+    errores = tempfile.TemporaryFile(mode="w+")
+    proceso = subprocess.Popen([sys.executable, __file__, "--servir", str(puerto), str(simbolos)], cwd=CARPETA,
+                               stdout=subprocess.DEVNULL, stderr=errores, text=True)
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite and proceso.poll() is None:
+        try:
+            if requests.get(f"{url}/status", timeout=1).ok:
+                return proceso, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    proceso.terminate()
+    errores.seek(0)
+    error = errores.read().strip().splitlines()
+    print(f"❌ El bot no arrancó ({error[-1] if error else 'sin respuesta en /status'})")
+    sys.exit(1)
+
+
+# ===== CARGA =====
+def enviar_senal(url, senal):
+    """POST /signal. Devuelve (código, ticket, ms)"""
+    inicio = time.perf_counter()
+    try:
+        respuesta = _sesion().post(f"{url}/signal", json=senal, timeout=10)
+        ms = (time.perf_counter() - inicio) * 1000
+        return respuesta.status_code, respuesta.json().get("ticket"), ms
+    except Exception:
+        return None, None, (time.perf_counter() - inicio) * 1000
+
+
+def esperar_ticket(url, ticket, timeout_segundos, intervalo=0.02):
+    """Consulta /signal/<ticket> hasta que se completa. Devuelve el ticket o None"""
+    limite = time.monotonic() + timeout_segundos
+    while time.monotonic() < limite:
+        try:
+            datos = _sesion().get(f"{url}/signal/{ticket}", timeout=10).json()
+            if datos.get("estado") == "completada":
+                return datos
+        except Exception:
+            pass
+        time.sleep(intervalo)
+    return None
+
+
+def ejecutar_rafaga(url, senales, concurrencia, timeout_segundos):
+    """Envía una ráfaga y espera todos sus tickets"""
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        inicio = time.perf_counter()
+        envios = list(pool.map(lambda senal: enviar_senal(url, senal), senales))
+        fin_envio = time.perf_counter()
+
+        tickets = [ticket for codigo, ticket, _ in envios if codigo == 202 and ticket]
+        resueltos = list(pool.map(lambda ticket: esperar_ticket(url, ticket, timeout_segundos), tickets))
+        fin = time.perf_counter()
+
+    return {
+        "envios": envios,
+        "resueltos": [r for r in resueltos if r is not None],
+        "sin_resolver": sum(1 for r in resueltos if r is None),
+        "duracion_envio": fin_envio - inicio,
+        "duracion_total": fin - inicio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ráfagas de señales contra el Bot 2 a 1")
+    parser.add_argument("--url", help="Bot ya corriendo (p. ej. http://localhost:5000); sin --url arranca uno propio")
+    parser.add_argument("--senales", type=int, default=100, help="Señales por ráfaga")
+    parser.add_argument("--rafagas", type=int, default=3)
+    parser.add_argument("--concurrencia", type=int, default=20, help="Conexiones simultáneas")
+    parser.add_argument("--pausa", type=float, default=2.0, help="Segundos entre ráfagas")
+    parser.add_argument("--simbolos", type=int, default=50, help="Símbolos del simulador a usar (solo con --url)")
+    parser.add_argument("--distancia-sl", type=float, default=1.5)
+    parser.add_argument("--timeout", type=float, default=60, help="Espera máxima por ticket en segundos")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--servir", nargs=2, type=int, metavar=("PUERTO", "SIMBOLOS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(*args.servir)
+        return
+
+    rng = random.Random(args.semilla)
+    proceso = None
+    if args.url:
+        url = args.url
+        simbolos = nombres_simbolos(args.simbolos)
+        elegir = lambda: rng.choice(simbolos)
+    else:
+        # Un symbol sin usar por señal: ninguna choca con una posición abierta o un cooldown
+        total = args.senales * args.rafagas
+        proceso, url = arrancar_bot(total)
+        libres = nombres_simbolos(total)
+        rng.shuffle(libres)
+        elegir = libres.pop
+        print(f"🤖 Bot propio en {url}: simulador con {total} símbolos y Numero_de_posiciones = {total}")
+
+    try:
+        ejecutar_bench(args, url, rng, elegir)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+
+def ejecutar_bench(args, url, rng, elegir):
+
+    latencias_envio, latencias_e2e, esperas_cola = [], [], []
+    codigos, resultados = Counter(), Counter()
+    aceptadas = completadas = sin_resolver = 0
+    tiempo_envio = tiempo_total = 0.0
+
+    for numero in range(args.rafagas):
+        senales = [
+            {"symbol": elegir(), "side": rng.choice(["long", "short"]), "distancia_sl": args.distancia_sl}
+            for _ in range(args.senales)
+        ]
+        rafaga = ejecutar_rafaga(url, senales, args.concurrencia, args.timeout)
+
+        for codigo, _, ms in rafaga["envios"]:
+            codigos[codigo] += 1
+            latencias_envio.append(ms)
+        for ticket in rafaga["resueltos"]:
+            resultados[ticket["status"]] += 1
+            if ticket.get("duracion_ms") is not None:
+                latencias_e2e.append(ticket["duracion_ms"])
+            if ticket.get("espera_ms") is not None:
+                esperas_cola.append(ticket["espera_ms"])
+
+        aceptadas += sum(1 for codigo, _, _ in rafaga["envios"] if codigo == 202)
+        completadas += len(rafaga["resueltos"])
+        sin_resolver += rafaga["sin_resolver"]
+        tiempo_envio += rafaga["duracion_envio"]
+        tiempo_total += rafaga["duracion_total"]
+        print(f"🚀 Ráfaga {numero + 1}/{args.rafagas}: {len(senales)} señales, "
+              f"{len(rafaga['resueltos'])} completadas en {rafaga['duracion_total']:.2f}s")
+
+        if numero < args.rafagas - 1:
+            time.sleep(args.pausa)
+
+    print("=" * 60)
+    print(f"📥 Aceptadas: {aceptadas / tiempo_envio if tiempo_envio else 0:.1f} señales/s (códigos HTTP: {dict(codigos)})")
+    print(f"✅ Completadas: {completadas / tiempo_total if tiempo_total else 0:.1f} señales/s "
+          f"(resultados: {dict(resultados)}, sin resolver: {sin_resolver})")
+    for nombre, valores in (("/signal", latencias_envio), ("Espera en cola", esperas_cola), ("Extremo a extremo", latencias_e2e)):
+        print(f"⏱️ {nombre} (ms): p50 {percentil(valores, 50):.1f} | p90 {percentil(valores, 90):.1f} | "
+              f"p99 {percentil(valores, 99):.1f} | máx {max(valores, default=0):.1f}")
+    print("=" * 60)
+
+    if not aceptadas:
+        print(f"❌ Ninguna señal aceptada por {url} (códigos HTTP: {dict(codigos)})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
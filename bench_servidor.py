@@ -0,0 +1,146 @@
+"""
+⚖️ BENCHMARK DE LA API DEL BOT 2 A 1 - FLASK VS AIOHTTP
+Arranca el Bot 2 a 1 como proceso aparte contra el simulador local de Bybit, una vez por modo
+de servidor (modo_servidor = "flask" / "async"), y mide con clientes keep-alive concurrentes:
+  - POST /signal (validar y encolar, responde con ticket)
+  - GET /status (libro local de posiciones, sin REST)
+Reporta peticiones/s y latencia p50/p99 de cada endpoint en cada modo. Los clientes corren en la
+misma máquina: con pocos núcleos las peticiones/s también reflejan el costo del cliente.
+
+Uso:
+    python bench_servidor.py --peticiones 2000 --concurrencia 16
+    python bench_servidor.py --modos async --endpoints status
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from simulador_bybit import config_simulador, nombres_simbolos
+from utilidades_prueba import percentil, puerto_libre
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+SIMBOLOS = 50
+
+_sesiones = threading.local()
+
+
+def _sesion():
+    """Una sesión HTTP keep-alive por hilo"""
+    if not hasattr(_sesiones, "sesion"):
+        _sesiones.sesion = requests.Session()
+    return _sesiones.sesion
+
+
+# ===== PROCESO DEL BOT =====
+def servir(modo, puerto):
+    """Bot 2 a 1 con el simulador, sin Telegram ni WebSocket: cola de señales, actores y API"""
+    sys.modules["config"] = config_simulador(simbolos=SIMBOLOS, latencia_ms=(5, 15), aplicar_rate_limit=False)
+    import Bot_2_a_1 as bot
+
+    bot.modo_servidor = modo
+    bot.puerto_api = puerto
+    bot.ESTADO_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="bench_servidor_"), "estado.db")
+    bot.init_estado_db()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    bot.cargar_instrumentos()
+    bot.refrescar_libro()
+    for _ in range(bot.trabajadores_senales):
+        threading.Thread(target=bot.procesar_senales, daemon=True).start()
+    threading.Thread(target=bot.monitorear_proteccion_progresiva, daemon=True).start()
+    (bot.iniciar_servidor_async if modo == "async" else bot.iniciar_flask)()
+
+
+# ===== CARGA =====
+def peticion(url, endpoint, i):
+    """Una petición al endpoint. Devuelve (código, ms)"""
+    inicio = time.perf_counter()
+    try:
+        if endpoint == "signal":
+            senal = {"symbol": nombres_simbolos(SIMBOLOS)[i % SIMBOLOS], "side": "long" if i % 2 else "short",
+                     "distancia_sl": 1.5}
+            respuesta = _sesion().post(f"{url}/signal", json=senal, timeout=10)
+        else:
+            respuesta = _sesion().get(f"{url}/{endpoint}", timeout=10)
+        return respuesta.status_code, (time.perf_counter() - inicio) * 1000
+    except requests.RequestException:
+        return None, (time.perf_counter() - inicio) * 1000
+
+
+def medir_endpoint(url, endpoint, peticiones, concurrencia):
+    """Lanza las peticiones con `concurrencia` clientes. Devuelve (peticiones/s, latencias ms, códigos)"""
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(lambda i: peticion(url, endpoint, i), range(concurrencia * 5)))  # Calentamiento
+        inicio = time.perf_counter()
+        resultados = list(pool.map(lambda i: peticion(url, endpoint, i), range(peticiones)))
+        duracion = time.perf_counter() - inicio
+    return peticiones / duracion, [ms for _, ms in resultados], Counter(codigo for codigo, _ in resultados)
+
+
+def medir_modo(modo, endpoints, peticiones, concurrencia):
+    """Arranca el bot en el modo, espera /status y mide cada endpoint. None si no arrancó"""
+    puerto = puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    # El servidor de desarrollo de Flask escribe una línea por petición: a un archivo, no a un pipe sin leer
+    errores = tempfile.TemporaryFile(mode="w+")
+    proceso = subprocess.Popen([sys.executable, __file__, "--servir", modo, str(puerto)], cwd=CARPETA,
+                               stdout=subprocess.DEVNULL, stderr=errores, text=True)
+    try:
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite and proceso.poll() is None:
+            try:
+                if requests.get(f"{url}/status", timeout=1).ok:
+                    break
+            except requests.RequestException:
+                time.sleep(0.1)
+        else:
+            errores.seek(0)
+            error = errores.read().strip().splitlines() if proceso.poll() is not None else ["sin respuesta"]
+            print(f"⚠️ {modo}: no arrancó ({error[-1] if error else 'sin detalle'})")
+            return None
+        return {endpoint: medir_endpoint(url, endpoint, peticiones, concurrencia) for endpoint in endpoints}
+    finally:
+        proceso.terminate()
+        proceso.wait()
+        errores.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API del Bot 2 a 1: Flask frente a aiohttp")
+    parser.add_argument("--modos", default="flask,async")
+    parser.add_argument("--endpoints", default="signal,status", help="signal, status, metrics")
+    parser.add_argument("--peticiones", type=int, default=2000, help="Por endpoint y modo")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--servir", nargs=2, metavar=("MODO", "PUERTO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(args.servir[0], int(args.servir[1]))
+        return
+
+    endpoints = args.endpoints.split(",")
+    resultados = {modo: medir_modo(modo, endpoints, args.peticiones, args.concurrencia) for modo in args.modos.split(",")}
+
+    print("=" * 78)
+    print(f"📊 {args.peticiones} peticiones por endpoint, {args.concurrencia} clientes keep-alive")
+    for modo, por_endpoint in resultados.items():
+        if por_endpoint is None:
+            print(f"{modo:<6} sin medición")
+            continue
+        for endpoint, (por_segundo, latencias, codigos) in por_endpoint.items():
+            codigos_texto = ", ".join(f"{codigo}: {cantidad}" for codigo, cantidad in sorted(codigos.items(), key=str))
+            print(f"{modo:<6} /{endpoint:<7} | {por_segundo:7.0f} req/s | p50 {percentil(latencias, 50):6.2f} ms | "
+                  f"p99 {percentil(latencias, 99):7.2f} ms | {codigos_texto}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+🖥️ BENCHMARK DE LA INTERFAZ DEL ORÁCULO
+Abre la ventana real del Bot Monitor con su Oráculo propio, N monedas (en una base de datos
+temporal) y un hilo que actualiza en el motor el precio de todas en cada tick, como el WebSocket.
+La ventana las recibe por el sondeo de la API. Mide si sigue respondiendo: retraso del bucle de Tk
+(un after() cada 20 ms que anota cuánto llegó tarde), duración de cada cuadro de drenar_ui y filas
+repintadas por segundo.
+
+Uso:
+    python bench_ui_oraculo.py --filas 2000 --ticks-por-segundo 10 --segundos 15
+    xvfb-run python bench_ui_oraculo.py   # en un servidor sin pantalla
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import tkinter as tk
+
+import Bot_Monitor_ORACULO as oraculo
+import oraculo_motor
+from oraculo_motor import MotorOraculo
+from utilidades_prueba import percentiles, puerto_libre
+
+PERIODO_SONDA = 0.02
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respuesta de la interfaz del Oráculo con muchas filas")
+    parser.add_argument("--filas", type=int, default=2000)
+    parser.add_argument("--ticks-por-segundo", type=float, default=10, help="Actualizaciones de todas las filas por segundo")
+    parser.add_argument("--segundos", type=float, default=15)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    base = os.path.join(tempfile.mkdtemp(prefix="bench_ui_"), "monitor_binance.db")
+    oraculo_motor.BOT_2A1_URL = "http://127.0.0.1:9"  # Sin Bot 2 a 1: la verificación falla al instante
+    puerto = puerto_libre()
+
+    # Niveles lejos del precio: solo se mide el repintado, no hay disparos
+    symbols = [f"C{i:04d}USDT" for i in range(args.filas)]
+    MotorOraculo(base, eco_consola=False)  # Crea la tabla
+    conn = sqlite3.connect(base)
+    conn.executemany(
+        "INSERT INTO monitored_coins (symbol, long_entry, long_sl, short_entry, short_sl) VALUES (?, 90, 88, 110, 112)",
+        [(symbol,) for symbol in symbols],
+    )
+    conn.commit()
+    conn.close()
+
+    root = tk.Tk()
+    inicio = time.perf_counter()
+    app = oraculo.MonitorBinanceBot(root, f"http://127.0.0.1:{puerto}", base)
+    carga = time.perf_counter() - inicio
+    motor = app.motor
+
+    # ===== INSTRUMENTACIÓN =====
+    retrasos, cuadros = [], []
+    pintadas = [0]
+    enviados = [0]
+    parar = threading.Event()
+
+    drenar_original = app.drenar_ui
+
+    def drenar_medido():
+        inicio_cuadro = time.perf_counter()
+        drenar_original()
+        cuadros.append(time.perf_counter() - inicio_cuadro)
+
+    app.drenar_ui = drenar_medido  # drenar_ui se reprograma con self.drenar_ui
+
+    item_original = app.tree.item
+
+    def item_contado(item, *args, **kwargs):
+        if "values" in kwargs:
+            pintadas[0] += 1
+        return item_original(item, *args, **kwargs)
+
+    app.tree.item = item_contado
+
+    def sonda(esperado):
+        ahora = time.perf_counter()
+        retrasos.append(max(0.0, ahora - esperado))
+        if not parar.is_set():
+            root.after(int(PERIODO_SONDA * 1000), sonda, ahora + PERIODO_SONDA)
+
+    def productor():
+        rng = random.Random(args.semilla)
+        precios = {symbol: 100.0 for symbol in symbols}
+        while not parar.is_set():
+            inicio_tick = time.perf_counter()
+            for symbol in symbols:
+                precios[symbol] *= 1 + rng.gauss(0, 0.002)
+                motor.monitored_coins[symbol]["current_price"] = precios[symbol]
+            enviados[0] += len(symbols)
+            motor.log(f"📈 Tick con {len(symbols)} precios")
+            time.sleep(max(0.0, 1 / args.ticks_por_segundo - (time.perf_counter() - inicio_tick)))
+
+    def terminar():
+        parar.set()
+        root.quit()
+
+    root.after(int(PERIODO_SONDA * 1000), sonda, time.perf_counter() + PERIODO_SONDA)
+    root.after(int(args.segundos * 1000), terminar)
+    threading.Thread(target=productor, daemon=True).start()
+    root.mainloop()
+
+    print(f"📋 Ventana y Oráculo propio con {args.filas} monedas en {carga * 1000:.0f} ms")
+    print(f"📈 Precios actualizados en el motor: {enviados[0] / args.segundos:,.0f}/s "
+          f"({args.ticks_por_segundo:g} ticks/s × {args.filas} filas)")
+    print(f"🖌️ Filas repintadas: {pintadas[0] / args.segundos:,.0f}/s en {len(cuadros)} cuadros "
+          f"(cada {oraculo.INTERVALO_UI_MS} ms, sondeo cada {oraculo.INTERVALO_SONDEO}s)")
+    print(f"🎞️ Duración de cada cuadro: {percentiles(cuadros, (50, 99))}")
+    print(f"⏱️ Retraso del bucle de Tk: {percentiles(retrasos, (50, 99))}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
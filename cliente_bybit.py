@@ -0,0 +1,213 @@
+"""
+🌐 CLIENTE BYBIT - CAPA HTTP CON CONTROL DE RATE LIMIT
+Envuelve la sesión HTTP de pybit con token buckets por endpoint, prioridades,
+pool de conexiones keep-alive y reintentos con jitter para lecturas
+"""
+
+import random
+import threading
+import time
+
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+from pybit.unified_trading import HTTP
+from requests.adapters import HTTPAdapter
+
+from metricas import medir
+
+# Prioridad por endpoint: 0 = órdenes y SL, 1 = posiciones, 2 = consultas de mercado/PnL.
+# Cada endpoint tiene su propia cubeta, así que una consulta nunca le quita tokens a una orden en la
+# cubeta del endpoint; la prioridad decide en la cubeta global (límite por IP), que comparten todos
+PRIORIDADES = {
+    "place_order": 0,
+    "set_trading_stop": 0,
+    "cancel_order": 0,
+    "get_order_history": 0,
+    "get_positions": 1,
+    "get_tickers": 2,
+    "get_closed_pnl": 2,
+    "get_instruments_info": 2,
+}
+PRIORIDAD_POR_DEFECTO = 1
+
+# Peticiones por segundo por endpoint (límites de Bybit V5 por UID)
+LIMITES_POR_ENDPOINT = {
+    "place_order": 10,
+    "set_trading_stop": 10,
+    "cancel_order": 10,
+    "get_order_history": 50,
+    "get_positions": 50,
+    "get_closed_pnl": 50,
+}
+LIMITE_POR_DEFECTO = 20
+LIMITE_GLOBAL = 120  # 600 peticiones cada 5 segundos por IP
+
+CODIGOS_THROTTLE = (10006, 10018)  # retCode de rate limit (InvalidRequestError.status_code)
+ESTADOS_HTTP_THROTTLE = (403, 429)  # Límite por IP (FailedRequestError.status_code)
+
+
+def crear_http(**opciones):
+    """
+    Sesión pybit HTTP sin reintentos propios: los hace ClienteBybit, que conoce las cubetas y qué
+    endpoints se pueden repetir. pybit con max_retries=0 no envía la petición y con retry_codes vacío
+    vuelve a sus códigos por defecto (10006 incluido, que reintenta durmiendo hasta el reinicio), así
+    que se pide un solo intento y solo 10002 (recv_window), sin espera
+    """
+    return HTTP(max_retries=1, retry_codes={10002}, retry_delay=0, return_response_headers=True, **opciones)
+
+
+def es_throttle(error):
+    """Rate limit según el tipo de excepción de pybit y su código, no según el texto del mensaje"""
+    if isinstance(error, InvalidRequestError):
+        return error.status_code in CODIGOS_THROTTLE
+    if isinstance(error, FailedRequestError):
+        return error.status_code in ESTADOS_HTTP_THROTTLE
+    return False
+
+
+class CubetaTokens:
+    """
+    Token bucket con prioridades: mientras haya alguien más prioritario esperando, los demás ceden.
+    Solo ordena a quienes esperan en la misma cubeta (en la práctica, la global de ClienteBybit)
+    """
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad if capacidad is not None else tasa)
+        self.tokens = self.capacidad
+        self.ultimo = time.monotonic()
+        self.bloqueada_hasta = 0.0
+        self.esperando = {}  # {prioridad: cantidad de hilos esperando}
+        self._condicion = threading.Condition()
+
+    def _rellenar(self, ahora):
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+
+    def _hay_mas_prioritario(self, prioridad):
+        return any(cantidad > 0 for p, cantidad in self.esperando.items() if p < prioridad)
+
+    def adquirir(self, prioridad=PRIORIDAD_POR_DEFECTO):
+        """Bloquea hasta obtener un token. Devuelve los segundos de espera"""
+        inicio = time.monotonic()
+        with self._condicion:
+            self.esperando[prioridad] = self.esperando.get(prioridad, 0) + 1
+            try:
+                while True:
+                    ahora = time.monotonic()
+                    self._rellenar(ahora)
+                    if ahora < self.bloqueada_hasta:
+                        self._condicion.wait(self.bloqueada_hasta - ahora)
+                        continue
+                    if self.tokens >= 1 and not self._hay_mas_prioritario(prioridad):
+                        self.tokens -= 1
+                        return time.monotonic() - inicio
+                    self._condicion.wait(max((1 - self.tokens) / self.tasa, 0.001))
+            finally:
+                self.esperando[prioridad] -= 1
+                self._condicion.notify_all()
+
+    def ajustar(self, restantes, reinicio):
+        """Alinea la cubeta con lo que informa el exchange (restantes y momento de reinicio en monotonic)"""
+        with self._condicion:
+            self.tokens = min(self.tokens, float(restantes))
+            if restantes <= 0 and reinicio is not None:
+                self.bloqueada_hasta = max(self.bloqueada_hasta, reinicio)
+            self._condicion.notify_all()
+
+
+class ClienteBybit:
+    """
+    Sesión pybit con control de rate limit. Se usa igual que HTTP:
+    session.get_tickers(...), session.place_order(...), etc.
+    """
+
+    def __init__(self, http, max_reintentos_lectura=3, pool_conexiones=16):
+        self.http = http
+        self.max_reintentos_lectura = max_reintentos_lectura
+        self.cubeta_global = CubetaTokens(LIMITE_GLOBAL)
+        self.cubetas = {}
+        self._lock = threading.Lock()
+        self.contadores = {"llamadas": 0, "throttles": 0, "reintentos": 0, "espera_cola_ms": 0.0, "espera_max_ms": 0.0}
+
+        # Pool de conexiones keep-alive para los hilos del bot
+        cliente = getattr(http, "client", None)
+        if cliente is not None:
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=pool_conexiones)
+            cliente.mount("https://", adaptador)
+
+    def _cubeta(self, endpoint):
+        with self._lock:
+            if endpoint not in self.cubetas:
+                self.cubetas[endpoint] = CubetaTokens(LIMITES_POR_ENDPOINT.get(endpoint, LIMITE_POR_DEFECTO))
+            return self.cubetas[endpoint]
+
+    def _contar(self, clave, valor=1):
+        with self._lock:
+            self.contadores[clave] += valor
+
+    def _leer_cabeceras(self, cubeta, cabeceras):
+        """Usa X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp para ajustar la cubeta.
+        Devuelve True si las cabeceras indican que se agotó el límite (y lo cuenta como throttle)"""
+        if not cabeceras or "X-Bapi-Limit-Status" not in cabeceras:
+            return False
+        restantes = int(cabeceras["X-Bapi-Limit-Status"])
+        reinicio = None
+        if "X-Bapi-Limit-Reset-Timestamp" in cabeceras:
+            reinicio_ms = int(cabeceras["X-Bapi-Limit-Reset-Timestamp"])
+            reinicio = time.monotonic() + max(reinicio_ms / 1000 - time.time(), 0)
+        if restantes <= 0:
+            self._contar("throttles")
+        cubeta.ajustar(restantes, reinicio)
+        return restantes <= 0
+
+    def _llamar(self, endpoint, metodo, kwargs):
+        prioridad = PRIORIDADES.get(endpoint, PRIORIDAD_POR_DEFECTO)
+        cubeta = self._cubeta(endpoint)
+        es_lectura = endpoint.startswith("get_")
+        intentos = self.max_reintentos_lectura if es_lectura else 1
+
+        for intento in range(intentos):
+            espera = cubeta.adquirir(prioridad) + self.cubeta_global.adquirir(prioridad)
+            with self._lock:
+                self.contadores["llamadas"] += 1
+                self.contadores["espera_cola_ms"] += espera * 1000
+                self.contadores["espera_max_ms"] = max(self.contadores["espera_max_ms"], espera * 1000)
+
+            try:
+                with medir("bybit_llamada_segundos", endpoint=endpoint):
+                    respuesta = metodo(**kwargs)
+            except Exception as e:
+                throttle = es_throttle(e)
+                if throttle and not self._leer_cabeceras(cubeta, getattr(e, "resp_headers", None)):
+                    self._contar("throttles")
+                # Un error de Bybit que no es rate limit (parámetros, symbol...) falla igual al repetirlo
+                reintentable = throttle or not isinstance(e, InvalidRequestError)
+                if intento == intentos - 1 or not reintentable:
+                    raise
+                self._contar("reintentos")
+                time.sleep(random.uniform(0, 0.2 * 2 ** intento))
+                continue
+
+            # Con return_response_headers pybit devuelve (json, elapsed, headers)
+            cabeceras = None
+            if isinstance(respuesta, tuple):
+                respuesta, cabeceras = respuesta[0], respuesta[-1]
+            self._leer_cabeceras(cubeta, cabeceras)
+            return respuesta
+
+    def __getattr__(self, nombre):
+        metodo = getattr(self.http, nombre)
+        if not callable(metodo):
+            return metodo
+
+        def llamada(**kwargs):
+            return self._llamar(nombre, metodo, kwargs)
+
+        return llamada
+
+    def metricas(self):
+        with self._lock:
+            metricas = dict(self.contadores)
+        metricas["espera_cola_ms"] = round(metricas["espera_cola_ms"], 1)
+        metricas["espera_max_ms"] = round(metricas["espera_max_ms"], 1)
+        return metricas
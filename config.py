@@ -4,3 +4,12 @@ api_secret = ""
 # Bot de telegram
 token_telegram=""
 chat_id=""
+
+# Simulador local de Bybit (pruebas de carga sin dinero real, ver simulador_bybit.py)
+simulador_bybit = False
+simulador_opciones = {
+    "simbolos": 50,
+    "latencia_ms": (20, 60),
+    "prob_error_red": 0.0,
+    "prob_throttle": 0.0,
+}
@@ -0,0 +1,291 @@
+"""
+🔥 PRUEBA DE ESTRÉS DE LOS ACTORES POR SÍMBOLO
+Corre el Bot 2 a 1 contra el simulador local de Bybit, abre N posiciones a la vez y bombardea
+los actores con precios desde varios hilos (como WebSocket y REST en paralelo) mezclados con
+cierres. Comprueba que no hay carreras sobre el estado de tracking y compara la latencia de
+protección por posición con 1 posición y con N. Después repite los precios con una ráfaga de
+señales por la cola (con fills lentos que retienen hilos del pool) y exige que el p99 de la
+protección no empeore. Un registro de PNL de un cierre parcial no saca la posición del libro ni
+reinicia su protección; los cierres totales salen del libro con el snapshot que los informa.
+
+Uso:
+    python estres_actores.py --posiciones 50 --segundos 10
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from simulador_bybit import config_simulador
+from utilidades_prueba import percentil, percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de estrés de los actores por símbolo del Bot 2 a 1")
+    parser.add_argument("--posiciones", type=int, default=50)
+    parser.add_argument("--segundos", type=float, default=10, help="Duración de cada fase de precios")
+    parser.add_argument("--hilos-precios", type=int, default=2, help="Fuentes de precios en paralelo (WS + REST)")
+    parser.add_argument("--intervalo-ms", type=float, default=100, help="Cada cuánto manda precio cada fuente")
+    parser.add_argument("--rafaga", type=int, default=40, help="Señales nuevas durante la fase mixta")
+    parser.add_argument("--fill-lento", type=float, default=1.0, help="Segundos extra de esperar_fill en la fase mixta")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semilla)
+    # Los precios los mueve la prueba
+    sys.modules["config"] = config_simulador(simbolos=args.posiciones + 10 + args.rafaga, latencia_ms=(5, 15),
+                                             volatilidad_por_segundo=0.0, semilla=args.semilla)
+    import Bot_2_a_1 as bot
+
+    directorio = tempfile.mkdtemp(prefix="estres_actores_")
+    bot.ESTADO_DB_FILE = os.path.join(directorio, "estado.db")
+    bot.init_estado_db()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    bot.cargar_instrumentos()
+    bot.Numero_de_posiciones = args.posiciones
+    simulador = bot.session.http
+    simbolos = sorted(simulador.instrumentos)
+    simbolos_rafaga = simbolos[args.posiciones + 10:]  # Sin señales previas: sin cooldown para la fase mixta
+    simbolos = simbolos[:args.posiciones + 10]
+
+    # ===== INSTRUMENTACIÓN =====
+    errores = []
+    vigilancia_lock = threading.Lock()
+    en_curso = {}
+    historial_sl = {}  # {symbol: [SL aceptados por el exchange en orden]}
+
+    procesar_original = bot.procesar_precio_posicion
+
+    def procesar_vigilado(symbol, *argumentos):
+        with vigilancia_lock:
+            en_curso[symbol] = en_curso.get(symbol, 0) + 1
+            if en_curso[symbol] > 1:
+                errores.append(f"{symbol}: protección ejecutándose en dos hilos a la vez")
+        try:
+            return procesar_original(symbol, *argumentos)
+        finally:
+            with vigilancia_lock:
+                en_curso[symbol] -= 1
+
+    bot.procesar_precio_posicion = procesar_vigilado
+
+    set_trading_stop_original = simulador.set_trading_stop
+
+    def set_trading_stop_registrado(**kwargs):
+        respuesta = set_trading_stop_original(**kwargs)
+        cuerpo = respuesta[0] if isinstance(respuesta, tuple) else respuesta
+        if cuerpo["retCode"] == 0 and kwargs.get("stopLoss"):
+            side = simulador.posiciones[kwargs["symbol"]]["side"]
+            with vigilancia_lock:
+                historial_sl.setdefault(kwargs["symbol"], []).append((side, Decimal(kwargs["stopLoss"])))
+        return respuesta
+
+    simulador.set_trading_stop = set_trading_stop_registrado
+
+    def esperar_actores(limite=60):
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            if bot.planificador.metricas()["actores_activos"] == 0:
+                return
+            time.sleep(0.05)
+        errores.append("Los actores no terminaron a tiempo")
+
+    # ===== FASE 1: APERTURAS CONCURRENTES =====
+    # Una señal por symbol hasta el límite, duplicadas en los mismos symbols y 10 symbols de más
+    inicio = time.monotonic()
+    senales = [(symbol, rng.choice(["long", "short"])) for symbol in simbolos]
+    senales += [(symbol, "long") for symbol in simbolos[:args.posiciones // 2]]
+    rng.shuffle(senales)
+    tickets = []
+    for symbol, side in senales:
+        ticket_id = bot.crear_ticket(symbol, side)
+        tickets.append(ticket_id)
+        bot.planificador.actor(symbol).enviar(bot.ejecutar_ticket, ticket_id, symbol, side, Decimal("2.0"), time.monotonic())
+    esperar_actores()
+
+    resultados = [bot.estado_ticket(ticket_id)[0]["status"] for ticket_id in tickets]
+    abiertas = sorted(simulador.posiciones)
+    print(f"🟢 Aperturas: {resultados.count('success')} abiertas de {len(senales)} señales "
+          f"en {time.monotonic() - inicio:.1f}s (límite {args.posiciones})")
+    if len(abiertas) > args.posiciones:
+        errores.append(f"Se abrieron {len(abiertas)} posiciones con límite {args.posiciones}")
+    if sorted(bot.tracking_posiciones) != abiertas:
+        errores.append("tracking_posiciones no coincide con las posiciones abiertas tras las aperturas")
+
+    # ===== FASE 2: PRECIOS DESDE VARIAS FUENTES =====
+    deriva = {symbol: rng.uniform(0.0002, 0.001) for symbol in abiertas}
+
+    def mover_precios(activos):
+        """Tendencia a favor de cada posición más ruido; de vez en cuando llega a la 1:1 y a la progresiva"""
+        with simulador.lock:
+            for symbol in activos:
+                posicion = simulador.posiciones.get(symbol)
+                if posicion is None:
+                    continue
+                signo = 1 if posicion["side"] == "Buy" else -1
+                decimales = simulador.instrumentos[symbol]["decimales"]
+                factor = 1 + signo * deriva[symbol] + rng.gauss(0, 0.0005)
+                simulador.precios[symbol] = round(simulador.precios[symbol] * factor, decimales)
+
+    def precio_actual(symbol):
+        with simulador.lock:
+            decimales = simulador.instrumentos[symbol]["decimales"]
+            return Decimal(f"{simulador.precios[symbol]:.{decimales}f}")
+
+    def fase_precios(activos, segundos, mover=True):
+        latencias = []
+        parar = threading.Event()
+
+        def medido(symbol, last_price, enviado):
+            bot.proteger_posicion(symbol, last_price)
+            latencias.append(time.perf_counter() - enviado)
+
+        def fuente():
+            while not parar.is_set():
+                for symbol in activos:
+                    bot.planificador.actor(symbol).enviar_precio(medido, symbol, precio_actual(symbol), time.perf_counter())
+                time.sleep(args.intervalo_ms / 1000)
+
+        def mercado():
+            while not parar.is_set():
+                mover_precios(activos)
+                time.sleep(args.intervalo_ms / 1000)
+
+        hilos = [threading.Thread(target=fuente) for _ in range(args.hilos_precios)]
+        if mover:
+            hilos.append(threading.Thread(target=mercado))
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(segundos)
+        parar.set()
+        for hilo in hilos:
+            hilo.join()
+        esperar_actores()
+        return latencias
+
+    latencias_una = fase_precios(abiertas[:1], args.segundos)
+    latencias_todas = fase_precios(abiertas, args.segundos)
+    print(f"⏱️ Protección con 1 posición:  {percentiles(latencias_una)}")
+    print(f"⏱️ Protección con {len(abiertas)} posiciones: {percentiles(latencias_todas)}")
+    print(f"🛡️ Posiciones con protección 1:1: {len(bot.posiciones_con_stop)}, "
+          f"SL movidos: {sum(len(h) for h in historial_sl.values())}")
+
+    # ===== FASE 2B: RÁFAGA DE SEÑALES MEZCLADA CON PRECIOS =====
+    # Las señales pasan por la cola y el repartidor como las de /signal; cada una retiene su hilo
+    # del pool durante los chequeos, la orden y un fill lento. La protección no debe esperar por ellas.
+    # Los precios quedan quietos: así los SL no se mueven y no compiten por el límite de set_trading_stop
+    # (10/s), que es del exchange y no del pool; lo que se mide es si quedan hilos para la protección
+    bot.Numero_de_posiciones = args.posiciones + args.rafaga
+    esperar_fill_original = bot.esperar_fill
+
+    def esperar_fill_lento(symbol, order_id):
+        time.sleep(args.fill_lento)
+        return esperar_fill_original(symbol, order_id)
+
+    bot.esperar_fill = esperar_fill_lento
+    for _ in range(bot.trabajadores_senales):
+        threading.Thread(target=bot.procesar_senales, daemon=True).start()
+
+    def rafaga():
+        for symbol in simbolos_rafaga:
+            bot.encolar_senal({"symbol": symbol, "side": rng.choice(["long", "short"]), "distancia_sl": 1.5},
+                              time.monotonic())
+
+    hilo_rafaga = threading.Thread(target=rafaga)
+    hilo_rafaga.start()
+    latencias_mixtas = fase_precios(abiertas, args.segundos, mover=False)
+    hilo_rafaga.join()
+    bot.cola_senales.join()
+    esperar_actores(limite=args.rafaga * (args.fill_lento + 5))
+    bot.esperar_fill = esperar_fill_original
+
+    print(f"⏱️ Protección con {len(abiertas)} posiciones y {args.rafaga} señales "
+          f"(tope {bot.max_senales_en_proceso} en proceso, {bot.hilos_actores} hilos): {percentiles(latencias_mixtas)}")
+    if latencias_mixtas and latencias_todas:
+        limite_p99 = 2 * percentil(latencias_todas, 99) + 0.05
+        if percentil(latencias_mixtas, 99) > limite_p99:
+            errores.append(f"La ráfaga de señales subió el p99 de protección a {percentil(latencias_mixtas, 99) * 1000:.1f} ms "
+                           f"(sin señales {percentil(latencias_todas, 99) * 1000:.1f} ms, máximo {limite_p99 * 1000:.1f} ms)")
+    abiertas_rafaga = [symbol for symbol in simbolos_rafaga if symbol in simulador.posiciones]
+    print(f"🚦 Ráfaga: {len(abiertas_rafaga)} de {args.rafaga} señales abrieron posición")
+
+    # ===== FASE 3: CIERRES MEZCLADOS CON PRECIOS =====
+    # Se llevan la mitad de las posiciones contra su SL y los cierres llegan mientras siguen los precios:
+    # primero los registros de PNL (con el libro aún sin refrescar) y después el snapshot REST que los
+    # saca del libro. Una posición que sigue abierta recibe además un registro de PNL de un cierre parcial
+    with simulador.lock:
+        a_cerrar = abiertas[::2]
+        for symbol in a_cerrar:
+            posicion = simulador.posiciones[symbol]
+            stop = posicion["stop_loss"]
+            simulador.precios[symbol] = stop * (0.99 if posicion["side"] == "Buy" else 1.01)
+    simulador.get_tickers(category="linear")  # Avanza el mercado: se ejecutan los SL
+
+    conn = sqlite3.connect(bot.ESTADO_DB_FILE, timeout=5)
+    cierres = bot.ingerir_pnl_cerrado(conn, 0)
+    cerradas = {registro["symbol"] for registro in cierres}
+    parcial = next(symbol for symbol in abiertas if symbol not in cerradas and symbol in bot.tracking_posiciones)
+    tracking_parcial = dict(bot.tracking_posiciones[parcial])
+    con_stop_parcial = parcial in bot.posiciones_con_stop
+    cierres.append({"symbol": parcial, "side": simulador.posiciones[parcial]["side"], "closedPnl": "0.5"})
+    parar = threading.Event()
+
+    def precios_viejos():
+        # Precios del libro aún sin refrescar: llegan después de los cierres
+        while not parar.is_set():
+            for symbol in abiertas:
+                bot.planificador.actor(symbol).enviar_precio(bot.proteger_posicion, symbol, precio_actual(symbol))
+            time.sleep(0.01)
+
+    hilo_precios = threading.Thread(target=precios_viejos)
+    hilo_precios.start()
+    for registro in cierres:
+        bot.planificador.actor(registro["symbol"]).enviar(bot.al_cerrar_posicion, registro)
+    time.sleep(0.5)
+    bot.refrescar_libro()
+    time.sleep(0.5)
+    parar.set()
+    hilo_precios.join()
+    esperar_actores()
+    print(f"🔴 Cierres: {len(cerradas)} posiciones cerradas por SL y un cierre parcial en {parcial}")
+    if parcial not in bot.libro_posiciones or (parcial in bot.posiciones_con_stop) != con_stop_parcial or \
+            bot.tracking_posiciones.get(parcial, {}).get("precio_entrada") != tracking_parcial["precio_entrada"]:
+        errores.append(f"{parcial}: el cierre parcial borró la posición del libro o reinició su protección")
+
+    # ===== INVARIANTES =====
+    for symbol, historial in historial_sl.items():
+        side = historial[0][0]
+        stops = [stop for _, stop in historial]
+        pares = list(zip(stops, stops[1:]))
+        if any(b < a for a, b in pares) if side == "Buy" else any(b > a for a, b in pares):
+            errores.append(f"{symbol}: el SL retrocedió {stops}")
+
+    for symbol in cerradas:
+        if symbol in bot.tracking_posiciones or symbol in bot.posiciones_con_stop:
+            errores.append(f"{symbol}: estado de tracking resucitado tras el cierre")
+        if symbol in bot.libro_posiciones:
+            errores.append(f"{symbol}: sigue en el libro después del snapshot que la informa cerrada")
+    for symbol, posicion in simulador.posiciones.items():
+        info = bot.tracking_posiciones.get(symbol)
+        if info is None or info["side"] != posicion["side"]:
+            errores.append(f"{symbol}: tracking ausente o con lado distinto al de la posición")
+        if symbol in bot.posiciones_con_stop and historial_sl.get(symbol) and \
+                Decimal(str(posicion["stop_loss"])) != historial_sl[symbol][-1][1]:
+            errores.append(f"{symbol}: el SL del exchange no es el último que colocó el bot")
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Sin carreras: un hilo por symbol, SL siempre hacia adelante, tracking coherente con el exchange")
+
+
+if __name__ == "__main__":
+    main()
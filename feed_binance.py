@@ -0,0 +1,153 @@
+"""
+📡 FEED DE PRECIOS DE BINANCE FUTURES POR WEBSOCKET
+Una sola conexión a los streams combinados de Binance (bookTicker o aggTrade) con suscripciones
+dinámicas: se suscribe y desuscribe a medida que cambian las monedas vigiladas, se reconecta con
+backoff y al reconectar vuelve a suscribir todo. Mientras está desconectado, conectado() devuelve
+False para que el monitor use REST.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+import websocket  # websocket-client (ya lo instala pybit)
+
+BINANCE_WS_URL = "wss://fstream.binance.com/stream"
+STREAMS_POR_MENSAJE = 100  # Binance acepta hasta 1024 streams por conexión
+MENSAJES_POR_SEGUNDO = 5  # Binance corta la conexión con más de 10 mensajes entrantes por segundo
+BACKOFF_MAXIMO = 30  # Segundos máximos entre intentos de reconexión
+
+
+def nombre_stream(symbol, tipo):
+    """BTCUSDT, bookTicker -> btcusdt@bookTicker"""
+    return f"{symbol.lower()}@{tipo}"
+
+
+def precio_de_evento(data):
+    """(symbol, precio, momento del evento en ms) de un mensaje bookTicker o aggTrade"""
+    if data.get("e") == "aggTrade":
+        return data["s"], float(data["p"]), data.get("T")
+    # bookTicker: punto medio entre el mejor bid y el mejor ask
+    return data["s"], (float(data["b"]) + float(data["a"])) / 2, data.get("T") or data.get("E")
+
+
+class FeedBinanceWS:
+    """
+    Precios en tiempo real de los symbols vigilados.
+    on_precio(symbol, precio, recibido, evento_ms) se llama en el hilo del WebSocket por cada tick;
+    recibido es time.perf_counter() al llegar el mensaje, para medir la latencia hasta el disparo
+    """
+
+    def __init__(self, on_precio, tipo="bookTicker", url=BINANCE_WS_URL, log=print):
+        self.on_precio = on_precio
+        self.tipo = tipo
+        self.url = url
+        self.log = log
+        self.deseados = set()  # Symbols que deberían estar suscritos
+        self.suscritos = set()  # Symbols suscritos en la conexión actual
+        self.ws = None
+        self.activo = False
+        self.backoff = 1
+        self.reconexiones = 0
+        self.ticks = 0
+        self._conectado = threading.Event()
+        self._lock = threading.Lock()
+        self._siguiente_id = 0
+        self._envios = deque()  # Momentos de los últimos mensajes enviados
+        self._hilo = None
+
+    def iniciar(self):
+        self.activo = True
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self.activo = False
+        if self.ws is not None:
+            self.ws.close()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+
+    def conectado(self):
+        return self._conectado.is_set()
+
+    def sincronizar(self, symbols):
+        """Ajusta las suscripciones a la lista de symbols (altas y bajas solo de la diferencia)"""
+        with self._lock:
+            self.deseados = set(symbols)
+            if not self.conectado():
+                return  # Al conectar se suscriben todos los deseados
+            try:
+                self._enviar("UNSUBSCRIBE", sorted(self.suscritos - self.deseados))
+                self._enviar("SUBSCRIBE", sorted(self.deseados - self.suscritos))
+            except Exception as e:
+                self.log(f"⚠️ No se pudieron actualizar las suscripciones: {e}")
+
+    def _enviar(self, metodo, symbols):
+        """Envía SUBSCRIBE/UNSUBSCRIBE en lotes, sin pasar el límite de mensajes de Binance"""
+        for i in range(0, len(symbols), STREAMS_POR_MENSAJE):
+            lote = symbols[i:i + STREAMS_POR_MENSAJE]
+            while len(self._envios) >= MENSAJES_POR_SEGUNDO:
+                espera = self._envios[0] + 1 - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                self._envios.popleft()
+            self._siguiente_id += 1
+            self.ws.send(json.dumps({
+                "method": metodo,
+                "params": [nombre_stream(symbol, self.tipo) for symbol in lote],
+                "id": self._siguiente_id,
+            }))
+            self._envios.append(time.monotonic())
+            if metodo == "SUBSCRIBE":
+                self.suscritos.update(lote)
+            else:
+                self.suscritos.difference_update(lote)
+
+    def _bucle(self):
+        while self.activo:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+            )
+            self.ws.run_forever(ping_interval=60, ping_timeout=20)
+
+            self._conectado.clear()
+            with self._lock:
+                self.suscritos.clear()
+            if not self.activo:
+                break
+            self.log(f"⚠️ WebSocket de Binance desconectado, reconectando en {self.backoff}s...")
+            time.sleep(self.backoff)
+            self.backoff = min(self.backoff * 2, BACKOFF_MAXIMO)
+            self.reconexiones += 1
+
+    def _on_open(self, ws):
+        with self._lock:
+            self._conectado.set()
+            self.backoff = 1
+            self._enviar("SUBSCRIBE", sorted(self.deseados))
+        self.log(f"🔌 WebSocket de Binance conectado ({len(self.deseados)} monedas, stream {self.tipo})")
+
+    def _on_message(self, ws, mensaje):
+        recibido = time.perf_counter()
+        try:
+            datos = json.loads(mensaje)
+            if "data" in datos:
+                symbol, precio, evento_ms = precio_de_evento(datos["data"])
+                # Ticks en vuelo de una moneda recién desuscrita
+                if symbol not in self.deseados:
+                    return
+                self.ticks += 1
+                self.on_precio(symbol, precio, recibido, evento_ms)
+            elif datos.get("error"):
+                self.log(f"❌ Error de suscripción en Binance: {datos['error']}")
+        except Exception as e:
+            self.log(f"❌ Error al procesar tick de Binance: {e}")
+
+    def _on_error(self, ws, error):
+        if self.activo:
+            self.log(f"❌ Error en WebSocket de Binance: {error}")
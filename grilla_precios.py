@@ -0,0 +1,51 @@
+"""
+📐 GRILLA DE PRECIOS - PRECIOS COMO NÚMERO ENTERO DE TICKS
+Redondeo exacto al tick del exchange sin pasar por float
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _grilla(tick_size):
+    """Devuelve (decimales, tick en unidades enteras de 10^-decimales) para un tick size"""
+    decimales = max(-tick_size.normalize().as_tuple().exponent, 0)
+    tick_entero = int(tick_size.scaleb(decimales))
+    return decimales, tick_entero
+
+
+def a_ticks(precio, tick_size, redondeo="floor"):
+    """Convierte un precio (Decimal, int o str) en número entero de ticks con floor o ceil exacto"""
+    decimales, tick_entero = _grilla(tick_size)
+    numerador, denominador = Decimal(precio).as_integer_ratio()
+    numerador *= 10 ** decimales
+    denominador *= tick_entero
+    if redondeo == "floor":
+        return numerador // denominador
+    return -(-numerador // denominador)
+
+
+def formatear_ticks(ticks, tick_size):
+    """Formatea un número de ticks como string de precio para el exchange"""
+    decimales, tick_entero = _grilla(tick_size)
+    valor = ticks * tick_entero
+    if decimales == 0:
+        return str(valor)
+    signo = "-" if valor < 0 else ""
+    entero, fraccion = divmod(abs(valor), 10 ** decimales)
+    return f"{signo}{entero}.{fraccion:0{decimales}d}"
+
+
+def desde_ticks(ticks, tick_size):
+    """Convierte un número de ticks en Decimal exacto"""
+    return Decimal(formatear_ticks(ticks, tick_size))
+
+
+def redondear_sl(precio, tick_size, side):
+    """
+    Redondea un stop loss a la grilla alejándolo del precio:
+    LONG (Buy) hacia abajo, SHORT (Sell) hacia arriba. Devuelve el string para el exchange.
+    """
+    redondeo = "ceil" if side == "Sell" else "floor"
+    return formatear_ticks(a_ticks(precio, tick_size, redondeo), tick_size)
@@ -0,0 +1,85 @@
+"""
+🎯 ÍNDICE DE NIVELES DE ENTRADA
+Niveles armados por symbol en dos heaps: las entradas LONG ordenadas de mayor a menor (se disparan
+cuando el precio baja hasta ellas) y las SHORT de menor a mayor (cuando sube). En cada tick solo se
+miran las cimas: se sacan los niveles que el precio cruzó y nada más, así el costo depende de los
+niveles disparados y no de cuántos hay armados. Como la condición es "precio <= entry" / "precio
+>= entry" y no la igualdad, un salto de precio entre ticks dispara todos los niveles que saltó.
+"""
+
+import heapq
+import itertools
+
+COMPACTAR_DESDE = 1024  # Entradas obsoletas mínimas antes de reconstruir los heaps
+
+
+class IndiceNiveles:
+    """
+    armar/desarmar/actualizar en O(log n); cruzados() en O(k log n) para k niveles disparados.
+    Como en GestorCooldown, quitar o mover un nivel deja su entrada vieja en el heap y se
+    descarta al llegar a la cima
+    """
+
+    def __init__(self):
+        self._niveles = {}  # {clave: (symbol, side, precio, version)} armados
+        self._heaps = {}  # {symbol: {"long": [(-precio, version, clave)], "short": [(precio, version, clave)]}}
+        self._versiones = itertools.count()
+        self._obsoletas = 0
+
+    def armar(self, clave, symbol, side, precio):
+        """Arma (o mueve) el nivel clave del symbol en el lado side ("long" o "short")"""
+        if clave in self._niveles:
+            self._obsoletas += 1
+        version = next(self._versiones)
+        self._niveles[clave] = (symbol, side, precio, version)
+        heaps = self._heaps.setdefault(symbol, {"long": [], "short": []})
+        heapq.heappush(heaps[side], (-precio if side == "long" else precio, version, clave))
+        if self._obsoletas > max(COMPACTAR_DESDE, len(self._niveles)):
+            self._compactar()
+
+    def desarmar(self, clave):
+        if self._niveles.pop(clave, None) is not None:
+            self._obsoletas += 1
+
+    def __contains__(self, clave):
+        return clave in self._niveles
+
+    def __len__(self):
+        return len(self._niveles)
+
+    def cruzados(self, symbol, precio):
+        """Saca y devuelve [(clave, side, precio_nivel)] de los niveles que el precio alcanzó"""
+        heaps = self._heaps.get(symbol)
+        if heaps is None:
+            return []
+
+        disparados = []
+        for side, heap in heaps.items():
+            while heap:
+                orden, version, clave = heap[0]
+                nivel = -orden if side == "long" else orden
+                vigente = self._niveles.get(clave)
+                if vigente is None or vigente[3] != version:
+                    heapq.heappop(heap)  # Desarmado o movido
+                    self._obsoletas -= 1
+                    continue
+                if (precio > nivel) if side == "long" else (precio < nivel):
+                    break
+                heapq.heappop(heap)
+                del self._niveles[clave]
+                disparados.append((clave, side, nivel))
+
+        if not heaps["long"] and not heaps["short"]:
+            del self._heaps[symbol]
+        return disparados
+
+    def _compactar(self):
+        """Reconstruye los heaps solo con los niveles vigentes"""
+        self._heaps = {}
+        for clave, (symbol, side, precio, version) in self._niveles.items():
+            heaps = self._heaps.setdefault(symbol, {"long": [], "short": []})
+            heaps[side].append((-precio if side == "long" else precio, version, clave))
+        for heaps in self._heaps.values():
+            heapq.heapify(heaps["long"])
+            heapq.heapify(heaps["short"])
+        self._obsoletas = 0
@@ -0,0 +1,108 @@
+"""
+📈 MÉTRICAS - HISTOGRAMAS DE LATENCIA EN FORMATO PROMETHEUS
+Registro de histogramas con buckets fijos, pensado para dejarse activo en producción
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Límites de los buckets en segundos
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+AYUDAS = {
+    "bot_senal_etapa_segundos": "Duración de cada etapa de una señal, de /signal al SL colocado",
+    "bot_senal_a_proteccion_segundos": "Tiempo desde que llega la señal hasta que la posición tiene SL",
+    "bot_ciclo_proteccion_segundos": "Duración de cada ciclo REST de la protección progresiva",
+    "bot_proteccion_precio_segundos": "Tiempo desde que llega un precio al actor del symbol hasta evaluarlo (y mover el SL)",
+    "bybit_llamada_segundos": "Duración de cada llamada HTTP a Bybit por endpoint",
+}
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos"""
+
+    __slots__ = ("cuentas", "suma", "total", "_lock")
+
+    def __init__(self):
+        self.cuentas = [0] * (len(BUCKETS) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor):
+        indice = bisect_left(BUCKETS, valor)
+        with self._lock:
+            self.cuentas[indice] += 1
+            self.suma += valor
+            self.total += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.cuentas), self.suma, self.total
+
+
+_histogramas = {}  # {(nombre, ((etiqueta, valor), ...)): Histograma}
+_registro_lock = threading.Lock()
+
+
+def histograma(nombre, **etiquetas):
+    clave = (nombre, tuple(sorted(etiquetas.items())))
+    h = _histogramas.get(clave)
+    if h is None:
+        with _registro_lock:
+            h = _histogramas.setdefault(clave, Histograma())
+    return h
+
+
+def observar(nombre, segundos, **etiquetas):
+    """Registra una muestra (en segundos)"""
+    histograma(nombre, **etiquetas).observar(segundos)
+
+
+@contextmanager
+def medir(nombre, **etiquetas):
+    """Mide la duración del bloque y la registra en el histograma"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+
+def _formatear_etiquetas(etiquetas, extra=None):
+    pares = list(etiquetas) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{clave}="{valor}"' for clave, valor in pares) + "}"
+
+
+def exportar_prometheus(contadores=None, gauges=None):
+    """Genera el texto de /metrics. contadores y gauges son {nombre: valor} adicionales"""
+    lineas = []
+    with _registro_lock:
+        claves = sorted(_histogramas)
+
+    nombre_actual = None
+    for nombre, etiquetas in claves:
+        if nombre != nombre_actual:
+            nombre_actual = nombre
+            lineas.append(f"# HELP {nombre} {AYUDAS.get(nombre, nombre)}")
+            lineas.append(f"# TYPE {nombre} histogram")
+
+        cuentas, suma, total = _histogramas[(nombre, etiquetas)].snapshot()
+        acumulado = 0
+        for limite, cuenta in zip(BUCKETS, cuentas):
+            acumulado += cuenta
+            lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, ('le', limite))} {acumulado}")
+        lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, ('le', '+Inf'))} {total}")
+        lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {suma}")
+        lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {total}")
+
+    for tipo, valores in (("counter", contadores or {}), ("gauge", gauges or {})):
+        for nombre, valor in valores.items():
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.append(f"{nombre} {valor}")
+
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,534 @@
+"""
+🔮 MOTOR DEL ORÁCULO - MONITOREO SIN INTERFAZ
+Todo lo que hace el Bot Monitor salvo dibujar: monedas en monitor_binance.db, precios de Binance
+Futures (WebSocket con respaldo REST), índice de niveles y envío de señales al Bot 2 a 1.
+Lo corre el servicio headless (oraculo_servicio.py); la ventana de Tkinter es un cliente más.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import requests
+from binance.client import Client
+
+from feed_binance import BINANCE_WS_URL, FeedBinanceWS
+from indice_niveles import IndiceNiveles
+
+# ===== CONFIGURACIÓN =====
+BOT_2A1_URL = "http://localhost:5000"
+DATABASE_FILE = "monitor_binance.db"
+
+# Precios: "masivo" = una sola llamada por ciclo con todos los symbols de futuros (peso 2),
+# "por_simbolo" = una llamada por moneda (peso 1 cada una, el ciclo crece con la lista)
+MODO_PRECIOS = "masivo"
+INTERVALO_PRECIOS = 0.5  # Segundos por ciclo (2 veces por segundo)
+
+# Fuente de precios: "websocket" = streams de Binance (cada tick se evalúa al llegar, con REST de
+# respaldo mientras el stream está caído) | "rest" = solo consultas REST cada INTERVALO_PRECIOS
+FUENTE_PRECIOS = "websocket"
+STREAM_PRECIOS = "bookTicker"  # "bookTicker" (punto medio bid/ask) o "aggTrade" (último trade)
+
+SEGUNDOS_HASTA_BORRAR = 3  # Una moneda disparada sigue visible (en rojo) este tiempo
+MAX_LINEAS_LOG = 1000
+
+
+def obtener_precios_masivo(client, symbols):
+    """Una sola llamada con los precios de todos los symbols; devuelve {symbol: precio} de los vigilados"""
+    vigilados = set(symbols)
+    return {
+        ticker["symbol"]: float(ticker["price"])
+        for ticker in client.futures_symbol_ticker()
+        if ticker["symbol"] in vigilados
+    }
+
+
+def obtener_precios_por_simbolo(client, symbols, log=print):
+    """Una llamada por symbol; los que fallan se registran y se omiten"""
+    precios = {}
+    for symbol in symbols:
+        try:
+            ticker = client.futures_symbol_ticker(symbol=symbol)
+            precios[symbol] = float(ticker['price'])
+        except Exception as e:
+            log(f"❌ Error al obtener precio de {symbol}: {e}")
+    return precios
+
+
+def calcular_distancias(coin, current_price):
+    """Textos de distancia al entry LONG y SHORT (misma fórmula que el Oráculo)"""
+    # Calcular distancia LONG
+    long_distance_text = "---"
+    if coin["long_entry"]:
+        long_entry = coin["long_entry"]
+        distance_pct = abs((long_entry - current_price) / current_price * 100)
+        # Determinar si está por encima o por debajo
+        if current_price > long_entry:
+            long_distance_text = f"+{distance_pct:.2f}%"  # Precio por encima del entry
+        else:
+            long_distance_text = f"-{distance_pct:.2f}%"  # Precio por debajo del entry (activado)
+
+    # Calcular distancia SHORT
+    short_distance_text = "---"
+    if coin["short_entry"]:
+        short_entry = coin["short_entry"]
+        distance_pct = abs((short_entry - current_price) / current_price * 100)
+        # Determinar si está por encima o por debajo
+        if current_price < short_entry:
+            short_distance_text = f"-{distance_pct:.2f}%"  # Precio por debajo del entry
+        else:
+            short_distance_text = f"+{distance_pct:.2f}%"  # Precio por encima del entry (activado)
+
+    return long_distance_text, short_distance_text
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(p / 100 * len(ordenados)), len(ordenados) - 1)]
+
+
+class MotorOraculo:
+    """Monitoreo de precios y envío de señales; es seguro llamarlo desde varios hilos (API, precios)"""
+
+    def __init__(self, database_file=None, eco_consola=True, ws_url=BINANCE_WS_URL):
+        self.database_file = database_file or DATABASE_FILE
+        self.ws_url = ws_url  # Streams de precios (otro valor solo para pruebas contra un servidor local)
+        self.eco_consola = eco_consola  # Imprimir el log además de guardarlo
+
+        # Variables de control
+        self.monitoring = False
+        self.hilo_monitor = None
+        self.binance_client = None
+        self.monitored_coins = {}  # {symbol: {"long_entry": price, "long_sl": price, "short_entry": price, "short_sl": price, "current_price": price}}
+        self.triggered_signals = set()  # Para evitar enviar la misma señal múltiples veces
+        self.disparadas = {}  # {symbol: side} señales enviadas, hasta que se borra la moneda
+        self.symbols_sin_precio = set()  # Symbols vigilados que Binance no devolvió en el último ciclo
+        self.feed = None  # FeedBinanceWS mientras se monitorea por WebSocket
+        self.monedas_lock = threading.RLock()  # Base de datos y monitored_coins
+        self.niveles_lock = threading.Lock()  # Ticks del WebSocket y ciclos REST pueden coincidir
+        self.indice_niveles = IndiceNiveles()  # Entradas armadas (sin las señales ya enviadas)
+        self.latencias_disparo = deque(maxlen=1000)  # ms desde la llegada del tick hasta el disparo
+        self.ticks = 0  # Precios evaluados
+        self.senales_enviadas = 0
+
+        # Log con número de línea para que los clientes pidan solo lo nuevo
+        self.log_lock = threading.Lock()
+        self.lineas_log = deque(maxlen=MAX_LINEAS_LOG)  # [(número, texto)]
+        self.numero_log = 0
+
+        self.init_database()
+        self.load_coins_from_db()
+
+    # ===== LOG =====
+    def log(self, message):
+        """Registra un mensaje con hora (y lo imprime si eco_consola)"""
+        linea = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+        with self.log_lock:
+            self.numero_log += 1
+            self.lineas_log.append((self.numero_log, linea))
+        if self.eco_consola:
+            print(linea)
+
+    def log_desde(self, numero):
+        """Líneas del log posteriores a numero: ([(número, texto)], último número)"""
+        with self.log_lock:
+            return [(n, texto) for n, texto in self.lineas_log if n > numero], self.numero_log
+
+    # ===== BASE DE DATOS Y MONEDAS =====
+    def init_database(self):
+        """Inicializa la base de datos SQLite"""
+        conn = sqlite3.connect(self.database_file)
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS monitored_coins (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT UNIQUE NOT NULL,
+                long_entry REAL,
+                long_sl REAL,
+                short_entry REAL,
+                short_sl REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def load_coins_from_db(self):
+        """Carga las monedas desde la base de datos"""
+        conn = sqlite3.connect(self.database_file)
+        cursor = conn.cursor()
+        cursor.execute("SELECT symbol, long_entry, long_sl, short_entry, short_sl FROM monitored_coins")
+        rows = cursor.fetchall()
+        conn.close()
+
+        # Actualizar diccionario de monedas monitoreadas
+        with self.monedas_lock:
+            self.monitored_coins = {}
+            for row in rows:
+                symbol, long_entry, long_sl, short_entry, short_sl = row
+                self.monitored_coins[symbol] = {
+                    "long_entry": long_entry,
+                    "long_sl": long_sl,
+                    "short_entry": short_entry,
+                    "short_sl": short_sl,
+                    "current_price": None
+                }
+
+        self.armar_niveles()
+        self.sincronizar_feed()
+
+    def agregar_moneda(self, symbol, long_entry, long_sl, short_entry, short_sl):
+        """
+        Agrega una moneda a la lista de monitoreo.
+        ValueError si no hay ningún lado completo; sqlite3.IntegrityError si ya está en la lista
+        """
+        symbol = symbol.strip().upper()
+        if not symbol:
+            raise ValueError("Debes ingresar una moneda")
+        # Validar que al menos un lado esté configurado
+        if not (long_entry and long_sl) and not (short_entry and short_sl):
+            raise ValueError("Debes configurar al menos un lado (LONG o SHORT)")
+
+        with self.monedas_lock:
+            conn = sqlite3.connect(self.database_file)
+            try:
+                conn.execute("""
+                    INSERT INTO monitored_coins (symbol, long_entry, long_sl, short_entry, short_sl)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (symbol, long_entry, long_sl, short_entry, short_sl))
+                conn.commit()
+            finally:
+                conn.close()
+
+            self.monitored_coins[symbol] = {
+                "long_entry": long_entry,
+                "long_sl": long_sl,
+                "short_entry": short_entry,
+                "short_sl": short_sl,
+                "current_price": None
+            }
+            self.armar_niveles_moneda(symbol)
+
+        self.sincronizar_feed()
+        self.log(f"✅ {symbol} agregado correctamente")
+        return symbol
+
+    def actualizar_moneda(self, symbol, long_entry, long_sl, short_entry, short_sl):
+        """Actualiza los niveles de una moneda existente. KeyError si no está en la lista"""
+        symbol = symbol.strip().upper()
+        with self.monedas_lock:
+            if symbol not in self.monitored_coins:
+                raise KeyError(symbol)
+
+            conn = sqlite3.connect(self.database_file)
+            try:
+                conn.execute("""
+                    UPDATE monitored_coins
+                    SET long_entry=?, long_sl=?, short_entry=?, short_sl=?, updated_at=CURRENT_TIMESTAMP
+                    WHERE symbol=?
+                """, (long_entry, long_sl, short_entry, short_sl, symbol))
+                conn.commit()
+            finally:
+                conn.close()
+
+            coin = self.monitored_coins[symbol]
+            coin.update(long_entry=long_entry, long_sl=long_sl, short_entry=short_entry, short_sl=short_sl)
+            self.armar_niveles_moneda(symbol)
+
+        self.log(f"✏️ {symbol} actualizado correctamente")
+        return symbol
+
+    def eliminar_moneda(self, symbol):
+        """Quita la moneda de la base de datos y del monitoreo. Devuelve False si no estaba"""
+        symbol = symbol.strip().upper()
+        with self.monedas_lock:
+            conn = sqlite3.connect(self.database_file)
+            try:
+                borradas = conn.execute("DELETE FROM monitored_coins WHERE symbol=?", (symbol,)).rowcount
+                conn.commit()
+            finally:
+                conn.close()
+
+            existia = self.monitored_coins.pop(symbol, None) is not None
+            self.disparadas.pop(symbol, None)
+            with self.niveles_lock:
+                self.indice_niveles.desarmar(f"{symbol}_LONG")
+                self.indice_niveles.desarmar(f"{symbol}_SHORT")
+
+        self.sincronizar_feed()
+        return existia or borradas > 0
+
+    def estado_monedas(self):
+        """Monedas con precio actual, distancias y si ya enviaron señal"""
+        with self.monedas_lock:
+            monedas = [(symbol, dict(coin)) for symbol, coin in self.monitored_coins.items()]
+            disparadas = dict(self.disparadas)
+
+        resultado = []
+        for symbol, coin in monedas:
+            long_distance, short_distance = "---", "---"
+            if coin["current_price"]:
+                long_distance, short_distance = calcular_distancias(coin, coin["current_price"])
+            resultado.append(dict(
+                coin, symbol=symbol, long_distance=long_distance, short_distance=short_distance,
+                disparada=disparadas.get(symbol),
+            ))
+        return resultado
+
+    def estado(self):
+        """Resumen del motor para /status"""
+        latencias = list(self.latencias_disparo)
+        return {
+            "monitoreando": self.monitoring,
+            "monedas": len(self.monitored_coins),
+            "niveles_armados": len(self.indice_niveles),
+            "fuente_precios": FUENTE_PRECIOS,
+            "websocket_conectado": self.feed is not None and self.feed.conectado(),
+            "ticks": self.ticks,
+            "senales_enviadas": self.senales_enviadas,
+            "cpu_segundos": round(time.process_time(), 3),  # CPU del proceso (servicio o ventana)
+            "latencia_disparo_ms": {"p50": percentil(latencias, 50), "p99": percentil(latencias, 99)},
+        }
+
+    # ===== NIVELES =====
+    def armar_niveles(self):
+        """Reconstruye el índice de niveles con las monedas monitoreadas"""
+        indice = IndiceNiveles()
+        with self.monedas_lock:
+            for symbol, coin in self.monitored_coins.items():
+                for side, entry in self.lados_armables(symbol, coin):
+                    indice.armar(f"{symbol}_{side.upper()}", symbol, side, entry)
+        with self.niveles_lock:
+            self.indice_niveles = indice
+
+    def armar_niveles_moneda(self, symbol):
+        """Vuelve a armar los niveles de una sola moneda (alta o cambio), en O(log n)"""
+        coin = self.monitored_coins[symbol]
+        with self.niveles_lock:
+            self.indice_niveles.desarmar(f"{symbol}_LONG")
+            self.indice_niveles.desarmar(f"{symbol}_SHORT")
+            for side, entry in self.lados_armables(symbol, coin):
+                self.indice_niveles.armar(f"{symbol}_{side.upper()}", symbol, side, entry)
+
+    def lados_armables(self, symbol, coin):
+        """Lados con entry y SL configurados que todavía no enviaron señal"""
+        lados = (("long", coin["long_entry"], coin["long_sl"]), ("short", coin["short_entry"], coin["short_sl"]))
+        return [
+            (side, entry) for side, entry, sl in lados
+            if entry and sl and f"{symbol}_{side.upper()}" not in self.triggered_signals
+        ]
+
+    def check_price_levels(self, symbol, current_price, recibido=None):
+        """
+        Verifica si el precio alcanzó algún nivel de entrada.
+        Solo se tocan los niveles que el precio cruzó (ver IndiceNiveles).
+        recibido: time.perf_counter() al llegar el tick, para medir la latencia tick→disparo
+        """
+        with self.niveles_lock:
+            cruzados = self.indice_niveles.cruzados(symbol, current_price)
+            if not cruzados:
+                return
+
+            # Una señal por tick y LONG primero; si cruzó los dos lados, SHORT queda armado
+            cruzados.sort(key=lambda nivel: nivel[1] != "long")
+            for signal_key, side, entry in cruzados[1:]:
+                self.indice_niveles.armar(signal_key, symbol, side, entry)
+            signal_key, side, _ = cruzados[0]
+            self.triggered_signals.add(signal_key)
+
+            coin = self.monitored_coins.get(symbol)
+            if coin is None:
+                return
+
+        # La señal se envía fuera del lock: los demás ticks no esperan la respuesta HTTP
+        if side == "long":
+            self.log(f"🟢 {symbol}: Precio {current_price:.8f} alcanzó LONG Entry {coin['long_entry']}"
+                     f"{self.latencia_disparo(recibido)}")
+            self.send_signal_to_bot_2a1(symbol, "long", coin["long_entry"], coin["long_sl"])
+        else:
+            self.log(f"🔴 {symbol}: Precio {current_price:.8f} alcanzó SHORT Entry {coin['short_entry']}"
+                     f"{self.latencia_disparo(recibido)}")
+            self.send_signal_to_bot_2a1(symbol, "short", coin["short_entry"], coin["short_sl"])
+        self.senales_enviadas += 1
+        # Marcar y eliminar después de SEGUNDOS_HASTA_BORRAR
+        self.mark_and_remove_coin(symbol, side)
+
+    def latencia_disparo(self, recibido):
+        """Registra la latencia tick→disparo y la devuelve como texto para el log"""
+        if recibido is None:
+            return ""
+        ms = (time.perf_counter() - recibido) * 1000
+        self.latencias_disparo.append(ms)
+        return f" (tick→disparo {ms:.2f} ms)"
+
+    def mark_and_remove_coin(self, symbol, side):
+        """Marca la moneda como disparada y la elimina después de SEGUNDOS_HASTA_BORRAR"""
+        with self.monedas_lock:
+            self.disparadas[symbol] = side
+        self.log(f"🔴 {symbol} marcado - Se eliminará en {SEGUNDOS_HASTA_BORRAR} segundos...")
+        threading.Timer(SEGUNDOS_HASTA_BORRAR, lambda: self.remove_coin_from_monitoring(symbol)).start()
+
+    def remove_coin_from_monitoring(self, symbol):
+        """Elimina la moneda del monitoreo y de la base de datos"""
+        try:
+            self.eliminar_moneda(symbol)
+            self.log(f"🗑️ {symbol} eliminado del monitoreo")
+        except Exception as e:
+            self.log(f"❌ Error al eliminar {symbol}: {e}")
+
+    # ===== PRECIOS =====
+    def sincronizar_feed(self):
+        """Suscribe/desuscribe el WebSocket según las monedas monitoreadas"""
+        if self.feed is not None:
+            self.feed.sincronizar(list(self.monitored_coins))
+
+    def obtener_precios(self, symbols):
+        """Precios actuales de los symbols según MODO_PRECIOS"""
+        if MODO_PRECIOS == "por_simbolo":
+            return obtener_precios_por_simbolo(self.binance_client, symbols, self.log)
+
+        try:
+            precios = obtener_precios_masivo(self.binance_client, symbols)
+        except Exception as e:
+            self.log(f"❌ Error al obtener precios: {e}")
+            return {}
+
+        # Symbols que Binance no devuelve (mal escritos o deslistados): avisar una sola vez
+        for symbol in set(symbols) - set(precios) - self.symbols_sin_precio:
+            self.log(f"⚠️ {symbol} no aparece en Binance Futures")
+        self.symbols_sin_precio = set(symbols) - set(precios)
+        return precios
+
+    def on_precio_ws(self, symbol, current_price, recibido, evento_ms):
+        """Tick del WebSocket: se evalúa en el momento"""
+        coin = self.monitored_coins.get(symbol)
+        if coin is None:
+            return
+        coin["current_price"] = current_price
+        self.ticks += 1
+        self.check_price_levels(symbol, current_price, recibido)
+
+    def ciclo_rest(self):
+        """Un ciclo de precios por REST: precio y niveles de todas las monedas"""
+        symbols = list(self.monitored_coins.keys())
+        if not symbols:
+            return
+        precios = self.obtener_precios(symbols)
+
+        for symbol, current_price in precios.items():
+            # La moneda pudo eliminarse mientras se pedían los precios
+            coin = self.monitored_coins.get(symbol)
+            if coin is None:
+                continue
+            try:
+                coin["current_price"] = current_price
+                self.ticks += 1
+
+                # Verificar si se alcanzó algún nivel
+                self.check_price_levels(symbol, current_price)
+
+            except Exception as e:
+                self.log(f"❌ Error al procesar precio de {symbol}: {e}")
+
+    def iniciar_monitoreo(self):
+        """Arranca el hilo de monitoreo. Devuelve False si ya estaba corriendo"""
+        if self.monitoring:
+            return False
+        # Un monitoreo recién detenido termina su ciclo (y cierra su WebSocket) antes de arrancar otro
+        if self.hilo_monitor is not None:
+            self.hilo_monitor.join()
+        self.monitoring = True
+        self.log("🚀 Iniciando monitoreo...")
+        self.hilo_monitor = threading.Thread(target=self.monitor_prices, daemon=True)
+        self.hilo_monitor.start()
+        return True
+
+    def detener_monitoreo(self):
+        """Detiene el monitoreo. Devuelve False si no estaba corriendo"""
+        if not self.monitoring:
+            return False
+        self.monitoring = False
+        self.log("⏸️ Monitoreo detenido")
+        return True
+
+    def monitor_prices(self):
+        """Monitorea los precios por WebSocket (o REST, como respaldo o si así se configura)"""
+        try:
+            # Crear cliente de Binance (sin API keys, solo para datos públicos). Sin ping inicial: si
+            # Binance no responde al arrancar, el servicio sigue y los ciclos REST reintentan solos
+            self.binance_client = Client(ping=False)
+
+            if FUENTE_PRECIOS == "websocket":
+                self.feed = FeedBinanceWS(self.on_precio_ws, tipo=STREAM_PRECIOS, url=self.ws_url, log=self.log)
+                self.sincronizar_feed()
+                self.feed.iniciar()
+
+            self.log(f"📊 Monitoreando {len(self.monitored_coins)} monedas...")
+
+            por_websocket = False
+            while self.monitoring:
+                inicio_ciclo = time.monotonic()
+
+                if self.feed is not None and self.feed.conectado():
+                    por_websocket = True  # Los precios llegan tick a tick por on_precio_ws
+                else:
+                    if por_websocket:
+                        self.log("↩️ Sin WebSocket: precios por REST hasta que se reconecte")
+                        por_websocket = False
+                    self.ciclo_rest()
+
+                # Ciclo fijo: se descuenta lo que tardó la consulta
+                time.sleep(max(0.0, INTERVALO_PRECIOS - (time.monotonic() - inicio_ciclo)))
+
+        except Exception as e:
+            self.log(f"❌ Error en el monitoreo: {e}")
+            self.monitoring = False
+
+        finally:
+            if self.feed is not None:
+                self.feed.detener()
+                self.feed = None
+
+    # ===== BOT 2 A 1 =====
+    def send_signal_to_bot_2a1(self, symbol, side, entry_price, sl_price):
+        """Envía la señal al Bot 2 a 1"""
+        try:
+            # Calcular distancia del SL en porcentaje
+            if side == "long":
+                distancia_sl = ((entry_price - sl_price) / entry_price) * 100
+            else:  # short
+                distancia_sl = ((sl_price - entry_price) / entry_price) * 100
+
+            # Preparar datos
+            url = f"{BOT_2A1_URL}/signal"
+            data = {
+                "symbol": symbol,
+                "side": side,
+                "distancia_sl": round(distancia_sl, 2)
+            }
+
+            self.log(f"📡 Enviando señal al Bot 2 a 1: {symbol} {side.upper()} (SL: {distancia_sl:.2f}%)")
+
+            # Enviar señal
+            response = requests.post(url, json=data, timeout=10)
+            resultado = response.json()
+
+            if response.status_code == 202:
+                self.log(f"📥 Señal encolada en Bot 2 a 1 (ticket {resultado['ticket']})")
+            elif response.status_code == 200:
+                if resultado['status'] == 'success':
+                    self.log(f"✅ Señal enviada exitosamente: {resultado['message']}")
+                elif resultado['status'] == 'ignored':
+                    self.log(f"⚠️ Señal ignorada: {resultado['message']}")
+                elif resultado['status'] == 'rejected':
+                    self.log(f"⚠️ Señal rechazada: {resultado['message']}")
+            else:
+                self.log(f"❌ Error al enviar señal: {resultado['message']}")
+
+        except Exception as e:
+            self.log(f"❌ Error al enviar señal al Bot 2 a 1: {e}")
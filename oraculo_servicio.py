@@ -0,0 +1,238 @@
+"""
+🔮 ORÁCULO HEADLESS - SERVICIO DE MONITOREO SIN PANTALLA
+Corre el motor del Oráculo como demonio (sin Tkinter) con una API HTTP local para administrar
+las monedas sobre la misma monitor_binance.db. La ventana (Bot_Monitor_ORACULO.py) y la línea
+de comandos de este mismo archivo son clientes de esa API.
+
+Uso:
+    python oraculo_servicio.py servir                  # demonio: API + monitoreo
+    python oraculo_servicio.py listar
+    python oraculo_servicio.py agregar BTCUSDT --long 60000 59000 --short 70000 71000
+    python oraculo_servicio.py actualizar BTCUSDT --long 61000 60000
+    python oraculo_servicio.py eliminar BTCUSDT
+    python oraculo_servicio.py estado | iniciar | detener | log
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import threading
+
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+import oraculo_motor
+from feed_binance import BINANCE_WS_URL
+from oraculo_motor import MotorOraculo
+
+# ===== CONFIGURACIÓN =====
+ORACULO_HOST = "127.0.0.1"  # Solo local: la API no tiene autenticación
+ORACULO_PUERTO = 5050
+ORACULO_URL = f"http://{ORACULO_HOST}:{ORACULO_PUERTO}"
+
+
+# ===== LÓGICA DE LA API =====
+def leer_niveles(data):
+    """(long_entry, long_sl, short_entry, short_sl) como float o None; ValueError si no son números"""
+    niveles = []
+    for campo in ("long_entry", "long_sl", "short_entry", "short_sl"):
+        valor = data.get(campo)
+        niveles.append(float(valor) if valor not in (None, "") else None)
+    return niveles
+
+
+def agregar(motor, data):
+    """Alta de una moneda. Devuelve (respuesta, código HTTP)"""
+    try:
+        niveles = leer_niveles(data)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Los precios deben ser números válidos"}, 400
+    try:
+        symbol = motor.agregar_moneda(data.get("symbol") or "", *niveles)
+        return {"status": "success", "message": f"{symbol} agregado correctamente"}, 201
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}, 400
+    except sqlite3.IntegrityError:
+        return {"status": "error", "message": f"{data.get('symbol', '').strip().upper()} ya está en la lista"}, 409
+
+
+def actualizar(motor, symbol, data):
+    """Cambio de niveles de una moneda. Devuelve (respuesta, código HTTP)"""
+    try:
+        niveles = leer_niveles(data)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Los precios deben ser números válidos"}, 400
+    try:
+        symbol = motor.actualizar_moneda(symbol, *niveles)
+        return {"status": "success", "message": f"{symbol} actualizado correctamente"}, 200
+    except KeyError:
+        return {"status": "error", "message": f"{symbol} no está en la lista"}, 404
+
+
+def eliminar(motor, symbol):
+    """Baja de una moneda. Devuelve (respuesta, código HTTP)"""
+    if not motor.eliminar_moneda(symbol):
+        return {"status": "error", "message": f"{symbol} no está en la lista"}, 404
+    motor.log(f"🗑️ {symbol.upper()} eliminado")
+    return {"status": "success", "message": f"{symbol.upper()} eliminado"}, 200
+
+
+def crear_app(motor):
+    """Aplicación Flask con la API del Oráculo sobre un motor ya creado"""
+    app = Flask(__name__)
+
+    @app.route('/status', methods=['GET'])
+    def get_status():
+        return jsonify(motor.estado()), 200
+
+    @app.route('/monedas', methods=['GET'])
+    def get_monedas():
+        return jsonify(motor.estado_monedas()), 200
+
+    @app.route('/monedas', methods=['POST'])
+    def post_moneda():
+        respuesta, codigo = agregar(motor, request.get_json(silent=True) or {})
+        return jsonify(respuesta), codigo
+
+    @app.route('/monedas/<symbol>', methods=['PUT'])
+    def put_moneda(symbol):
+        respuesta, codigo = actualizar(motor, symbol, request.get_json(silent=True) or {})
+        return jsonify(respuesta), codigo
+
+    @app.route('/monedas/<symbol>', methods=['DELETE'])
+    def delete_moneda(symbol):
+        respuesta, codigo = eliminar(motor, symbol)
+        return jsonify(respuesta), codigo
+
+    @app.route('/monitoreo/iniciar', methods=['POST'])
+    def post_iniciar():
+        iniciado = motor.iniciar_monitoreo()
+        return jsonify({"status": "success" if iniciado else "ignored", "monitoreando": True}), 200
+
+    @app.route('/monitoreo/detener', methods=['POST'])
+    def post_detener():
+        detenido = motor.detener_monitoreo()
+        return jsonify({"status": "success" if detenido else "ignored", "monitoreando": False}), 200
+
+    @app.route('/log', methods=['GET'])
+    def get_log():
+        lineas, ultimo = motor.log_desde(request.args.get("desde", 0, type=int))
+        return jsonify({"lineas": [texto for _, texto in lineas], "ultimo": ultimo}), 200
+
+    return app
+
+
+def iniciar_servidor(motor, host=ORACULO_HOST, puerto=ORACULO_PUERTO):
+    """Levanta la API en un hilo; devuelve el servidor (servidor.shutdown() para pararlo)"""
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # Sin una línea por petición
+    servidor = make_server(host, puerto, crear_app(motor), threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def servicio_activo(url=ORACULO_URL):
+    try:
+        return requests.get(f"{url}/status", timeout=1).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+# ===== LÍNEA DE COMANDOS =====
+def servir(args):
+    motor = MotorOraculo(args.db, ws_url=args.ws_url)
+    servidor = iniciar_servidor(motor, args.host, args.puerto)
+    motor.log(f"🔮 Oráculo headless escuchando en http://{args.host}:{args.puerto} "
+              f"({len(motor.monitored_coins)} monedas en {motor.database_file})")
+    if not args.sin_monitoreo:
+        motor.iniciar_monitoreo()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        motor.detener_monitoreo()
+        servidor.shutdown()
+
+
+def niveles_cli(args):
+    datos = {}
+    if args.long:
+        datos["long_entry"], datos["long_sl"] = args.long
+    if args.short:
+        datos["short_entry"], datos["short_sl"] = args.short
+    return datos
+
+
+def cliente(args):
+    """Comandos que hablan con un servicio ya corriendo"""
+    url = args.url
+    if args.comando == "listar":
+        respuesta = requests.get(f"{url}/monedas", timeout=10)
+        for moneda in respuesta.json():
+            marca = f"  🔴 señal {moneda['disparada']} enviada" if moneda["disparada"] else ""
+            precio = f"{moneda['current_price']:.8g}" if moneda["current_price"] else "---"
+            print(f"{moneda['symbol']:<14} precio {precio:>14} | 🟢 {moneda['long_entry'] or '---'} "
+                  f"({moneda['long_distance']}) SL {moneda['long_sl'] or '---'} | 🔴 {moneda['short_entry'] or '---'} "
+                  f"({moneda['short_distance']}) SL {moneda['short_sl'] or '---'}{marca}")
+        return
+    if args.comando == "log":
+        for linea in requests.get(f"{url}/log", timeout=10).json()["lineas"]:
+            print(linea)
+        return
+
+    if args.comando == "estado":
+        respuesta = requests.get(f"{url}/status", timeout=10)
+    elif args.comando == "agregar":
+        respuesta = requests.post(f"{url}/monedas", json=dict(niveles_cli(args), symbol=args.symbol), timeout=10)
+    elif args.comando == "actualizar":
+        # Los lados que no se indican conservan sus niveles
+        actual = next((m for m in requests.get(f"{url}/monedas", timeout=10).json()
+                       if m["symbol"] == args.symbol.upper()), {})
+        datos = {campo: actual.get(campo) for campo in ("long_entry", "long_sl", "short_entry", "short_sl")}
+        datos.update(niveles_cli(args))
+        respuesta = requests.put(f"{url}/monedas/{args.symbol.upper()}", json=datos, timeout=10)
+    elif args.comando == "eliminar":
+        respuesta = requests.delete(f"{url}/monedas/{args.symbol.upper()}", timeout=10)
+    else:
+        respuesta = requests.post(f"{url}/monitoreo/{args.comando}", timeout=10)
+
+    datos = respuesta.json()
+    print(("✅ " if respuesta.ok else "❌ ") + (datos.get("message") or str(datos)))
+    if not respuesta.ok:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oráculo sin pantalla: servicio de monitoreo y su API")
+    parser.add_argument("--url", default=ORACULO_URL, help="Servicio al que hablan los comandos cliente")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    servir_parser = comandos.add_parser("servir", help="Corre el servicio (API + monitoreo)")
+    servir_parser.add_argument("--host", default=ORACULO_HOST)
+    servir_parser.add_argument("--puerto", type=int, default=ORACULO_PUERTO)
+    servir_parser.add_argument("--db", default=oraculo_motor.DATABASE_FILE)
+    servir_parser.add_argument("--ws-url", default=BINANCE_WS_URL, help="Streams de precios (pruebas con un servidor local)")
+    servir_parser.add_argument("--sin-monitoreo", action="store_true", help="Solo la API; iniciar luego con 'iniciar'")
+
+    for nombre in ("agregar", "actualizar"):
+        sub = comandos.add_parser(nombre)
+        sub.add_argument("symbol")
+        sub.add_argument("--long", nargs=2, type=float, metavar=("ENTRY", "SL"))
+        sub.add_argument("--short", nargs=2, type=float, metavar=("ENTRY", "SL"))
+    comandos.add_parser("eliminar").add_argument("symbol")
+    for nombre in ("listar", "estado", "iniciar", "detener", "log"):
+        comandos.add_parser(nombre)
+
+    args = parser.parse_args()
+    if args.comando == "servir":
+        servir(args)
+        return
+    try:
+        cliente(args)
+    except requests.ConnectionError:
+        print(f"❌ No hay un Oráculo escuchando en {args.url} (python oraculo_servicio.py servir)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+🌐 PRUEBA DEL CLIENTE BYBIT - REINTENTOS Y RATE LIMIT CON LAS EXCEPCIONES DE PYBIT
+1) crear_http contra un transporte falso que responde 10006 y HTTP 403: pybit hace un solo envío,
+   sin dormir, y lanza InvalidRequestError / FailedRequestError con el código en status_code.
+2) ClienteBybit sobre una sesión falsa que lanza las excepciones de pybit:
+  - un throttle (10006 o HTTP 403) se cuenta, alinea la cubeta con sus cabeceras y la lectura se reintenta
+  - un error de Bybit que no es rate limit (10001) no se reintenta ni se cuenta como throttle
+  - un error de red se reintenta sin contarse como throttle, aunque su texto diga "10006" o "403"
+3) Prioridades: al liberarse la cubeta global (la única que comparten), un place_order que llegó
+   después adelanta a los get_closed_pnl que ya esperaban; con la cubeta propia de get_closed_pnl
+   agotada, place_order no espera
+
+Uso:
+    python prueba_cliente_bybit.py
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+from requests.structures import CaseInsensitiveDict
+
+from cliente_bybit import ClienteBybit, CubetaTokens, crear_http
+
+
+def respuesta_http(estado, cuerpo, cabeceras, url):
+    """requests.Response armada a mano, como la que devuelve el transporte de pybit"""
+    respuesta = requests.Response()
+    respuesta.status_code = estado
+    respuesta._content = json.dumps(cuerpo).encode()
+    respuesta.headers = CaseInsensitiveDict(cabeceras)
+    respuesta.url = url
+    respuesta.elapsed = timedelta(0)
+    return respuesta
+
+
+def error_bybit(codigo, mensaje, cabeceras=None):
+    return InvalidRequestError(request="get_tickers", message=mensaje, status_code=codigo, time="", resp_headers=cabeceras)
+
+
+class SesionFalsa:
+    """Sesión con get_tickers que lanza (o devuelve) en orden lo que se le guionó.
+    get_closed_pnl y place_order responden al instante y anotan el orden en que llegaron"""
+
+    def __init__(self):
+        self.guion = []
+        self.llamadas = 0
+        self.atendidas = []
+
+    def get_tickers(self, **kwargs):
+        self.llamadas += 1
+        paso = self.guion.pop(0) if self.guion else {"retCode": 0, "retMsg": "OK", "result": {"list": []}}
+        if isinstance(paso, Exception):
+            raise paso
+        return paso
+
+    def get_closed_pnl(self, **kwargs):
+        self.atendidas.append("get_closed_pnl")
+        return {"retCode": 0, "retMsg": "OK", "result": {"list": []}}
+
+    def place_order(self, **kwargs):
+        self.atendidas.append("place_order")
+        return {"retCode": 0, "retMsg": "OK", "result": {"orderId": "1"}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reintentos y rate limit de ClienteBybit con excepciones de pybit")
+    parser.add_argument("--reinicio-ms", type=int, default=300, help="Reinicio del rate limit en las cabeceras")
+    parser.add_argument("--consultas-en-cola", type=int, default=5, help="get_closed_pnl esperando antes de la orden")
+    args = parser.parse_args()
+    errores = []
+
+    # ===== 1) PYBIT SIN REINTENTOS PROPIOS =====
+    http = crear_http(testnet=False, api_key="clave", api_secret="secreto")
+    for estado, cuerpo, esperado in [
+        (200, {"retCode": 10006, "retMsg": "Too many visits!", "result": {}}, (InvalidRequestError, 10006)),
+        (403, {}, (FailedRequestError, 403)),
+    ]:
+        envios = []
+
+        def enviar(peticion, timeout=None):
+            envios.append(peticion.url)
+            reinicio = int(time.time() * 1000) + args.reinicio_ms
+            return respuesta_http(estado, cuerpo, {"X-Bapi-Limit-Status": "0",
+                                                   "X-Bapi-Limit-Reset-Timestamp": str(reinicio)}, peticion.url)
+
+        http.client.send = enviar
+        inicio = time.perf_counter()
+        try:
+            http.get_tickers(category="linear")
+            obtenido = None
+        except Exception as e:
+            obtenido = (type(e), getattr(e, "status_code", None))
+        duracion = time.perf_counter() - inicio
+        print(f"📡 pybit con HTTP {estado} / {cuerpo.get('retCode')}: {obtenido[0].__name__ if obtenido else 'sin error'} "
+              f"{obtenido[1] if obtenido else ''}, {len(envios)} envío(s) en {duracion * 1000:.0f} ms")
+        if obtenido != esperado:
+            errores.append(f"pybit lanzó {obtenido} en lugar de {esperado}")
+        if len(envios) != 1 or duracion > 0.1:
+            errores.append(f"pybit reintentó por su cuenta: {len(envios)} envíos en {duracion * 1000:.0f} ms")
+
+    # ===== 2) CLASIFICACIÓN EN CLIENTEBYBIT =====
+    sesion = SesionFalsa()
+    cliente = ClienteBybit(sesion)
+
+    def correr(nombre, guion, throttles, reintentos, falla):
+        sesion.guion = list(guion)
+        antes = cliente.metricas()
+        try:
+            cliente.get_tickers(category="linear")
+            fallo = False
+        except Exception:
+            fallo = True
+        despues = cliente.metricas()
+        contados = (despues["throttles"] - antes["throttles"], despues["reintentos"] - antes["reintentos"])
+        print(f"🔁 {nombre}: throttles {contados[0]}, reintentos {contados[1]}, {'falló' if fallo else 'respondió'}")
+        if contados != (throttles, reintentos) or fallo != falla:
+            errores.append(f"{nombre}: throttles/reintentos {contados} y falló={fallo} "
+                           f"(esperado {(throttles, reintentos)} y falló={falla})")
+
+    correr("10006 dos veces y respuesta", [error_bybit(10006, "Too many visits!")] * 2, 2, 2, False)
+    correr("HTTP 403 y respuesta", [FailedRequestError(request="get_tickers", message="IP rate limit",
+                                                        status_code=403, time="", resp_headers=None)], 1, 1, False)
+    correr("10001 parámetros inválidos", [error_bybit(10001, "params error")], 0, 0, True)
+    correr("Error de red con '10006' y '403' en el texto",
+           [ConnectionError("reset en SIM10006USDT, puerto 4030")], 0, 1, False)
+
+    # Un throttle con cabeceras bloquea la cubeta: el reintento sale recién con el reinicio que informa Bybit
+    antes = cliente.metricas()["throttles"]
+    inicio = time.perf_counter()
+    reinicio = int(time.time() * 1000) + args.reinicio_ms
+    sesion.guion = [error_bybit(10006, "Too many visits!", {"X-Bapi-Limit-Status": "0",
+                                                            "X-Bapi-Limit-Reset-Timestamp": str(reinicio)})]
+    cliente.get_tickers(category="linear")
+    espera = time.perf_counter() - inicio
+    contados = cliente.metricas()["throttles"] - antes
+    print(f"⏳ 10006 con reinicio en {args.reinicio_ms} ms: el reintento salió a los {espera * 1000:.0f} ms, "
+          f"throttles {contados}")
+    if espera < args.reinicio_ms / 1000 * 0.9:
+        errores.append("El reintento no esperó el reinicio de las cabeceras del throttle")
+    if contados != 1:
+        errores.append(f"Un throttle con cabeceras se contó {contados} veces")
+
+    # ===== 3) PRIORIDADES =====
+    # Cubeta global bloqueada por un throttle con los get_closed_pnl ya en cola cuando llega la orden; al
+    # liberarse, la condición despierta primero a los que esperan hace más, así que sin prioridades
+    # el primer token se lo llevaría un get_closed_pnl
+    sesion = SesionFalsa()
+    cliente = ClienteBybit(sesion)
+    global_ = cliente.cubeta_global = CubetaTokens(10, capacidad=1)
+    global_.ajustar(0, time.monotonic() + 10)
+
+    def esperar_en_cola(prioridad, cantidad):
+        while global_.esperando.get(prioridad, 0) < cantidad:
+            time.sleep(0.001)
+
+    hilos = [threading.Thread(target=lambda: cliente.get_closed_pnl(category="linear"))
+             for _ in range(args.consultas_en_cola)]
+    for hilo in hilos:
+        hilo.start()
+    esperar_en_cola(2, args.consultas_en_cola)
+    hilos.append(threading.Thread(target=lambda: cliente.place_order(
+        category="linear", symbol="BTCUSDT", side="Buy", orderType="Market", qty="1")))
+    hilos[-1].start()
+    esperar_en_cola(0, 1)
+    with global_._condicion:
+        global_.bloqueada_hasta = 0.0
+        global_.tokens, global_.ultimo = 1.0, time.monotonic()
+        global_._condicion.notify_all()
+    for hilo in hilos:
+        hilo.join()
+    posicion = sesion.atendidas.index("place_order")
+    print(f"🚦 Cubeta global liberada con {args.consultas_en_cola} get_closed_pnl en cola antes que la orden: "
+          f"la orden salió {posicion + 1}ª")
+    if posicion != 0:
+        errores.append(f"place_order no adelantó a los get_closed_pnl en cola: salió {posicion + 1}ª")
+
+    # Cubeta de get_closed_pnl agotada con consultas en cola: place_order usa la suya y no espera
+    sesion = SesionFalsa()
+    cliente = ClienteBybit(sesion)
+    cliente.cubetas["get_closed_pnl"] = CubetaTokens(2, capacidad=1)
+    consultas = [threading.Thread(target=lambda: cliente.get_closed_pnl(category="linear")) for _ in range(4)]
+    for hilo in consultas:
+        hilo.start()
+    time.sleep(0.02)
+    inicio = time.perf_counter()
+    cliente.place_order(category="linear", symbol="BTCUSDT", side="Buy", orderType="Market", qty="1")
+    espera_orden = time.perf_counter() - inicio
+    en_cola = sesion.atendidas.count("get_closed_pnl")
+    for hilo in consultas:
+        hilo.join()
+    print(f"🚦 Cubeta de get_closed_pnl agotada ({4 - en_cola} en cola): la orden esperó {espera_orden * 1000:.0f} ms")
+    if espera_orden > 0.05:
+        errores.append(f"place_order esperó {espera_orden * 1000:.0f} ms por la cubeta de get_closed_pnl")
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Un solo intento en pybit, throttles clasificados por excepción y código, y las órdenes primero")
+
+
+if __name__ == "__main__":
+    main()
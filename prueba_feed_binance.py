@@ -0,0 +1,277 @@
+"""
+📼 PRUEBA DEL FEED WEBSOCKET DE BINANCE CONTRA UN SERVIDOR LOCAL
+Levanta un servidor WebSocket local que imita los streams combinados de Binance Futures
+(SUBSCRIBE/UNSUBSCRIBE) y reproduce ticks grabados solo a los streams suscritos. Conecta el
+FeedBinanceWS del Oráculo y comprueba suscripciones dinámicas, reconexión con resuscripción
+y mide la latencia tick→disparo con la misma check_price_levels del motor.
+
+Uso:
+    python prueba_feed_binance.py                      # ticks sintéticos
+    python prueba_feed_binance.py --ticks ticks.jsonl  # ticks grabados
+    python prueba_feed_binance.py --grabar ticks.jsonl --symbols BTCUSDT,ETHUSDT --segundos 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+
+import websocket
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from feed_binance import BINANCE_WS_URL, FeedBinanceWS, nombre_stream
+from oraculo_motor import MotorOraculo
+from utilidades_prueba import percentiles
+
+
+# ===== GRABACIÓN Y GENERACIÓN DE TICKS =====
+def grabar(archivo, symbols, tipo, segundos):
+    """Graba los mensajes de los streams combinados reales de Binance como {"t", "mensaje"} por línea"""
+    streams = "/".join(nombre_stream(symbol, tipo) for symbol in symbols)
+    conexion = websocket.create_connection(f"{BINANCE_WS_URL}?streams={streams}", timeout=10)
+    inicio = time.monotonic()
+    total = 0
+    with open(archivo, "w") as salida:
+        while time.monotonic() - inicio < segundos:
+            mensaje = json.loads(conexion.recv())
+            salida.write(json.dumps({"t": round(time.monotonic() - inicio, 6), "mensaje": mensaje}) + "\n")
+            total += 1
+    conexion.close()
+    print(f"💾 {total} ticks grabados en {archivo}")
+
+
+def cargar_ticks(archivo):
+    with open(archivo) as entrada:
+        return [(registro["t"], registro["mensaje"]) for registro in map(json.loads, entrada)]
+
+
+def generar_ticks(symbols, segundos, ticks_por_segundo, semilla):
+    """Ticks bookTicker sintéticos: paseo aleatorio por symbol con llegadas de Poisson"""
+    rng = random.Random(semilla)
+    ticks = []
+    for symbol in symbols:
+        precio = rng.uniform(1, 1000)
+        t = rng.expovariate(ticks_por_segundo)
+        while t < segundos:
+            precio *= 1 + rng.gauss(0, 0.0003)
+            medio = precio * 0.0001
+            ticks.append((t, {
+                "stream": nombre_stream(symbol, "bookTicker"),
+                "data": {"e": "bookTicker", "s": symbol, "b": f"{precio - medio:.6f}", "B": "1",
+                         "a": f"{precio + medio:.6f}", "A": "1", "E": 0, "T": 0},
+            }))
+            t += rng.expovariate(ticks_por_segundo)
+    ticks.sort(key=lambda tick: tick[0])
+    return ticks
+
+
+# ===== SERVIDOR LOCAL =====
+class ServidorReplay:
+    """
+    Servidor con el protocolo de suscripción de Binance. Reproduce los ticks en bucle con su
+    espaciado original y re-estampa E/T con la hora de envío (ms con decimales) para medir latencia
+    """
+
+    def __init__(self, ticks, velocidad=1.0):
+        self.ticks = ticks
+        self.velocidad = velocidad
+        self.conexiones = set()
+        self.pedidos = []  # (método, cantidad de streams) en orden de llegada
+        self.loop = None
+        self.puerto = None
+
+    def iniciar(self):
+        listo = threading.Event()
+
+        async def principal():
+            servidor = await serve(self._manejar, "127.0.0.1", 0)
+            self.puerto = servidor.sockets[0].getsockname()[1]
+            listo.set()
+            await servidor.serve_forever()
+
+        def correr():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(principal())
+
+        threading.Thread(target=correr, daemon=True).start()
+        listo.wait()
+        return f"ws://127.0.0.1:{self.puerto}/stream"
+
+    def cortar(self):
+        """Cierra todas las conexiones, como un corte del lado de Binance"""
+        for conexion in list(self.conexiones):
+            asyncio.run_coroutine_threadsafe(conexion.close(1001), self.loop)
+
+    async def _manejar(self, conexion):
+        self.conexiones.add(conexion)
+        streams = set()
+        reproduccion = asyncio.create_task(self._reproducir(conexion, streams))
+        try:
+            async for texto in conexion:
+                pedido = json.loads(texto)
+                params = pedido.get("params", [])
+                if pedido["method"] == "SUBSCRIBE":
+                    streams.update(params)
+                elif pedido["method"] == "UNSUBSCRIBE":
+                    streams.difference_update(params)
+                self.pedidos.append((pedido["method"], len(params)))
+                await conexion.send(json.dumps({"result": None, "id": pedido["id"]}))
+        except ConnectionClosed:
+            pass
+        finally:
+            reproduccion.cancel()
+            self.conexiones.discard(conexion)
+
+    async def _reproducir(self, conexion, streams):
+        try:
+            while True:
+                anterior = 0.0
+                for t, mensaje in self.ticks:
+                    await asyncio.sleep(max(0.0, (t - anterior) / self.velocidad))
+                    anterior = t
+                    if mensaje["stream"] not in streams:
+                        continue
+                    data = dict(mensaje["data"])
+                    data["E"] = data["T"] = time.time() * 1000
+                    await conexion.send(json.dumps({"stream": mensaje["stream"], "data": data}))
+        except ConnectionClosed:
+            pass
+
+
+def esperar(condicion, limite):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba del feed WebSocket de Binance contra un servidor local")
+    parser.add_argument("--ticks", help="Archivo JSONL de ticks grabados (por defecto, sintéticos)")
+    parser.add_argument("--grabar", metavar="ARCHIVO", help="Graba ticks reales de Binance y sale")
+    parser.add_argument("--symbols", default="BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT", help="Para --grabar")
+    parser.add_argument("--stream", default="bookTicker", choices=["bookTicker", "aggTrade"])
+    parser.add_argument("--segundos", type=float, default=60, help="Duración de la grabación")
+    parser.add_argument("--monedas", type=int, default=20, help="Symbols de los ticks sintéticos")
+    parser.add_argument("--ticks-por-segundo", type=float, default=20, help="Por symbol, ticks sintéticos")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="Multiplicador de la reproducción")
+    parser.add_argument("--fase", type=float, default=2.0, help="Segundos de cada fase de la prueba")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.grabar:
+        grabar(args.grabar, args.symbols.split(","), args.stream, args.segundos)
+        return
+
+    if args.ticks:
+        ticks = cargar_ticks(args.ticks)
+    else:
+        ticks = generar_ticks([f"SIM{i:03d}USDT" for i in range(args.monedas)], 10, args.ticks_por_segundo, args.semilla)
+    symbols = sorted({mensaje["data"]["s"] for _, mensaje in ticks})
+    tipo = ticks[0][1]["stream"].split("@")[1]
+    grupo_a, grupo_b = symbols[:len(symbols) // 2], symbols[len(symbols) // 2:]
+
+    servidor = ServidorReplay(ticks, args.velocidad)
+    url = servidor.iniciar()
+
+    # ===== MOTOR DEL ORÁCULO =====
+    # Base de datos temporal; cada disparo se rearma alrededor del precio para seguir midiendo
+    monitor = MotorOraculo(os.path.join(tempfile.mkdtemp(prefix="prueba_feed_"), "monitor_binance.db"),
+                           eco_consola=False)
+    monitor.latencias_disparo = deque(maxlen=100000)
+    latencias_servidor = []
+    recibidos = Counter()
+    ultimo_evento = {}
+
+    def armar(symbol, precio):
+        coin = {
+            "long_entry": precio * 0.9995, "long_sl": precio * 0.98,
+            "short_entry": precio * 1.0005, "short_sl": precio * 1.02, "current_price": precio,
+        }
+        monitor.monitored_coins[symbol] = coin
+        monitor.armar_niveles_moneda(symbol)
+
+    def senal_registrada(symbol, side, entry_price, sl_price):
+        latencias_servidor.append(time.time() * 1000 - ultimo_evento[symbol])
+
+    def rearmar(symbol, side):
+        monitor.triggered_signals.difference_update({f"{symbol}_LONG", f"{symbol}_SHORT"})
+        armar(symbol, monitor.monitored_coins[symbol]["current_price"])
+
+    monitor.send_signal_to_bot_2a1 = senal_registrada
+    monitor.mark_and_remove_coin = rearmar
+
+    def on_precio(symbol, precio, recibido, evento_ms):
+        recibidos[symbol] += 1
+        ultimo_evento[symbol] = evento_ms
+        if symbol not in monitor.monitored_coins:
+            armar(symbol, precio)
+        monitor.on_precio_ws(symbol, precio, recibido, evento_ms)
+
+    feed = FeedBinanceWS(on_precio, tipo=tipo, url=url, log=print)
+    errores = []
+
+    # ===== FASE 1: SUSCRIPCIÓN INICIAL =====
+    feed.sincronizar(grupo_a)
+    feed.iniciar()
+    if not esperar(feed.conectado, 5):
+        print("❌ El feed no conectó con el servidor local")
+        sys.exit(1)
+    time.sleep(args.fase)
+    if set(recibidos) != set(grupo_a):
+        errores.append(f"Fase 1: ticks de {sorted(set(recibidos) ^ set(grupo_a))} fuera de lo suscrito")
+    print(f"🟢 Fase 1: {sum(recibidos.values())} ticks de {len(recibidos)}/{len(grupo_a)} monedas suscritas")
+
+    # ===== FASE 2: ALTAS Y BAJAS =====
+    feed.sincronizar(grupo_b)
+    time.sleep(0.3)  # Ticks en vuelo del grupo A
+    recibidos.clear()
+    time.sleep(args.fase)
+    if set(recibidos) != set(grupo_b):
+        errores.append(f"Fase 2: ticks de {sorted(set(recibidos) ^ set(grupo_b))} tras cambiar las suscripciones")
+    print(f"🔁 Fase 2: {sum(recibidos.values())} ticks de {len(recibidos)}/{len(grupo_b)} monedas tras cambiar "
+          f"la lista (pedidos: {servidor.pedidos[-2:]})")
+
+    # ===== FASE 3: CORTE Y RECONEXIÓN =====
+    servidor.cortar()
+    if not esperar(lambda: not feed.conectado(), 5):
+        errores.append("Fase 3: el feed no detectó el corte")
+    print("✂️ Fase 3: conexión cortada; el monitor usaría REST mientras tanto")
+    inicio_corte = time.monotonic()
+    if not esperar(feed.conectado, 10):
+        errores.append("Fase 3: el feed no se reconectó")
+    reconexion = time.monotonic() - inicio_corte
+    recibidos.clear()
+    time.sleep(args.fase)
+    if set(recibidos) != set(grupo_b):
+        errores.append(f"Fase 3: tras reconectar llegan ticks de {sorted(recibidos)} en vez de {grupo_b}")
+    if feed.reconexiones != 1:
+        errores.append(f"Fase 3: {feed.reconexiones} reconexiones en vez de 1")
+    print(f"🔌 Fase 3: reconectado en {reconexion:.1f}s y resuscrito a {len(recibidos)}/{len(grupo_b)} monedas")
+
+    feed.detener()
+
+    # ===== LATENCIA =====
+    print("=" * 60)
+    print(f"⏱️ Llegada del tick → disparo ({len(monitor.latencias_disparo)} disparos): "
+          f"{percentiles(monitor.latencias_disparo, escala=1, decimales=2)}")
+    print(f"⏱️ Envío del servidor → disparo: {percentiles(latencias_servidor, escala=1, decimales=2)}")
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Suscripciones dinámicas, reconexión y resuscripción correctas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+📚 PRUEBA DEL REGISTRO DE INSTRUMENTOS
+Corre el Bot 2 a 1 contra el simulador local de Bybit y cuenta las llamadas a get_instruments_info:
+- La precarga recorre el universo linear paginado (una llamada por página de 1000 símbolos)
+- verificar_symbol_en_bybit, qty_step y adjust_price no vuelven a consultar Bybit
+- Un symbol que no estaba en la precarga se consulta una sola vez y queda en el registro
+- Un symbol inexistente se consulta una vez por ttl_inexistentes_segundos, no en cada señal
+
+Uso:
+    python prueba_instrumentos.py --simbolos 2500
+"""
+
+import argparse
+import math
+import sys
+from decimal import Decimal
+
+from simulador_bybit import config_simulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuenta las consultas de instrumentos del Bot 2 a 1")
+    parser.add_argument("--simbolos", type=int, default=2500)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(simbolos=args.simbolos, latencia_ms=None, semilla=args.semilla)
+    import Bot_2_a_1 as bot
+
+    simulador = bot.session.http
+    llamadas = []
+    get_instruments_info_original = simulador.get_instruments_info
+
+    def get_instruments_info_contado(**kwargs):
+        llamadas.append(kwargs.get("symbol"))
+        return get_instruments_info_original(**kwargs)
+
+    simulador.get_instruments_info = get_instruments_info_contado
+    errores = []
+
+    # ===== PRECARGA =====
+    cargados = bot.cargar_instrumentos()
+    paginas = math.ceil(args.simbolos / 1000)
+    print(f"📥 Precarga: {cargados} símbolos en {len(llamadas)} llamadas (esperadas {paginas})")
+    if cargados != args.simbolos:
+        errores.append(f"Se cargaron {cargados} símbolos de {args.simbolos}")
+    if len(llamadas) != paginas or any(symbol is not None for symbol in llamadas):
+        errores.append(f"La precarga hizo {len(llamadas)} llamadas en lugar de {paginas} páginas")
+
+    # ===== CAMINO DE UNA SEÑAL =====
+    # El código anterior consultaba el instrumento en cada una de estas tres funciones
+    llamadas.clear()
+    for symbol, instrumento in simulador.instrumentos.items():
+        tick = Decimal(f"{instrumento['tick']:.{instrumento['decimales']}f}")
+        precio = Decimal(f"{simulador.precios[symbol]:.{instrumento['decimales']}f}")
+        if not bot.verificar_symbol_en_bybit(symbol):
+            errores.append(f"{symbol}: verificar_symbol_en_bybit devolvió False")
+        qty = bot.qty_step(symbol, Decimal(100), precio)
+        if qty is None or Decimal(qty) % Decimal(f"{instrumento['qty_step']:.{instrumento['qty_decimales']}f}") != 0:
+            errores.append(f"{symbol}: cantidad {qty} fuera del qtyStep")
+        sl = bot.adjust_price(symbol, precio * Decimal("0.98"), "Buy")
+        if sl is None or Decimal(sl) % tick != 0:
+            errores.append(f"{symbol}: SL {sl} fuera de la grilla {tick}")
+    print(f"🔁 {args.simbolos} señales (verificar + qty + SL): {len(llamadas)} llamadas "
+          f"(antes {3 * args.simbolos})")
+    if llamadas:
+        errores.append(f"El camino de la señal consultó get_instruments_info {len(llamadas)} veces")
+
+    # ===== SYMBOL NUEVO =====
+    # Listado después de la precarga: una consulta puntual y después sale del registro
+    llamadas.clear()
+    nuevo = "NUEVOUSDT"
+    with simulador.lock:
+        simulador.instrumentos[nuevo] = {"tick": 0.001, "decimales": 3, "qty_step": 0.1, "qty_decimales": 1}
+        simulador.precios[nuevo] = 12.345
+    for _ in range(5):
+        bot.verificar_symbol_en_bybit(nuevo)
+        bot.adjust_price(nuevo, Decimal("12.0004"), "Sell")
+    print(f"🆕 Symbol listado tras la precarga: {llamadas.count(nuevo)} llamada(s) en 10 consultas")
+    if llamadas != [nuevo]:
+        errores.append(f"El symbol nuevo hizo {len(llamadas)} llamadas en lugar de 1")
+    if bot.adjust_price(nuevo, Decimal("12.0004"), "Sell") != "12.001":
+        errores.append("adjust_price del symbol nuevo no usa su tickSize")
+
+    # ===== SYMBOL INEXISTENTE =====
+    # Señales repetidas de un symbol deslistado: una consulta y el resto sale del cache negativo
+    llamadas.clear()
+    inexistente = "NOEXISTEUSDT"
+    for _ in range(20):
+        if bot.verificar_symbol_en_bybit(inexistente):
+            errores.append(f"verificar_symbol_en_bybit aceptó {inexistente}")
+    consultas_cache = llamadas.count(inexistente)
+    bot.instrumentos_inexistentes[inexistente] -= bot.ttl_inexistentes_segundos  # Vence el TTL
+    bot.verificar_symbol_en_bybit(inexistente)
+    print(f"🚫 Symbol inexistente: {consultas_cache} llamada(s) en 20 señales, "
+          f"{llamadas.count(inexistente) - consultas_cache} al vencer el TTL")
+    if consultas_cache != 1 or llamadas.count(inexistente) != 2:
+        errores.append(f"El symbol inexistente hizo {llamadas.count(inexistente)} llamadas en lugar de 1 + 1 al vencer")
+
+    print("=" * 60)
+    if errores:
+        for error in errores[:20]:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Una carga paginada del universo y ninguna consulta de instrumentos en el camino de la señal")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+📒 PRUEBA DEL LIBRO DE POSICIONES - SNAPSHOTS REST CONTRA APERTURAS Y CIERRES
+Corre el Bot 2 a 1 contra el simulador local de Bybit:
+1) Casos fijos: un snapshot pedido antes de una apertura no la borra del libro, uno pedido antes
+   de un cierre no la resucita, y uno pedido después manda sobre el estado local.
+2) Carrera: muchas señales de symbols distintos se ejecutan en paralelo en los actores mientras
+   otro hilo refresca el libro por REST sin parar (como sin stream privado), con respuestas lentas
+   que llegan después de las aperturas. Las señales llegan de a una cada pocos ms. Al terminar, Bybit
+   no puede tener más posiciones abiertas que Numero_de_posiciones, y el libro coincide con Bybit.
+
+Uso:
+    python prueba_libro.py --senales 60 --limite 3
+"""
+
+import argparse
+import sys
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from simulador_bybit import config_simulador
+
+
+def posiciones_en_bybit(bot):
+    posiciones = bot.session.get_positions(category="linear", settleCoin="USDT")["result"]["list"]
+    return {posicion["symbol"] for posicion in posiciones if Decimal(posicion["size"]) != 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Libro de posiciones del Bot 2 a 1 frente a snapshots REST")
+    parser.add_argument("--senales", type=int, default=60)
+    parser.add_argument("--limite", type=int, default=3, help="Numero_de_posiciones durante la carrera")
+    parser.add_argument("--demora-snapshot", type=float, default=0.2, help="Segundos que tarda en volver el snapshot")
+    args = parser.parse_args()
+
+    # Con latencia: abre las ventanas de carrera entre snapshots y aperturas
+    sys.modules["config"] = config_simulador(simbolos=args.senales + 2, latencia_ms=(5, 20),
+                                             aplicar_rate_limit=False, semilla=0)
+    import Bot_2_a_1 as bot
+
+    bot.enviar_mensaje_telegram = lambda chat_id, mensaje, clave=None: None
+    bot.registrar_tracking = bot.registrar_cooldown = lambda *args: None
+    simbolos = sorted(bot.session.http.instrumentos)
+    errores = []
+
+    # ===== CASOS FIJOS =====
+    abierta = {"symbol": simbolos[0], "side": "Buy", "size": "1", "avgPrice": "100"}
+    pedido_en = time.monotonic()
+    bot.actualizar_libro_posicion(abierta)  # Apertura después de pedir el snapshot
+    bot.actualizar_libro_snapshot([], pedido_en)
+    if simbolos[0] not in bot.libro_posiciones:
+        errores.append("Un snapshot pedido antes de la apertura la borró del libro")
+
+    pedido_en = time.monotonic()
+    bot.actualizar_libro_posicion(dict(abierta, size="0"))  # Cierre después de pedir el snapshot
+    bot.actualizar_libro_snapshot([abierta], pedido_en)
+    if simbolos[0] in bot.libro_posiciones:
+        errores.append("Un snapshot pedido antes del cierre resucitó la posición")
+
+    bot.actualizar_libro_snapshot([abierta], time.monotonic())
+    if simbolos[0] not in bot.libro_posiciones:
+        errores.append("Un snapshot pedido después del cambio no se aplicó")
+    bot.actualizar_libro_snapshot([], time.monotonic())
+    if bot.libro_posiciones or bot.libro_cambios:
+        errores.append(f"Quedaron restos en el libro: {bot.libro_posiciones} / {bot.libro_cambios}")
+    print(f"🧩 Casos fijos: {'OK' if not errores else 'con errores'}")
+
+    # ===== CARRERA CON EL REFRESCO REST =====
+    bot.Numero_de_posiciones = args.limite
+    bot.refrescar_libro()
+
+    simulador = bot.session.http
+    get_positions_original = simulador.get_positions
+
+    def get_positions_lento(**kwargs):
+        """El snapshot se toma al pedirlo pero la respuesta llega tarde, como un REST lento"""
+        respuesta = get_positions_original(**kwargs)
+        if kwargs.get("settleCoin"):
+            time.sleep(args.demora_snapshot)
+        return respuesta
+
+    simulador.get_positions = get_positions_lento
+    detener = threading.Event()
+    refrescos = 0
+
+    def refrescar():
+        nonlocal refrescos
+        while not detener.is_set():
+            bot.refrescar_libro()
+            refrescos += 1
+
+    hilo = threading.Thread(target=refrescar, daemon=True)
+    hilo.start()
+
+    for symbol in simbolos[1:args.senales + 1]:
+        bot.planificador.actor(symbol).enviar(bot.ejecutar_ticket, uuid.uuid4().hex, symbol, "long",
+                                              Decimal("5.0"), time.monotonic())
+        time.sleep(0.02)
+    while bot.planificador.metricas()["actores_activos"]:
+        time.sleep(0.05)
+    detener.set()
+    hilo.join()
+    bot.refrescar_libro()
+
+    en_bybit = posiciones_en_bybit(bot)
+    print(f"🏁 {args.senales} señales en paralelo, {refrescos} snapshots REST durante la carrera: "
+          f"{len(en_bybit)} posiciones abiertas (límite {args.limite})")
+    if len(en_bybit) > args.limite:
+        errores.append(f"Bybit tiene {len(en_bybit)} posiciones abiertas con Numero_de_posiciones = {args.limite}")
+    if set(bot.libro_posiciones) != en_bybit:
+        errores.append(f"Libro {sorted(bot.libro_posiciones)} distinto de Bybit {sorted(en_bybit)}")
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Los snapshots REST no borran aperturas nuevas y nunca se pasa el límite de posiciones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+📊 PRUEBA DEL LEDGER DE PNL CERRADO - RÁFAGAS DE CIERRES
+Corre notificar_pnl_cerrado del Bot 2 a 1 contra el simulador local de Bybit mientras se inyectan
+cierres en get_closed_pnl:
+  - ráfagas de cientos de cierres con el mismo updatedTime (varias páginas de 100)
+  - cierres que llegan mientras se pagina (las páginas se corren y repiten registros)
+  - cierres indexados con retraso: updatedTime anterior al último ya ingerido (dentro del solape)
+Comprueba que cada cierre llega a al_cerrar_posicion exactamente una vez y queda en el ledger.
+
+Uso:
+    python prueba_pnl_cerrado.py --rondas 20 --max-rafaga 300
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from simulador_bybit import config_simulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ledger de PnL cerrado del Bot 2 a 1 con ráfagas de cierres")
+    parser.add_argument("--rondas", type=int, default=20)
+    parser.add_argument("--max-rafaga", type=int, default=300, help="Cierres máximos por ráfaga")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(simbolos=20, latencia_ms=(1, 3), aplicar_rate_limit=False, semilla=0)
+    import Bot_2_a_1 as bot
+
+    bot.ESTADO_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="prueba_pnl_"), "estado.db")
+    bot.init_estado_db()
+    bot.intervalo_pnl_segundos = 0.2
+    simulador = bot.session.http
+    simbolos = sorted(simulador.instrumentos)
+    azar = random.Random(args.semilla)
+
+    recibidos = []
+    recibidos_lock = threading.Lock()
+
+    def al_cerrar_posicion(registro):
+        with recibidos_lock:
+            recibidos.append(registro["orderId"])
+
+    bot.al_cerrar_posicion = al_cerrar_posicion
+    threading.Thread(target=bot.notificar_pnl_cerrado, daemon=True).start()
+    time.sleep(0.1)  # Ledger vacío: solo cuenta lo que se cierra después de arrancar
+
+    inyectados = []
+
+    def inyectar(cantidad, updated_ms):
+        """Agrega cantidad cierres al simulador con el updatedTime dado"""
+        with simulador.lock:
+            for _ in range(cantidad):
+                symbol = azar.choice(simbolos)
+                registro = {
+                    "orderId": uuid.uuid4().hex, "symbol": symbol, "side": azar.choice(["Buy", "Sell"]),
+                    "qty": "1", "closedPnl": f"{azar.uniform(-5, 10):.8f}", "avgEntryPrice": "100",
+                    "avgExitPrice": "101", "createdTime": str(updated_ms - 60000), "updatedTime": str(updated_ms),
+                }
+                simulador.pnl_cerrado.append(registro)
+                inyectados.append(registro["orderId"])
+
+    def esperar_todos(limite_s=10):
+        limite = time.monotonic() + limite_s
+        while time.monotonic() < limite:
+            with recibidos_lock:
+                if len(recibidos) >= len(inyectados):
+                    return
+            time.sleep(0.05)
+
+    tardios = 0
+    for ronda in range(args.rondas):
+        ahora_ms = int(time.time() * 1000)
+        tipo = ronda % 3
+        if tipo == 0:
+            # Ráfaga con el mismo milisegundo repartida en varias páginas
+            inyectar(azar.randint(101, args.max_rafaga), ahora_ms)
+        elif tipo == 1:
+            # Ráfagas mientras el bot pagina: ms consecutivos en hilos que compiten con la consulta
+            hilos = [threading.Thread(target=inyectar, args=(azar.randint(20, 120), ahora_ms + i)) for i in range(5)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        else:
+            # Indexados con retraso: llegan después pero con updatedTime anterior al último ingerido
+            esperar_todos()
+            retraso_ms = azar.randint(500, bot.solape_pnl_segundos * 1000 - 1500)
+            inyectar(azar.randint(1, 30), ahora_ms - retraso_ms)
+            tardios += 1
+        time.sleep(azar.uniform(0, 0.4))
+    esperar_todos()
+    time.sleep(bot.intervalo_pnl_segundos * 3)  # Unas consultas más: ningún repetido debe volver a emitirse
+
+    conn = sqlite3.connect(bot.ESTADO_DB_FILE, timeout=5)
+    en_ledger = {fila[0] for fila in conn.execute("SELECT order_id FROM pnl_cerrado")}
+    with recibidos_lock:
+        emitidos = list(recibidos)
+
+    errores = []
+    faltan = set(inyectados) - set(emitidos)
+    repetidos = len(emitidos) - len(set(emitidos))
+    if faltan:
+        errores.append(f"{len(faltan)} cierres sin emitir de {len(inyectados)}")
+    if repetidos:
+        errores.append(f"{repetidos} cierres emitidos más de una vez")
+    if set(emitidos) - set(inyectados):
+        errores.append("Se emitieron cierres que no se inyectaron")
+    if en_ledger != set(inyectados):
+        errores.append(f"Ledger con {len(en_ledger)} cierres, se inyectaron {len(inyectados)}")
+
+    print(f"🧪 {len(inyectados)} cierres en {args.rondas} rondas ({tardios} con updatedTime atrasado), "
+          f"solape {bot.solape_pnl_segundos} s")
+    print(f"📨 Emitidos {len(emitidos)} | distintos {len(set(emitidos))} | en el ledger {len(en_ledger)} | "
+          f"llamadas a Bybit {bot.session.metricas()['llamadas']}")
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Cada cierre se emitió una sola vez y quedó en el ledger")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+🧾 PRUEBA DE LOS CHEQUEOS PRE-TRADE - RESULTADO INDEPENDIENTE DEL ORDEN DE LLEGADA
+Corre verificaciones_pretrade del Bot 2 a 1 con chequeos falsos de distinta duración:
+  - symbol inválido y lento + conteo de posiciones que falla al instante: siempre "ignored"
+  - symbol válido + límite de posiciones alcanzado + posición actual que falla antes: siempre el límite
+  - el aviso de Telegram del límite solo sale si el chequeo del symbol pasó
+Cada caso se repite con demoras al azar: el resultado debe ser el de la versión secuencial.
+Además corre max_senales_en_proceso señales a la vez con chequeos que tardan lo mismo: todas deben
+terminar en el tiempo de un chequeo, sin esperar a que otra señal libere el pool.
+
+Uso:
+    python prueba_pretrade.py --repeticiones 50
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from simulador_bybit import config_simulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chequeos pre-trade del Bot 2 a 1 con demoras al azar")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(simbolos=5, latencia_ms=None, semilla=0)
+    import Bot_2_a_1 as bot
+
+    azar = random.Random(args.semilla)
+    avisos = []
+    bot.enviar_mensaje_telegram = lambda chat_id, mensaje: avisos.append(mensaje)
+
+    def chequeo(resultado, demora_max):
+        """Chequeo falso: tarda hasta demora_max segundos y devuelve (o lanza) resultado"""
+        def funcion(*_):
+            time.sleep(azar.uniform(0, demora_max))
+            if isinstance(resultado, Exception):
+                raise resultado
+            return resultado
+        return funcion
+
+    casos = [
+        # (nombre, chequeos falsos, status esperado, avisos de Telegram esperados)
+        ("symbol inválido", dict(
+            verificar_symbol_en_bybit=chequeo(False, 0.05),
+            get_open_positions_count=chequeo(ConnectionError("timeout"), 0.01),
+            get_current_position=chequeo(ConnectionError("timeout"), 0.01),
+            obtener_ultimo_precio=chequeo(ConnectionError("timeout"), 0.01),
+        ), "ignored", 0),
+        ("límite de posiciones", dict(
+            verificar_symbol_en_bybit=chequeo(True, 0.05),
+            get_open_positions_count=chequeo(bot.Numero_de_posiciones, 0.05),
+            get_current_position=chequeo(ConnectionError("timeout"), 0.01),
+            obtener_ultimo_precio=chequeo(100, 0.01),
+        ), "error", 1),
+    ]
+
+    errores = []
+    for nombre, falsos, status_esperado, avisos_esperados in casos:
+        for clave, funcion in falsos.items():
+            setattr(bot, clave, funcion)
+        resultados = {}
+        for _ in range(args.repeticiones):
+            avisos.clear()
+            _, status, mensaje = bot.verificaciones_pretrade("SIM000USDT")
+            resultados[(status, mensaje)] = resultados.get((status, mensaje), 0) + 1
+            if len(avisos) != avisos_esperados:
+                errores.append(f"{nombre}: {len(avisos)} avisos de Telegram (esperados {avisos_esperados})")
+                break
+        print(f"🔁 {nombre}: {resultados}")
+        if len(resultados) != 1 or next(iter(resultados))[0] != status_esperado:
+            errores.append(f"{nombre}: se esperaba siempre '{status_esperado}' y se obtuvo {list(resultados)}")
+
+    # ===== SEÑALES A LA VEZ =====
+    demora = 0.1
+    for clave, valor in [("verificar_symbol_en_bybit", True), ("get_open_positions_count", 0),
+                         ("get_current_position", []), ("obtener_ultimo_precio", 100)]:
+        setattr(bot, clave, lambda *_, valor=valor: time.sleep(demora) or valor)
+    hilos = [threading.Thread(target=bot.verificaciones_pretrade, args=(f"SIM00{i % 5}USDT",))
+             for i in range(bot.max_senales_en_proceso)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    print(f"🧵 {len(hilos)} señales a la vez con chequeos de {demora * 1000:.0f} ms: {duracion * 1000:.0f} ms "
+          f"(pool de {bot.max_senales_en_proceso * bot.chequeos_por_senal} hilos)")
+    if duracion > 2 * demora:
+        errores.append(f"{len(hilos)} señales a la vez tardaron {duracion * 1000:.0f} ms en sus chequeos: "
+                       f"esperaron al pool pre-trade")
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ El resultado pre-trade es el del primer chequeo que falla en orden, no el primero en terminar")
+
+
+if __name__ == "__main__":
+    main()
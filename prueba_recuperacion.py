@@ -0,0 +1,270 @@
+"""
+💾 PRUEBA DE RECUPERACIÓN TRAS UN KILL -9
+El simulador local de Bybit corre en un proceso propio (el "exchange" sobrevive al bot) y el Bot 2 a 1
+corre como proceso aparte con el journal SQLite en una base temporal:
+1. El bot abre N posiciones (con cooldown) y la protección progresiva sube el SL paso a paso
+2. En mitad del tracking se mata el proceso con SIGKILL
+3. Con el bot caído, una de las posiciones se cierra en el exchange
+4. El bot arranca de nuevo, restaura el estado y lo concilia con get_positions
+Comprueba que el tracking restaurado no es anterior al último confirmado, que la protección 1:1 y los
+cooldowns (con su vencimiento original) sobreviven, y que la posición cerrada se descarta.
+Al final mide la sobrecarga de registrar_tracking frente a escribir cada cambio con su propio commit.
+
+Uso:
+    python prueba_recuperacion.py --posiciones 10 --pasos 15
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from multiprocessing.managers import BaseManager
+
+from cliente_bybit import ClienteBybit
+from simulador_bybit import SimuladorBybit, config_simulador
+
+CLAVE = b"prueba_recuperacion"
+_simulador = None
+
+
+class GestorSimulador(BaseManager):
+    """Comparte un SimuladorBybit entre procesos: el estado del exchange sobrevive al kill del bot"""
+
+
+def _crear_simulador(opciones):
+    global _simulador
+    _simulador = SimuladorBybit(**opciones)
+
+
+GestorSimulador.register("simulador", callable=lambda: _simulador)
+
+
+def conectar_simulador(puerto):
+    gestor = GestorSimulador(address=("127.0.0.1", puerto), authkey=CLAVE)
+    gestor.connect()
+    return gestor.simulador()
+
+
+def preparar_bot(db, puerto):
+    sys.modules["config"] = config_simulador(simbolos=1, latencia_ms=None)  # La sesión se reemplaza por la compartida
+    import Bot_2_a_1 as bot
+
+    bot.session = ClienteBybit(conectar_simulador(puerto))
+    bot.ESTADO_DB_FILE = db
+    bot.init_estado_db()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    bot.cargar_instrumentos()
+    return bot
+
+
+def estado_bot(bot):
+    """Estado en memoria en formato JSON (vencimiento del cooldown en hora de pared)"""
+    return {
+        "tracking": {symbol: {"side": info["side"], "precio_maximo": str(info["precio_maximo"])}
+                     for symbol, info in bot.tracking_posiciones.items()},
+        "con_stop": sorted(bot.posiciones_con_stop),
+        "cooldown": {symbol: time.time() + bot.monedas_operadas.segundos_restantes(symbol)
+                     for symbol in bot.monedas_operadas.simbolos()},
+    }
+
+
+def esperar_actores(bot):
+    while bot.planificador.metricas()["actores_activos"]:
+        time.sleep(0.005)
+
+
+def esperar_journal(bot):
+    """Espera a que el tracking en memoria esté confirmado en la base de datos"""
+    conn = sqlite3.connect(bot.ESTADO_DB_FILE, timeout=5)
+    esperado = {symbol: str(info["precio_maximo"]) for symbol, info in bot.tracking_posiciones.items()}
+    while dict(conn.execute("SELECT symbol, precio_maximo FROM tracking_posiciones")) != esperado:
+        time.sleep(0.005)
+    conn.close()
+
+
+# ===== PROCESOS DEL BOT =====
+def fase_operar(db, puerto, posiciones):
+    """Abre posiciones y sube precios para siempre; tras cada paso confirmado imprime el estado"""
+    bot = preparar_bot(db, puerto)
+    simulador = bot.session.http
+    bot.Numero_de_posiciones = posiciones
+    simbolos = [instrumento for instrumento in sorted(bot.instrumentos)][:posiciones]
+    for i, symbol in enumerate(simbolos):
+        side = "long" if i % 2 == 0 else "short"
+        ticket_id = bot.crear_ticket(symbol, side)
+        bot.planificador.actor(symbol).enviar(bot.ejecutar_ticket, ticket_id, symbol, side, Decimal("1.0"), time.monotonic())
+    esperar_actores(bot)
+
+    paso = 0
+    while True:
+        # Cada paso avanza 2.1% a favor: primero la 1:1 (2x la distancia) y después la progresiva
+        for symbol, info in list(bot.tracking_posiciones.items()):
+            signo = 1 if info["side"] == "Buy" else -1
+            precio = Decimal(simulador.fijar_precio(symbol, float(info["precio_maximo"]) * (1 + signo * 0.021)))
+            bot.planificador.actor(symbol).enviar_precio(bot.proteger_posicion, symbol, precio)
+        esperar_actores(bot)
+        esperar_journal(bot)
+        paso += 1
+        print("CONFIRMADO " + json.dumps(dict(estado_bot(bot), paso=paso)), flush=True)
+
+
+def fase_restaurar(db, puerto):
+    bot = preparar_bot(db, puerto)
+    inicio = time.perf_counter()
+    bot.restaurar_estado()
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    print("RESTAURADO " + json.dumps(dict(estado_bot(bot), duracion_ms=duracion_ms)), flush=True)
+
+
+def lanzar(*argumentos):
+    return subprocess.Popen([sys.executable, __file__, *argumentos], stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+
+
+# ===== SOBRECARGA DEL JOURNAL =====
+def medir_journal(n):
+    """registrar_tracking (encolar) frente a un commit por cambio, y lo que tarda el escritor en vaciar la cola"""
+    sys.modules["config"] = config_simulador(simbolos=1, latencia_ms=None)  # La sesión se reemplaza por la compartida
+    import Bot_2_a_1 as bot
+
+    bot.ESTADO_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="journal_"), "estado.db")
+    bot.init_estado_db()
+    simbolos = [f"J{i:03d}USDT" for i in range(100)]
+    for symbol in simbolos:
+        bot.tracking_posiciones[symbol] = {"precio_maximo": Decimal("100.5"), "precio_entrada": Decimal("100"),
+                                           "side": "Buy", "distancia_sl": Decimal("1.5")}
+
+    inicio = time.perf_counter()
+    for i in range(n):
+        bot.registrar_tracking(simbolos[i % len(simbolos)])
+    encolar = time.perf_counter() - inicio
+    # Marca final: cuando está en la base, el escritor confirmó todos los cambios anteriores
+    bot.journal_cola.put(("INSERT OR REPLACE INTO posiciones_con_stop VALUES (?)", ("FIN",)))
+    conn = sqlite3.connect(bot.ESTADO_DB_FILE, timeout=5)
+    inicio = time.perf_counter()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    while conn.execute("SELECT 1 FROM posiciones_con_stop WHERE symbol='FIN'").fetchone() is None:
+        time.sleep(0.001)
+    vaciar = time.perf_counter() - inicio
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    directos = n // 10
+    inicio = time.perf_counter()
+    for i in range(directos):
+        info = bot.tracking_posiciones[simbolos[i % len(simbolos)]]
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO tracking_posiciones VALUES (?, ?, ?, ?, ?)",
+                         (simbolos[i % len(simbolos)], str(info["precio_maximo"]), str(info["precio_entrada"]),
+                          info["side"], str(info["distancia_sl"])))
+    directo = time.perf_counter() - inicio
+    print(f"⏱️ registrar_tracking: {encolar / n * 1e6:.2f} µs por cambio en el hilo que protege "
+          f"(commit directo: {directo / directos * 1e6:.1f} µs)")
+    print(f"✍️ Escritor del journal: {n} cambios en {vaciar * 1000:.0f} ms ({n / vaciar:,.0f} cambios/s en lotes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recuperación del Bot 2 a 1 tras un kill -9 en mitad del tracking")
+    parser.add_argument("--posiciones", type=int, default=10)
+    parser.add_argument("--pasos", type=int, default=15, help="Pasos confirmados antes del kill")
+    parser.add_argument("--cambios-journal", type=int, default=100000)
+    parser.add_argument("--fase", choices=["operar", "restaurar"], help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--puerto", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fase == "operar":
+        fase_operar(args.db, args.puerto, args.posiciones)
+        return
+    if args.fase == "restaurar":
+        fase_restaurar(args.db, args.puerto)
+        return
+
+    gestor = GestorSimulador(address=("127.0.0.1", 0), authkey=CLAVE)
+    gestor.start(_crear_simulador, ({"simbolos": args.posiciones + 5, "latencia_ms": (1, 3),
+                                     "volatilidad_por_segundo": 0.0, "aplicar_rate_limit": False, "semilla": 0},))
+    puerto = gestor.address[1]
+    simulador = gestor.simulador()
+    db = os.path.join(tempfile.mkdtemp(prefix="prueba_recuperacion_"), "estado.db")
+    errores = []
+
+    # ===== 1-2. OPERAR Y MATAR EN MITAD DEL TRACKING =====
+    proceso = lanzar("--fase", "operar", "--db", db, "--puerto", str(puerto), "--posiciones", str(args.posiciones))
+    confirmado = None
+    for linea in proceso.stdout:
+        if linea.startswith("CONFIRMADO "):
+            confirmado = json.loads(linea[len("CONFIRMADO "):])
+            if confirmado["paso"] >= args.pasos:
+                break
+    time.sleep(0.05)  # El bot ya está en el paso siguiente: el kill cae en mitad de escrituras
+    proceso.kill()
+    proceso.wait()
+    if confirmado is None:
+        print("❌ El bot no llegó a confirmar ningún paso")
+        sys.exit(1)
+    print(f"💥 SIGKILL tras {confirmado['paso']} pasos confirmados: {len(confirmado['tracking'])} posiciones, "
+          f"{len(confirmado['con_stop'])} con protección 1:1, {len(confirmado['cooldown'])} en cooldown")
+
+    # ===== 3. CIERRE CON EL BOT CAÍDO =====
+    cerrada = sorted(confirmado["tracking"])[0]
+    posicion = simulador.get_positions(category="linear", symbol=cerrada)[0]["result"]["list"][0]
+    simulador.place_order(category="linear", symbol=cerrada, side="Sell" if posicion["side"] == "Buy" else "Buy",
+                          orderType="Market", qty=posicion["size"], reduceOnly=True)
+
+    # ===== 4. REINICIO =====
+    proceso = lanzar("--fase", "restaurar", "--db", db, "--puerto", str(puerto))
+    salida, _ = proceso.communicate(timeout=60)
+    lineas = [linea for linea in salida.splitlines() if linea.startswith("RESTAURADO ")]
+    if not lineas:
+        print("❌ El bot no restauró el estado")
+        sys.exit(1)
+    restaurado = json.loads(lineas[-1][len("RESTAURADO "):])
+    print(f"♻️ Restaurado en {restaurado['duracion_ms']:.1f} ms: {len(restaurado['tracking'])} posiciones, "
+          f"{len(restaurado['con_stop'])} con protección 1:1, {len(restaurado['cooldown'])} en cooldown")
+
+    abiertas = {p["symbol"]: p for p in simulador.get_positions(category="linear", settleCoin="USDT")[0]["result"]["list"]}
+    if set(restaurado["tracking"]) != set(abiertas):
+        errores.append(f"Tracking {sorted(restaurado['tracking'])} distinto de las abiertas {sorted(abiertas)}")
+    if cerrada in restaurado["tracking"] or cerrada in restaurado["con_stop"]:
+        errores.append(f"{cerrada} se cerró con el bot caído y su estado no se descartó")
+    for symbol, info in restaurado["tracking"].items():
+        anterior = confirmado["tracking"].get(symbol)
+        maximo = Decimal(info["precio_maximo"])
+        stop = Decimal(abiertas[symbol]["stopLoss"])
+        es_long = info["side"] == "Buy"
+        if anterior is None or info["side"] != anterior["side"]:
+            errores.append(f"{symbol}: tracking restaurado sin equivalente confirmado")
+        elif (maximo < Decimal(anterior["precio_maximo"])) if es_long else (maximo > Decimal(anterior["precio_maximo"])):
+            errores.append(f"{symbol}: máximo restaurado {maximo} anterior al confirmado {anterior['precio_maximo']}")
+        if (stop > maximo) if es_long else (stop < maximo):
+            errores.append(f"{symbol}: el SL del exchange {stop} quedó por delante del máximo restaurado {maximo}")
+    faltan_stop = set(confirmado["con_stop"]) - {cerrada} - set(restaurado["con_stop"])
+    if faltan_stop:
+        errores.append(f"Protección 1:1 perdida: {sorted(faltan_stop)}")
+    if set(restaurado["cooldown"]) != set(confirmado["cooldown"]):
+        errores.append(f"Cooldowns {sorted(restaurado['cooldown'])} distintos de {sorted(confirmado['cooldown'])}")
+    desfase = max((abs(restaurado["cooldown"][s] - confirmado["cooldown"][s])
+                   for s in set(restaurado["cooldown"]) & set(confirmado["cooldown"])), default=0.0)
+    if desfase > 2:
+        errores.append(f"El vencimiento de un cooldown se movió {desfase:.1f}s")
+    print(f"⏳ Cooldowns con el mismo vencimiento (desfase máximo {desfase * 1000:.0f} ms)")
+    gestor.shutdown()
+
+    # ===== SOBRECARGA =====
+    medir_journal(args.cambios_journal)
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Tracking, protección 1:1 y cooldowns recuperados tras el kill y conciliados con el exchange")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+📟 PRUEBA DE /status - LIBRO LOCAL SIN REST Y THROUGHPUT FRENTE A 10K REQ/S
+Corre el Bot 2 a 1 contra el simulador local de Bybit con posiciones abiertas y cuenta las llamadas
+al exchange mientras atiende /status:
+  - con el stream privado conectado: ninguna llamada REST, sea cual sea el número de peticiones
+  - sin stream: a lo sumo un snapshot REST cada max_antiguedad_libro_segundos
+Además mide peticiones/s frente al objetivo de 10k req/s en tres niveles:
+  estado_bot() directo, Flask sin sockets (test_client) y aiohttp por HTTP real con clientes keep-alive
+en el mismo proceso. Solo las llamadas REST hacen fallar la prueba; el throughput se informa.
+
+Uso:
+    python prueba_status.py --peticiones 20000 --concurrencia 64
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from simulador_bybit import config_simulador
+from utilidades_prueba import puerto_libre
+
+OBJETIVO_REQ_S = 10000
+
+
+class StreamConectado:
+    """ws_privado falso: el libro se considera al día como con el stream de posiciones conectado"""
+
+    def is_connected(self):
+        return True
+
+
+async def medir_aiohttp(bot, peticiones, concurrencia):
+    """Servidor aiohttp de crear_app_async y clientes keep-alive en el mismo event loop. Devuelve req/s"""
+    import aiohttp
+    from aiohttp import web
+
+    runner = web.AppRunner(bot.crear_app_async())
+    await runner.setup()
+    puerto = puerto_libre()
+    await web.TCPSite(runner, "127.0.0.1", puerto).start()
+    url = f"http://127.0.0.1:{puerto}/status"
+    restantes = iter(range(peticiones))
+    fallidas = 0
+
+    async def cliente(sesion):
+        nonlocal fallidas
+        for _ in restantes:
+            async with sesion.get(url) as respuesta:
+                await respuesta.read()
+                fallidas += respuesta.status != 200
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrencia)) as sesion:
+            async with sesion.get(url) as respuesta:  # Calentamiento
+                await respuesta.read()
+            inicio = time.perf_counter()
+            await asyncio.gather(*(cliente(sesion) for _ in range(concurrencia)))
+            duracion = time.perf_counter() - inicio
+    finally:
+        await runner.cleanup()
+    return peticiones / duracion, fallidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/status del Bot 2 a 1: llamadas REST y peticiones/s")
+    parser.add_argument("--peticiones", type=int, default=20000)
+    parser.add_argument("--concurrencia", type=int, default=64)
+    parser.add_argument("--posiciones", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(simbolos=20, latencia_ms=None, aplicar_rate_limit=False, semilla=0)
+    import Bot_2_a_1 as bot
+
+    simulador = bot.session.http
+    for symbol in sorted(simulador.instrumentos)[:args.posiciones]:
+        bot.session.place_order(category="linear", symbol=symbol, side="Buy", orderType="Market", qty="1")
+    bot.refrescar_libro()
+
+    def llamadas_rest():
+        return bot.session.metricas()["llamadas"]
+
+    errores = []
+    resultados = []
+
+    # ===== CON EL STREAM PRIVADO CONECTADO =====
+    bot.ws_privado = StreamConectado()
+    antes = llamadas_rest()
+
+    inicio = time.perf_counter()
+    for _ in range(args.peticiones):
+        respuesta, codigo = bot.estado_bot()
+    resultados.append(("estado_bot() directo", args.peticiones / (time.perf_counter() - inicio)))
+    if codigo != 200 or respuesta["posiciones_abiertas"] != args.posiciones:
+        errores.append(f"estado_bot devolvió {codigo}: {respuesta}")
+
+    cliente_flask = bot.app.test_client()
+    peticiones_flask = min(args.peticiones, 5000)
+    inicio = time.perf_counter()
+    fallidas_flask = sum(cliente_flask.get("/status").status_code != 200 for _ in range(peticiones_flask))
+    resultados.append(("Flask (test_client)", peticiones_flask / (time.perf_counter() - inicio)))
+
+    por_segundo_async, fallidas_async = asyncio.run(medir_aiohttp(bot, args.peticiones, args.concurrencia))
+    resultados.append((f"aiohttp HTTP ({args.concurrencia} clientes)", por_segundo_async))
+    if fallidas_flask or fallidas_async:
+        errores.append(f"Respuestas distintas de 200: Flask {fallidas_flask}, aiohttp {fallidas_async}")
+
+    con_stream = llamadas_rest() - antes
+    total = args.peticiones * 2 + peticiones_flask + 1
+    print(f"🔌 Stream conectado: {total} consultas de estado, {con_stream} llamadas REST")
+    if con_stream:
+        errores.append(f"/status hizo {con_stream} llamadas REST con el stream conectado")
+
+    # ===== SIN STREAM: SNAPSHOT ACOTADO POR ANTIGÜEDAD =====
+    bot.ws_privado = None
+    bot.max_antiguedad_libro_segundos = 0.5
+    antes = llamadas_rest()
+    inicio = time.monotonic()
+    consultas = 0
+    while time.monotonic() - inicio < 2:
+        bot.estado_bot()
+        consultas += 1
+    sin_stream = llamadas_rest() - antes
+    maximo = int((time.monotonic() - inicio) / bot.max_antiguedad_libro_segundos) + 1
+    print(f"📴 Sin stream: {consultas} consultas en 2 s, {sin_stream} snapshots REST (máximo {maximo})")
+    if sin_stream > maximo:
+        errores.append(f"Sin stream /status hizo {sin_stream} llamadas REST en lugar de a lo sumo {maximo}")
+
+    print("=" * 78)
+    for nombre, por_segundo in resultados:
+        marca = "✅" if por_segundo >= OBJETIVO_REQ_S else "⚠️"
+        print(f"{marca} {nombre:<28} | {por_segundo:9.0f} req/s (objetivo {OBJETIVO_REQ_S:,})")
+    print("=" * 78)
+
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ /status responde desde el libro local sin llamadas REST mientras el stream está conectado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+🛡️ PRUEBA DEL STOP LOSS INICIAL - NINGUNA POSICIÓN QUEDA SIN SL EN SILENCIO
+Corre abrir_posicion del Bot 2 a 1 contra el simulador local de Bybit, en modo dos pasos (orden y
+después set_trading_stop) y en modo un paso (SL estimado adjunto a la orden), con SL que no se
+pueden calcular (adjust_price devuelve None) o que Bybit rechaza (del lado equivocado del precio):
+  - dos pasos: la posición se cierra a mercado y se avisa; si el cierre también falla, se avisa
+    que quedó abierta sin SL
+  - un paso: si el SL estimado no se puede calcular no se manda la orden; si el SL del fill falla,
+    queda el SL adjunto y se avisa
+En los casos sin fallos la posición queda abierta con el SL que informó el bot.
+Después lleva una posición a la 1:1 y a la progresiva con el SL rechazado por Bybit (el simulador
+lanza InvalidRequestError como pybit): el bot no da la protección por hecha, el SL del exchange no
+cambia y con el siguiente precio, ya sin rechazo, la protección se aplica.
+
+Uso:
+    python prueba_stop_loss.py
+"""
+
+import argparse
+import sys
+from decimal import Decimal
+
+from simulador_bybit import config_simulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SL inicial del Bot 2 a 1 con SL incalculables o rechazados")
+    parser.add_argument("--distancia-sl", type=float, default=1.5)
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(simbolos=10, latencia_ms=None, aplicar_rate_limit=False,
+                                             volatilidad_por_segundo=0.0, semilla=0)
+    import Bot_2_a_1 as bot
+
+    avisos = []
+    bot.enviar_mensaje_telegram = lambda chat_id, mensaje, clave=None: avisos.append(mensaje)
+    bot.registrar_tracking = lambda symbol: None
+    bot.Numero_de_posiciones = 100
+    simulador = bot.session.http
+    simbolos = iter(sorted(simulador.instrumentos))
+    adjust_price_original = bot.adjust_price
+    place_order_original = simulador.place_order
+
+    def adjust_price_con_fallo(desde_llamada, fallo):
+        """adjust_price que desde la llamada desde_llamada (0 = SL estimado) devuelve None o un SL inválido"""
+        llamadas = []
+
+        def funcion(symbol, price, side="Buy"):
+            llamadas.append(price)
+            if len(llamadas) - 1 < desde_llamada:
+                return adjust_price_original(symbol, price, side)
+            if fallo == "incalculable":
+                return None
+            # Del lado equivocado del precio: Bybit lo rechaza
+            return adjust_price_original(symbol, price * 3 if side == "Buy" else price / 3, side)
+        return funcion
+
+    def place_order_sin_cierres(**kwargs):
+        if kwargs.get("reduceOnly"):
+            return {"retCode": 110017, "retMsg": "Simulador: cierre rechazado", "result": {}}
+        return place_order_original(**kwargs)
+
+    casos = [
+        # (nombre, SL adjunto, llamada de adjust_price que falla, fallo, cierres rechazados,
+        #  abre, queda abierta, texto esperado en el aviso)
+        ("2 pasos sin fallos", False, None, None, False, True, True, "POSICIÓN"),
+        ("2 pasos, SL incalculable", False, 0, "incalculable", False, False, False, "Posición cerrada"),
+        ("2 pasos, SL rechazado", False, 0, "rechazado", False, False, False, "Posición cerrada"),
+        ("2 pasos, SL rechazado y cierre rechazado", False, 0, "rechazado", True, False, True, "SIN STOP LOSS"),
+        ("1 paso sin fallos", True, None, None, False, True, True, "POSICIÓN"),
+        ("1 paso, SL estimado incalculable", True, 0, "incalculable", False, False, False, None),
+        ("1 paso, SL del fill incalculable", True, 1, "incalculable", False, True, True, "sin ajustar"),
+        ("1 paso, SL del fill rechazado", True, 1, "rechazado", False, True, True, "sin ajustar"),
+    ]
+
+    errores = []
+    for i, (nombre, adjunto, desde, fallo, sin_cierres, abre_esperado, abierta_esperada, aviso_esperado) in enumerate(casos):
+        symbol = next(simbolos)
+        side = "Buy" if i % 2 == 0 else "Sell"
+        avisos.clear()
+        bot.entrada_con_sl_adjunto = adjunto
+        bot.adjust_price = adjust_price_original if desde is None else adjust_price_con_fallo(desde, fallo)
+        simulador.place_order = place_order_sin_cierres if sin_cierres else place_order_original
+
+        abrio = bot.abrir_posicion(symbol, side, Decimal("20"), Decimal(str(args.distancia_sl)))
+        posicion = simulador.posiciones.get(symbol)
+        stop = posicion["stop_loss"] if posicion else None
+        print(f"🔁 {nombre} ({side}): abrió {abrio}, posición {'abierta' if posicion else 'cerrada'}, SL {stop}")
+
+        if abrio != abre_esperado:
+            errores.append(f"{nombre}: abrir_posicion devolvió {abrio} (esperado {abre_esperado})")
+        if (posicion is not None) != abierta_esperada:
+            errores.append(f"{nombre}: la posición quedó {'abierta' if posicion else 'cerrada'}")
+        if abrio and posicion is not None and stop is None:
+            errores.append(f"{nombre}: la posición abierta no tiene SL en el exchange")
+        if aviso_esperado is None and avisos:
+            errores.append(f"{nombre}: avisos inesperados {avisos}")
+        if aviso_esperado is not None and not any(aviso_esperado in aviso for aviso in avisos):
+            errores.append(f"{nombre}: ningún aviso contiene '{aviso_esperado}' ({avisos})")
+        if posicion is None and symbol in bot.tracking_posiciones:
+            errores.append(f"{nombre}: tracking de una posición que no está abierta")
+
+    # ===== SL DE PROTECCIÓN RECHAZADO (1:1 Y PROGRESIVA) =====
+    bot.adjust_price = adjust_price_original
+    simulador.place_order = place_order_original
+    bot.entrada_con_sl_adjunto = False
+    distancia = Decimal(str(args.distancia_sl))
+    symbol = next(simbolos)
+    bot.abrir_posicion(symbol, "Buy", Decimal("20"), distancia)
+    entrada = bot.tracking_posiciones[symbol]["precio_entrada"]
+
+    def mover_precio(factor):
+        with simulador.lock:
+            decimales = simulador.instrumentos[symbol]["decimales"]
+            simulador.precios[symbol] = round(float(entrada * factor), decimales)
+            return Decimal(f"{simulador.precios[symbol]:.{decimales}f}")
+
+    etapas = [
+        # (nombre, precio respecto de la entrada, comprobación de que la protección se aplicó)
+        ("1:1", 1 + distancia * 2 / 100 + Decimal("0.005"), lambda: symbol in bot.posiciones_con_stop),
+        ("progresiva", (1 + distancia * 2 / 100 + Decimal("0.005")) * Decimal("1.03"),
+         lambda: bot.tracking_posiciones[symbol]["precio_maximo"] == precio),
+    ]
+    for nombre, factor, aplicada in etapas:
+        precio = mover_precio(factor)
+        stop_antes = simulador.posiciones[symbol]["stop_loss"]
+        maximo_antes = bot.tracking_posiciones[symbol]["precio_maximo"]
+        avisos.clear()
+        bot.adjust_price = adjust_price_con_fallo(0, "rechazado")
+        bot.proteger_posicion(symbol, precio)
+        stop_rechazado = simulador.posiciones[symbol]["stop_loss"]
+        if aplicada() or stop_rechazado != stop_antes or avisos:
+            errores.append(f"{nombre} con SL rechazado: se dio por aplicada (SL {stop_antes} → {stop_rechazado}, "
+                           f"avisos {len(avisos)})")
+        if bot.tracking_posiciones[symbol]["precio_maximo"] != maximo_antes:
+            errores.append(f"{nombre} con SL rechazado: el máximo avanzó sin SL en el exchange")
+
+        bot.adjust_price = adjust_price_original
+        bot.proteger_posicion(symbol, precio)
+        stop_aceptado = simulador.posiciones[symbol]["stop_loss"]
+        print(f"🔁 Protección {nombre} ({symbol}): rechazada con SL {stop_rechazado}, "
+              f"aceptada después con SL {stop_aceptado}")
+        if not aplicada() or stop_aceptado == stop_antes:
+            errores.append(f"{nombre}: no se aplicó con el precio siguiente tras el rechazo")
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Cada SL incalculable o rechazado termina en una posición cerrada, un aviso o un reintento")
+
+
+if __name__ == "__main__":
+    main()
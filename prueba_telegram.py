@@ -0,0 +1,152 @@
+"""
+📨 PRUEBA DE LA BANDEJA DE TELEGRAM - TELEGRAM FALSO LENTO Y CON FALLOS
+Corre emisor_telegram del Bot 2 a 1 contra un bot.send_message falso que tarda en responder,
+devuelve 429 con retry_after y a veces falla la conexión. Mientras tanto un hilo de "trading"
+encola avisos de apertura (todos distintos) y actualizaciones de protección progresiva con
+clave por symbol, como el bot. Comprueba que:
+  - el hilo de trading nunca se bloquea (cada enviar_mensaje_telegram tarda microsegundos)
+  - los avisos distintos llegan todos, una vez y en el orden en que se encolaron
+  - las actualizaciones de un symbol se fusionan: llegan menos que las encoladas, en orden,
+    y la última que llega es la más reciente
+  - los reintentos (429 y errores de red) no pierden mensajes y se respeta el intervalo por chat
+
+Uso:
+    python prueba_telegram.py --avisos 30 --actualizaciones 200 --simbolos 5
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+import telebot
+
+from simulador_bybit import config_simulador
+
+
+class TelegramFalso:
+    """send_message lento: cada llamada tarda demora_s y algunas fallan con 429 o error de red"""
+
+    def __init__(self, demora_s, prob_429, prob_red, semilla):
+        self.demora_s = demora_s
+        self.prob_429 = prob_429
+        self.prob_red = prob_red
+        self.azar = random.Random(semilla)
+        self.entregados = []  # [(momento, chat_id, mensaje)]
+        self.fallos = {"429": 0, "red": 0}
+
+    def send_message(self, chat_id, mensaje, parse_mode=None):
+        time.sleep(self.demora_s)
+        sorteo = self.azar.random()
+        if sorteo < self.prob_429:
+            self.fallos["429"] += 1
+            raise telebot.apihelper.ApiTelegramException("sendMessage", None, {
+                "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 0.2}})
+        if sorteo < self.prob_429 + self.prob_red:
+            self.fallos["red"] += 1
+            raise ConnectionError("Telegram falso: conexión cerrada")
+        self.entregados.append((time.monotonic(), chat_id, mensaje))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandeja de Telegram del Bot 2 a 1 contra un Telegram falso")
+    parser.add_argument("--avisos", type=int, default=30, help="Mensajes distintos (aperturas, cierres)")
+    parser.add_argument("--actualizaciones", type=int, default=200, help="Protecciones progresivas por symbol")
+    parser.add_argument("--simbolos", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.modules["config"] = config_simulador(chat_id="chat-prueba", simbolos=1, latencia_ms=None)
+    import Bot_2_a_1 as bot
+
+    # Con el simulador el emisor descarta todo: aquí se envía al Telegram falso
+    bot.modo_simulador = False
+    bot.intervalo_telegram_segundos = 0.1
+    falso = TelegramFalso(demora_s=0.05, prob_429=0.05, prob_red=0.06, semilla=args.semilla)
+    bot.bot = falso
+    threading.Thread(target=bot.emisor_telegram, daemon=True).start()
+
+    simbolos = [f"SIM{i:03d}USDT" for i in range(args.simbolos)]
+    azar = random.Random(args.semilla)
+    eventos = [("aviso", i) for i in range(args.avisos)]
+    eventos += [("progresiva", (symbol, n)) for symbol in simbolos for n in range(args.actualizaciones)]
+    eventos.sort(key=lambda evento: azar.random())
+    # Numerados en el orden en que se encolan: avisos 0, 1, 2... y cada symbol con sus actualizaciones
+    numeros_avisos = iter(range(args.avisos))
+    siguientes = {symbol: iter(range(args.actualizaciones)) for symbol in simbolos}
+    eventos = [(tipo, (dato[0], next(siguientes[dato[0]])) if tipo == "progresiva" else next(numeros_avisos))
+               for tipo, dato in eventos]
+
+    duraciones = []
+
+    def trading():
+        for tipo, dato in eventos:
+            if tipo == "aviso":
+                mensaje, clave = f"aviso {dato}", None
+            else:
+                symbol, n = dato
+                mensaje, clave = f"progresiva {symbol} {n}", f"progresiva_{symbol}"
+            inicio = time.perf_counter()
+            bot.enviar_mensaje_telegram(chat_id=bot.chat_id, mensaje=mensaje, clave=clave)
+            duraciones.append(time.perf_counter() - inicio)
+            time.sleep(azar.uniform(0, 0.004))
+
+    hilo = threading.Thread(target=trading)
+    inicio_trading = time.monotonic()
+    hilo.start()
+    hilo.join()
+    duracion_trading = time.monotonic() - inicio_trading
+
+    # Esperar a que el emisor vacíe la bandeja
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        with bot.telegram_condicion:
+            if not bot.telegram_pendientes:
+                break
+        time.sleep(0.05)
+    time.sleep(1)  # El último envío (con sus reintentos) puede estar en curso
+
+    errores = []
+    entregados = [mensaje for _, _, mensaje in falso.entregados]
+    avisos = [int(mensaje.split()[1]) for mensaje in entregados if mensaje.startswith("aviso")]
+    if avisos != list(range(args.avisos)):
+        errores.append(f"Avisos entregados fuera de orden o incompletos: {avisos[:10]}...")
+
+    for symbol in simbolos:
+        numeros = [int(mensaje.split()[2]) for mensaje in entregados if mensaje.startswith(f"progresiva {symbol} ")]
+        if numeros != sorted(set(numeros)):
+            errores.append(f"{symbol}: actualizaciones repetidas o fuera de orden {numeros}")
+        if not numeros or numeros[-1] != args.actualizaciones - 1:
+            errores.append(f"{symbol}: la última actualización entregada no es la más reciente ({numeros[-1:]})")
+        if len(numeros) >= args.actualizaciones:
+            errores.append(f"{symbol}: {len(numeros)} actualizaciones entregadas, no se fusionó ninguna")
+    progresivas = len(entregados) - len(avisos)
+
+    momentos = [momento for momento, _, _ in falso.entregados]
+    separacion_min = min((b - a for a, b in zip(momentos, momentos[1:])), default=0)
+    if separacion_min < bot.intervalo_telegram_segundos * 0.9:
+        errores.append(f"Dos envíos separados por {separacion_min * 1000:.0f} ms "
+                       f"(intervalo {bot.intervalo_telegram_segundos * 1000:.0f} ms)")
+
+    duraciones_ms = sorted(duracion * 1000 for duracion in duraciones)
+    maxima_ms = duraciones_ms[-1]
+    if maxima_ms > 5:
+        errores.append(f"enviar_mensaje_telegram tardó {maxima_ms:.1f} ms: el trading quedó esperando al envío")
+
+    print(f"🧪 {len(eventos)} mensajes encolados en {duracion_trading:.1f} s "
+          f"({args.avisos} avisos, {args.actualizaciones} progresivas x {args.simbolos} symbols)")
+    print(f"📨 Entregados {len(entregados)}: {len(avisos)} avisos + {progresivas} progresivas "
+          f"(fusionadas {args.actualizaciones * args.simbolos - progresivas}) | fallos del falso {falso.fallos}")
+    print(f"⏱️ enviar_mensaje_telegram: p50 {duraciones_ms[len(duraciones_ms) // 2] * 1000:.1f} µs | "
+          f"máx {maxima_ms * 1000:.1f} µs (send_message tarda {falso.demora_s * 1000:.0f} ms)")
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Sin bloquear al trading, en orden y con una sola actualización pendiente por symbol")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+🔌 PRUEBA DE LA PROTECCIÓN POR WEBSOCKET CONTRA UN SERVIDOR LOCAL
+Levanta un servidor WebSocket local que imita los streams V5 de Bybit (público linear y privado
+con auth, subscribe/unsubscribe con req_id) y conecta a él los streams de pybit del Bot 2 a 1.
+Las órdenes y los SL van al simulador local de Bybit. Comprueba que:
+- Un evento de posición suscribe el ticker del symbol una sola vez
+- Cada ticker evalúa la protección: al cruzar el objetivo 2:1 el SL pasa a 1:1 en el exchange
+- Al cerrarse la posición se da de baja el ticker y el servidor deja de enviarlo
+- Si la posición se vuelve a abrir, el ticker se suscribe de nuevo
+- El stream de órdenes confirma fills aunque lleguen antes de esperar_fill, y los fills que
+  nadie reclama no se acumulan
+
+Uso:
+    python prueba_websocket_bybit.py --posiciones 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from simulador_bybit import config_simulador
+from utilidades_prueba import percentiles
+
+
+# ===== SERVIDOR LOCAL =====
+class ServidorBybitWS:
+    """Servidor con el protocolo de suscripción de Bybit V5. Publica solo a quien tiene el topic suscrito"""
+
+    def __init__(self, latencia_s=0.005):
+        self.latencia_s = latencia_s  # pybit registra la suscripción después de enviarla: sin latencia la respuesta le gana
+        self.conexiones = {}  # {conexión: set(topics)}
+        self.pedidos = []  # (op, topic) en orden de llegada
+        self.loop = None
+        self.puerto = None
+
+    def iniciar(self):
+        listo = threading.Event()
+
+        async def principal():
+            servidor = await serve(self._manejar, "127.0.0.1", 0)
+            self.puerto = servidor.sockets[0].getsockname()[1]
+            listo.set()
+            await servidor.serve_forever()
+
+        def correr():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(principal())
+
+        threading.Thread(target=correr, daemon=True).start()
+        listo.wait()
+        return f"ws://127.0.0.1:{self.puerto}"
+
+    def suscritos(self, topic):
+        return sum(topic in topics for topics in list(self.conexiones.values()))
+
+    def publicar(self, topic, data, tipo="snapshot"):
+        """Envía un mensaje de topic a las conexiones suscritas (desde cualquier hilo)"""
+        mensaje = json.dumps({"topic": topic, "type": tipo, "ts": int(time.time() * 1000), "data": data})
+        for conexion, topics in list(self.conexiones.items()):
+            if topic in topics:
+                asyncio.run_coroutine_threadsafe(conexion.send(mensaje), self.loop)
+
+    async def _manejar(self, conexion):
+        topics = self.conexiones.setdefault(conexion, set())
+        try:
+            async for texto in conexion:
+                pedido = json.loads(texto)
+                op = pedido.get("op")
+                if op == "ping":
+                    await conexion.send(json.dumps({"op": "pong", "ret_msg": "pong", "success": True}))
+                    continue
+                if op == "subscribe":
+                    topics.update(pedido["args"])
+                elif op == "unsubscribe":
+                    topics.difference_update(pedido["args"])
+                for topic in pedido.get("args", []) if op != "auth" else []:
+                    self.pedidos.append((op, topic))
+                await asyncio.sleep(self.latencia_s)
+                respuesta = {"success": True, "ret_msg": "", "conn_id": "local", "op": op}
+                if "req_id" in pedido:
+                    respuesta["req_id"] = pedido["req_id"]
+                await conexion.send(json.dumps(respuesta))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.conexiones.pop(conexion, None)
+
+
+def esperar(condicion, limite=5):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Protección por WebSocket del Bot 2 a 1 contra un servidor local")
+    parser.add_argument("--posiciones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    servidor = ServidorBybitWS()
+    url = servidor.iniciar()
+
+    # Los streams de pybit apuntan al servidor local en lugar de a stream.bybit.com
+    import pybit.unified_trading
+    pybit.unified_trading.PUBLIC_WSS = url + "/v5/public/{CHANNEL_TYPE}"
+    pybit.unified_trading.PRIVATE_WSS = url + "/v5/private"
+
+    # Claves de prueba para el stream privado; los precios los mueve la prueba
+    sys.modules["config"] = config_simulador(api_key="prueba", simbolos=args.posiciones + 5, latencia_ms=(5, 15),
+                                             volatilidad_por_segundo=0.0, semilla=args.semilla)
+    import Bot_2_a_1 as bot
+
+    directorio = tempfile.mkdtemp(prefix="prueba_websocket_")
+    bot.ESTADO_DB_FILE = os.path.join(directorio, "estado.db")
+    bot.init_estado_db()
+    threading.Thread(target=bot.escribir_journal, daemon=True).start()
+    bot.cargar_instrumentos()
+    bot.usar_websocket_proteccion = True
+    simulador = bot.session.http
+    simbolos = sorted(simulador.instrumentos)[:args.posiciones]
+    errores = []
+
+    bot.iniciar_proteccion_websocket()
+    if not bot.websocket_activo():
+        print("❌ Los streams no conectaron con el servidor local")
+        sys.exit(1)
+
+    # Momento en que el exchange acepta cada SL, para medir ticker → SL
+    sl_aceptados = {}
+    set_trading_stop_original = simulador.set_trading_stop
+
+    def set_trading_stop_registrado(**kwargs):
+        respuesta = set_trading_stop_original(**kwargs)
+        cuerpo = respuesta[0] if isinstance(respuesta, tuple) else respuesta
+        if cuerpo["retCode"] == 0:
+            sl_aceptados[kwargs["symbol"]] = time.perf_counter()
+        return respuesta
+
+    simulador.set_trading_stop = set_trading_stop_registrado
+
+    def abrir(symbol, distancia_sl):
+        """Abre la posición en el simulador con su SL inicial y publica el evento de posición"""
+        with simulador.lock:
+            precio = Decimal(f"{simulador.precios[symbol]:.{simulador.instrumentos[symbol]['decimales']}f}")
+        qty = bot.qty_step(symbol, Decimal(100), precio)
+        sl = bot.adjust_price(symbol, bot.calcular_precio_sl_inicial(precio, distancia_sl, "Buy"), "Buy")
+        simulador.place_order(category="linear", symbol=symbol, side="Buy", orderType="Market", qty=str(qty), stopLoss=sl)
+        with simulador.lock:
+            posicion = simulador._formatear_posicion(symbol)
+        bot.tracking_posiciones[symbol] = {
+            "precio_maximo": Decimal(posicion["avgPrice"]),
+            "precio_entrada": Decimal(posicion["avgPrice"]),
+            "side": "Buy",
+            "distancia_sl": distancia_sl,
+        }
+        servidor.publicar("position", [dict(posicion, category="linear")])
+        return posicion
+
+    def publicar_precio(symbol, factor):
+        """Mueve el precio del simulador y lo publica en el ticker del symbol"""
+        with simulador.lock:
+            decimales = simulador.instrumentos[symbol]["decimales"]
+            entrada = simulador.posiciones[symbol]["avg_price"]
+            simulador.precios[symbol] = round(entrada * factor, decimales)
+            precio = f"{simulador.precios[symbol]:.{decimales}f}"
+        servidor.publicar(f"tickers.{symbol}", {"symbol": symbol, "lastPrice": precio})
+
+    # ===== APERTURA: SUSCRIPCIÓN DE TICKERS =====
+    distancia_sl = Decimal("1.5")
+    posiciones = [abrir(symbol, distancia_sl) for symbol in simbolos]
+    esperar(lambda: all(servidor.suscritos(f"tickers.{symbol}") for symbol in simbolos))
+    for posicion in posiciones:
+        servidor.publicar("position", [dict(posicion, category="linear")])  # Evento repetido: no vuelve a suscribir
+    time.sleep(0.3)
+    suscripciones = [topic for op, topic in servidor.pedidos if op == "subscribe" and topic.startswith("tickers.")]
+    print(f"📡 {len(simbolos)} posiciones abiertas: {len(suscripciones)} suscripciones de ticker")
+    if sorted(suscripciones) != sorted(f"tickers.{symbol}" for symbol in simbolos):
+        errores.append(f"Suscripciones de ticker inesperadas: {suscripciones}")
+
+    # ===== TICKERS: PROTECCIÓN 1:1 =====
+    # Debajo del objetivo no pasa nada; al cruzar 2x la distancia el SL pasa a entrada + distancia
+    for symbol in simbolos:
+        publicar_precio(symbol, 1.01)
+    time.sleep(0.3)
+    if sl_aceptados:
+        errores.append(f"Se movió el SL antes del objetivo 2:1: {sorted(sl_aceptados)}")
+
+    enviados = {}
+    for symbol in simbolos:
+        enviados[symbol] = time.perf_counter()
+        publicar_precio(symbol, 1.031)
+    esperar(lambda: len(sl_aceptados) == len(simbolos))
+    latencias = [sl_aceptados[symbol] - enviados[symbol] for symbol in simbolos if symbol in sl_aceptados]
+    print(f"🛡️ Protección 1:1 por ticker: {len(latencias)}/{len(simbolos)} ({percentiles(latencias, (50, 90))} ticker → SL)")
+    for symbol in simbolos:
+        with simulador.lock:
+            entrada = Decimal(str(simulador.posiciones[symbol]["avg_price"]))
+            stop = Decimal(str(simulador.posiciones[symbol]["stop_loss"]))
+        if stop <= entrada:
+            errores.append(f"{symbol}: el SL {stop} no pasó a 1:1 (entrada {entrada})")
+        if symbol not in bot.posiciones_con_stop:
+            errores.append(f"{symbol}: sin marca de protección 1:1")
+
+    # ===== ÓRDENES: FILLS POR STREAM =====
+    # Un fill que llega antes de que esperar_fill conozca el orderId se confirma igual
+    def publicar_fill(order_id, precio):
+        servidor.publicar("order", [{"category": "linear", "orderId": order_id, "symbol": simbolos[0],
+                                     "orderStatus": "Filled", "avgPrice": precio, "stopOrderType": "",
+                                     "reduceOnly": False}])
+
+    publicar_fill("orden-esperada", "123.45")
+    esperar(lambda: "orden-esperada" in bot.ordenes_ejecutadas)
+    confirmado = bot.esperar_fill(simbolos[0], "orden-esperada")
+    if confirmado != Decimal("123.45") or "orden-esperada" in bot.ordenes_ejecutadas:
+        errores.append(f"esperar_fill no tomó el fill del stream ({confirmado})")
+
+    # Fills ajenos (órdenes manuales, otras apps) solo viven la retención
+    bot.retencion_ordenes_segundos = 0.2
+    for i in range(500):
+        publicar_fill(f"ajena-{i}", "1")
+    esperar(lambda: "ajena-499" in bot.ordenes_ejecutadas)
+    time.sleep(0.3)
+    publicar_fill("ajena-final", "1")
+    esperar(lambda: "ajena-final" in bot.ordenes_ejecutadas)
+    print(f"🧾 Fills por stream: esperado confirmado, {len(bot.ordenes_ejecutadas)} ajeno(s) retenido(s) de 501")
+    if len(bot.ordenes_ejecutadas) != 1:
+        errores.append(f"Quedaron {len(bot.ordenes_ejecutadas)} fills sin reclamar tras la retención")
+
+    # ===== CIERRE: BAJA DEL TICKER =====
+    # El precio cruza el SL, el simulador cierra y el ledger de PnL emite el cierre al actor
+    cerrado = simbolos[0]
+    with simulador.lock:
+        simulador.precios[cerrado] = simulador.posiciones[cerrado]["stop_loss"] * 0.99
+    simulador.get_tickers(category="linear")
+    conn = sqlite3.connect(bot.ESTADO_DB_FILE, timeout=5)
+    for registro in bot.ingerir_pnl_cerrado(conn, 0):
+        bot.planificador.actor(registro["symbol"]).enviar(bot.al_cerrar_posicion, registro)
+    servidor.publicar("position", [{"category": "linear", "symbol": cerrado, "side": "", "size": "0", "avgPrice": "0"}])
+    esperar(lambda: not servidor.suscritos(f"tickers.{cerrado}"))
+    bajas = [topic for op, topic in servidor.pedidos if op == "unsubscribe"]
+    print(f"🔴 {cerrado} cerrada: bajas {bajas}, tickers suscritos {len(bot.tickers_suscritos)}")
+    if bajas != [f"tickers.{cerrado}"] or cerrado in bot.tickers_suscritos:
+        errores.append(f"El ticker de {cerrado} no se dio de baja al cerrar (bajas {bajas})")
+    if servidor.suscritos(f"tickers.{cerrado}"):
+        errores.append(f"El servidor sigue enviando tickers de {cerrado}")
+    if any(servidor.suscritos(f"tickers.{symbol}") != 1 for symbol in simbolos[1:]):
+        errores.append("Se dio de baja el ticker de una posición que sigue abierta")
+
+    # ===== REAPERTURA: NUEVA SUSCRIPCIÓN =====
+    # pybit libera el topic cuando llega la confirmación de la baja
+    esperar(lambda: f"tickers.{cerrado}" not in bot.ws_publico.callback_directory)
+    abrir(cerrado, distancia_sl)
+    esperar(lambda: servidor.suscritos(f"tickers.{cerrado}"))
+    sl_aceptados.pop(cerrado, None)
+    publicar_precio(cerrado, 1.031)
+    esperar(lambda: cerrado in sl_aceptados)
+    print(f"🟢 {cerrado} reabierta: ticker suscrito de nuevo, protección {'activa' if cerrado in sl_aceptados else 'sin respuesta'}")
+    if not servidor.suscritos(f"tickers.{cerrado}") or cerrado not in bot.tickers_suscritos:
+        errores.append(f"El ticker de {cerrado} no se volvió a suscribir al reabrir")
+    if cerrado not in sl_aceptados:
+        errores.append(f"{cerrado}: la protección no reaccionó a los tickers tras reabrir")
+
+    print("=" * 60)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Tickers suscritos por posición, protección por evento, fills por stream acotados y baja del ticker al cerrar")
+
+
+if __name__ == "__main__":
+    main()
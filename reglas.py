@@ -0,0 +1,80 @@
+"""
+📏 REGLAS DE GESTIÓN 2:1 - FUNCIONES PURAS
+Las usan el Bot 2 a 1 en vivo y el backtester, así ambos aplican exactamente la misma lógica.
+Funcionan tanto con Decimal (en vivo) como con float (backtest).
+"""
+
+
+def calcular_monto_operacion(monto_base, distancia_sl_porcentaje):
+    """
+    Calcula el monto real de la operación para lograr el ratio 2:1
+    Ejemplo: Si monto_base = 100 USDT y SL = 1.5%, entonces operar con 66.67 USDT
+    Para que si pierde el 1.5%, pierda 1 USDT, pero si gana 3% (2x1.5%), gane 2 USDT
+    """
+    monto_operacion = monto_base / distancia_sl_porcentaje
+    return monto_operacion
+
+
+def calcular_precio_sl_inicial(precio_entrada, distancia_sl_porcentaje, side):
+    """SL inicial: a distancia_sl_porcentaje en contra de la posición"""
+    distancia_decimal = distancia_sl_porcentaje / 100
+    if side == "Buy":
+        return precio_entrada * (1 - distancia_decimal)
+    return precio_entrada * (1 + distancia_decimal)
+
+
+def calcular_precio_proteccion_1a1(precio_entrada, distancia_sl_porcentaje, side):
+    """
+    Calcula el precio donde se debe colocar el SL en el precio de entrada (1 a 1)
+    Esto ocurre cuando el precio se mueve 2x la distancia del SL (2:1)
+    """
+    distancia_decimal = distancia_sl_porcentaje / 100
+
+    if side == "Buy":
+        # Para Long: el precio debe subir 2x la distancia del SL
+        precio_objetivo_2a1 = precio_entrada * (1 + (distancia_decimal * 2))
+        return precio_objetivo_2a1
+    elif side == "Sell":
+        # Para Short: el precio debe bajar 2x la distancia del SL
+        precio_objetivo_2a1 = precio_entrada * (1 - (distancia_decimal * 2))
+        return precio_objetivo_2a1
+
+    return None
+
+
+def calcular_precio_sl_1a1(precio_entrada, distancia_sl_porcentaje, side):
+    """SL de la protección 1:1: entrada ± distancia (protege ganancia = riesgo inicial)"""
+    distancia_decimal = distancia_sl_porcentaje / 100
+    if side == "Buy":
+        return precio_entrada * (1 + distancia_decimal)
+    return precio_entrada * (1 - distancia_decimal)
+
+
+def evaluar_proteccion(side, precio_entrada, precio_maximo, distancia_sl_porcentaje,
+                       con_proteccion_1a1, last_price, margen_proteccion_progresiva):
+    """
+    Decide qué hacer con el SL ante un nuevo precio. Devuelve (accion, nuevo_sl):
+    - ("1a1", sl): se alcanzó el objetivo 2:1, mover el SL a 1:1
+    - ("progresiva", sl): el precio avanzó el margen desde el último máximo, SL al máximo anterior
+    - (None, None): no hay cambios
+    Tras aplicar una acción el nuevo precio_maximo es last_price.
+    """
+    # ===== FASE 1: PROTECCIÓN 1:1 (Primera protección) =====
+    if not con_proteccion_1a1:
+        precio_objetivo_1a1 = calcular_precio_proteccion_1a1(precio_entrada, distancia_sl_porcentaje, side)
+        if (side == "Buy" and last_price >= precio_objetivo_1a1) or (side == "Sell" and last_price <= precio_objetivo_1a1):
+            return "1a1", calcular_precio_sl_1a1(precio_entrada, distancia_sl_porcentaje, side)
+        return None, None
+
+    # ===== FASE 2: PROTECCIÓN PROGRESIVA (Niveles siguientes) =====
+    if side == "Buy" and last_price > precio_maximo:
+        avance_porcentaje = ((last_price - precio_maximo) / precio_maximo) * 100
+    elif side == "Sell" and last_price < precio_maximo:
+        avance_porcentaje = ((precio_maximo - last_price) / precio_maximo) * 100
+    else:
+        return None, None
+
+    # Si avanzó al menos el margen, el nuevo SL es el máximo (o mínimo) anterior
+    if avance_porcentaje >= margen_proteccion_progresiva:
+        return "progresiva", precio_maximo
+    return None, None
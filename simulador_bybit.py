@@ -0,0 +1,359 @@
+"""
+🧪 SIMULADOR LOCAL DE BYBIT V5
+Sustituto en memoria de pybit HTTP para los endpoints que usa el Bot 2 a 1:
+get_instruments_info, get_tickers, get_positions, place_order, get_order_history,
+set_trading_stop y get_closed_pnl.
+
+- Precios: paseo aleatorio por símbolo que avanza con el reloj
+- Matching: órdenes a mercado al último precio ± slippage; los SL se ejecutan cuando
+  el precio los cruza (se revisan en cada llamada)
+- Latencia y errores configurables (errores de red, throttling y rate limit por endpoint)
+- Errores como pybit: un retCode distinto de 0 no vuelve como respuesta, se lanza
+  InvalidRequestError con el retCode en status_code
+
+Se activa en config.py con simulador_bybit = True (ver simulador_opciones).
+"""
+
+import math
+import random
+import threading
+import time
+import types
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pybit.exceptions import InvalidRequestError
+
+from cliente_bybit import LIMITES_POR_ENDPOINT, LIMITE_POR_DEFECTO
+
+
+def nombres_simbolos(cantidad):
+    """Símbolos del universo simulado: SIM000USDT, SIM001USDT..."""
+    return [f"SIM{i:03d}USDT" for i in range(cantidad)]
+
+
+def config_simulador(api_key="", chat_id="", **opciones):
+    """
+    Módulo config en memoria para pruebas y benchmarks: simulador activado con estas simulador_opciones,
+    sin Telegram. Se instala con sys.modules["config"] = config_simulador(...) antes de importar el bot
+    """
+    config = types.ModuleType("config")
+    config.api_key = config.api_secret = api_key
+    config.token_telegram = ""
+    config.chat_id = chat_id
+    config.simulador_bybit = True
+    config.simulador_opciones = opciones
+    return config
+
+
+def _respuesta(result=None, ret_code=0, ret_msg="OK"):
+    return {
+        "retCode": ret_code,
+        "retMsg": ret_msg,
+        "result": result if result is not None else {},
+        "retExtInfo": {},
+        "time": int(time.time() * 1000),
+    }
+
+
+def _formatear(valor, decimales):
+    return f"{valor:.{decimales}f}"
+
+
+class SimuladorBybit:
+    """Se usa igual que pybit.unified_trading.HTTP (y se puede envolver con ClienteBybit)"""
+
+    def __init__(
+        self,
+        simbolos=50,
+        latencia_ms=(20, 60),
+        prob_error_red=0.0,
+        prob_throttle=0.0,
+        aplicar_rate_limit=True,
+        volatilidad_por_segundo=0.0005,
+        slippage_bps=2,
+        devolver_cabeceras=True,
+        semilla=None,
+    ):
+        self.latencia_ms = latencia_ms
+        self.prob_error_red = prob_error_red
+        self.prob_throttle = prob_throttle
+        self.aplicar_rate_limit = aplicar_rate_limit
+        self.volatilidad_por_segundo = volatilidad_por_segundo
+        self.slippage = slippage_bps / 10000
+        self.devolver_cabeceras = devolver_cabeceras
+        self.rng = random.Random(semilla)
+        self.lock = threading.Lock()
+
+        self.instrumentos = {}  # {symbol: {"tick": float, "decimales": int, "qty_step": float, "qty_decimales": int}}
+        self.precios = {}  # {symbol: float}
+        self.posiciones = {}  # {symbol: {"side", "size", "avg_price", "stop_loss", "created"}}
+        self.ordenes = {}  # {orderId: dict}
+        self.pnl_cerrado = []  # Registros en el formato de get_closed_pnl
+        self.ventanas = {}  # {endpoint: (segundo, llamadas)}
+        self.ultimo_avance = time.monotonic()
+
+        for symbol in nombres_simbolos(simbolos):
+            precio = 10 ** self.rng.uniform(-2, 4.5)
+            decimales = max(4 - math.floor(math.log10(precio)), 0)
+            qty_decimales = min(max(math.ceil(math.log10(precio / 10)), 0), 4)
+            self.instrumentos[symbol] = {
+                "tick": 10 ** -decimales,
+                "decimales": decimales,
+                "qty_step": 10 ** -qty_decimales,
+                "qty_decimales": qty_decimales,
+            }
+            self.precios[symbol] = round(precio, decimales)
+
+    # ===== INFRAESTRUCTURA =====
+    def _llamada(self, endpoint, funcion):
+        """Latencia, errores inyectados, rate limit y avance del mercado comunes a todos los endpoints"""
+        if self.latencia_ms:
+            time.sleep(self.rng.uniform(*self.latencia_ms) / 1000)
+        if self.rng.random() < self.prob_error_red:
+            raise ConnectionError(f"Simulador: error de red inyectado en {endpoint}")
+
+        limite = LIMITES_POR_ENDPOINT.get(endpoint, LIMITE_POR_DEFECTO)
+        with self.lock:
+            segundo = int(time.time())
+            inicio_ventana, llamadas = self.ventanas.get(endpoint, (segundo, 0))
+            if inicio_ventana != segundo:
+                llamadas = 0
+            llamadas += 1
+            self.ventanas[endpoint] = (segundo, llamadas)
+            restantes = max(limite - llamadas, 0)
+
+            if (self.aplicar_rate_limit and llamadas > limite) or self.rng.random() < self.prob_throttle:
+                respuesta = _respuesta(ret_code=10006, ret_msg="Too many visits!")
+            else:
+                self._avanzar_mercado()
+                respuesta = funcion()
+
+        cabeceras = {
+            "X-Bapi-Limit": str(limite),
+            "X-Bapi-Limit-Status": str(restantes),
+            "X-Bapi-Limit-Reset-Timestamp": str((segundo + 1) * 1000),
+        } if self.devolver_cabeceras else None
+        if respuesta["retCode"] != 0:
+            raise InvalidRequestError(
+                request=f"{endpoint}",
+                message=respuesta["retMsg"],
+                status_code=respuesta["retCode"],
+                time=datetime.now(timezone.utc).strftime("%H:%M:%S"),
+                resp_headers=cabeceras,
+            )
+        if not self.devolver_cabeceras:
+            return respuesta
+        return respuesta, timedelta(0), cabeceras
+
+    def _avanzar_mercado(self):
+        """Mueve todos los precios según el tiempo transcurrido y ejecuta los SL cruzados"""
+        ahora = time.monotonic()
+        transcurrido = ahora - self.ultimo_avance
+        if transcurrido <= 0:
+            return
+        self.ultimo_avance = ahora
+        sigma = self.volatilidad_por_segundo * math.sqrt(transcurrido)
+        for symbol, precio in self.precios.items():
+            decimales = self.instrumentos[symbol]["decimales"]
+            self.precios[symbol] = max(round(precio * math.exp(self.rng.gauss(0, sigma)), decimales), 10 ** -decimales)
+
+        for symbol, posicion in list(self.posiciones.items()):
+            stop = posicion["stop_loss"]
+            if stop is None:
+                continue
+            precio = self.precios[symbol]
+            if (posicion["side"] == "Buy" and precio <= stop) or (posicion["side"] == "Sell" and precio >= stop):
+                lado_cierre = "Sell" if posicion["side"] == "Buy" else "Buy"
+                self._ejecutar(symbol, lado_cierre, posicion["size"], stop)
+
+    def _precio_ejecucion(self, symbol, side, referencia=None):
+        precio = self.precios[symbol] if referencia is None else referencia
+        precio *= (1 + self.slippage) if side == "Buy" else (1 - self.slippage)
+        return round(precio, self.instrumentos[symbol]["decimales"])
+
+    def _ejecutar(self, symbol, side, qty, referencia=None):
+        """Ejecuta una orden a mercado contra la posición del symbol. Devuelve el precio de ejecución"""
+        precio = self._precio_ejecucion(symbol, side, referencia)
+        posicion = self.posiciones.get(symbol)
+        ahora_ms = int(time.time() * 1000)
+
+        if posicion is None:
+            self.posiciones[symbol] = {"side": side, "size": qty, "avg_price": precio, "stop_loss": None, "created": ahora_ms}
+        elif posicion["side"] == side:
+            total = posicion["size"] + qty
+            posicion["avg_price"] = (posicion["avg_price"] * posicion["size"] + precio * qty) / total
+            posicion["size"] = total
+        else:
+            cerrada = min(qty, posicion["size"])
+            signo = 1 if posicion["side"] == "Buy" else -1
+            decimales = self.instrumentos[symbol]["decimales"]
+            self.pnl_cerrado.append({
+                "orderId": uuid.uuid4().hex,
+                "symbol": symbol,
+                "side": side,
+                "qty": _formatear(cerrada, self.instrumentos[symbol]["qty_decimales"]),
+                "closedPnl": _formatear(signo * (precio - posicion["avg_price"]) * cerrada, 8),
+                "avgEntryPrice": _formatear(posicion["avg_price"], decimales),
+                "avgExitPrice": _formatear(precio, decimales),
+                "createdTime": str(posicion["created"]),
+                "updatedTime": str(ahora_ms),
+            })
+            posicion["size"] -= cerrada
+            if posicion["size"] <= 1e-12:
+                del self.posiciones[symbol]
+            if qty > cerrada:
+                self._ejecutar(symbol, side, qty - cerrada, precio)
+        return precio
+
+    def _formatear_posicion(self, symbol):
+        instrumento = self.instrumentos[symbol]
+        posicion = self.posiciones.get(symbol)
+        if posicion is None:
+            return {"symbol": symbol, "side": "", "size": "0", "avgPrice": "0", "stopLoss": "", "unrealisedPnl": "0"}
+        signo = 1 if posicion["side"] == "Buy" else -1
+        return {
+            "symbol": symbol,
+            "side": posicion["side"],
+            "size": _formatear(posicion["size"], instrumento["qty_decimales"]),
+            "avgPrice": _formatear(posicion["avg_price"], instrumento["decimales"]),
+            "markPrice": _formatear(self.precios[symbol], instrumento["decimales"]),
+            "stopLoss": _formatear(posicion["stop_loss"], instrumento["decimales"]) if posicion["stop_loss"] else "",
+            "unrealisedPnl": _formatear(signo * (self.precios[symbol] - posicion["avg_price"]) * posicion["size"], 8),
+        }
+
+    def _validar_sl(self, symbol, side, stop_loss):
+        """Devuelve un mensaje de error si el SL no es válido para el lado de la posición"""
+        stop = float(stop_loss)
+        precio = self.precios[symbol]
+        tick = self.instrumentos[symbol]["tick"]
+        if abs(round(stop / tick) * tick - stop) > tick * 1e-6:
+            return f"StopLoss {stop_loss} no está en la grilla de ticks {tick}"
+        if (side == "Buy" and stop >= precio) or (side == "Sell" and stop <= precio):
+            return f"StopLoss {stop_loss} inválido para {side} con último precio {precio}"
+        return None
+
+    # ===== CONTROL DE PRUEBAS =====
+    def fijar_precio(self, symbol, precio):
+        """Fija el último precio de un symbol (en la grilla de ticks). Devuelve el precio como string"""
+        with self.lock:
+            decimales = self.instrumentos[symbol]["decimales"]
+            self.precios[symbol] = round(float(precio), decimales)
+            return _formatear(self.precios[symbol], decimales)
+
+    # ===== ENDPOINTS =====
+    def get_instruments_info(self, category="linear", symbol=None, limit=1000, cursor="", **kwargs):
+        def funcion():
+            simbolos = [symbol] if symbol else sorted(self.instrumentos)
+            inicio = int(cursor) if cursor else 0
+            pagina = [s for s in simbolos[inicio:inicio + limit] if s in self.instrumentos]
+            siguiente = str(inicio + limit) if not symbol and inicio + limit < len(simbolos) else ""
+            lista = [{
+                "symbol": s,
+                "status": "Trading",
+                "priceScale": str(self.instrumentos[s]["decimales"]),
+                "priceFilter": {"tickSize": _formatear(self.instrumentos[s]["tick"], self.instrumentos[s]["decimales"])},
+                "lotSizeFilter": {"qtyStep": _formatear(self.instrumentos[s]["qty_step"], self.instrumentos[s]["qty_decimales"])},
+            } for s in pagina]
+            return _respuesta({"category": category, "list": lista, "nextPageCursor": siguiente})
+        return self._llamada("get_instruments_info", funcion)
+
+    def get_tickers(self, category="linear", symbol=None, **kwargs):
+        def funcion():
+            simbolos = [symbol] if symbol else sorted(self.precios)
+            lista = [
+                {"symbol": s, "lastPrice": _formatear(self.precios[s], self.instrumentos[s]["decimales"])}
+                for s in simbolos if s in self.precios
+            ]
+            return _respuesta({"category": category, "list": lista})
+        return self._llamada("get_tickers", funcion)
+
+    def get_positions(self, category="linear", symbol=None, settleCoin=None, **kwargs):
+        def funcion():
+            if symbol:
+                if symbol not in self.instrumentos:
+                    return _respuesta(ret_code=10001, ret_msg=f"symbol {symbol} not exist")
+                lista = [self._formatear_posicion(symbol)]
+            else:
+                lista = [self._formatear_posicion(s) for s in sorted(self.posiciones)]
+            return _respuesta({"category": category, "list": lista, "nextPageCursor": ""})
+        return self._llamada("get_positions", funcion)
+
+    def place_order(self, category="linear", symbol=None, side=None, orderType="Market", qty=None,
+                    stopLoss=None, reduceOnly=False, **kwargs):
+        def funcion():
+            if symbol not in self.instrumentos:
+                return _respuesta(ret_code=10001, ret_msg=f"symbol {symbol} not exist")
+            if orderType != "Market":
+                return _respuesta(ret_code=10001, ret_msg="El simulador solo admite órdenes a mercado")
+            instrumento = self.instrumentos[symbol]
+            cantidad = float(qty)
+            pasos = cantidad / instrumento["qty_step"]
+            if cantidad <= 0 or abs(round(pasos) - pasos) > 1e-6:
+                return _respuesta(ret_code=10001, ret_msg=f"Qty invalid: {qty} (qtyStep {instrumento['qty_step']})")
+            if stopLoss and not reduceOnly:
+                error = self._validar_sl(symbol, side, stopLoss)
+                if error:
+                    return _respuesta(ret_code=10001, ret_msg=error)
+
+            posicion = self.posiciones.get(symbol)
+            if reduceOnly and (posicion is None or posicion["side"] == side):
+                return _respuesta(ret_code=110017, ret_msg="Reduce-only order has same side with current position")
+
+            precio = self._ejecutar(symbol, side, cantidad)
+            if stopLoss and symbol in self.posiciones:
+                self.posiciones[symbol]["stop_loss"] = float(stopLoss)
+
+            order_id = uuid.uuid4().hex
+            self.ordenes[order_id] = {
+                "orderId": order_id,
+                "symbol": symbol,
+                "side": side,
+                "orderType": orderType,
+                "orderStatus": "Filled",
+                "qty": qty,
+                "cumExecQty": qty,
+                "avgPrice": _formatear(precio, instrumento["decimales"]),
+                "reduceOnly": bool(reduceOnly),
+                "stopOrderType": "",
+                "createdTime": str(int(time.time() * 1000)),
+            }
+            return _respuesta({"orderId": order_id, "orderLinkId": ""})
+        return self._llamada("place_order", funcion)
+
+    def get_order_history(self, category="linear", symbol=None, orderId=None, **kwargs):
+        def funcion():
+            if orderId:
+                lista = [self.ordenes[orderId]] if orderId in self.ordenes else []
+            else:
+                lista = [o for o in self.ordenes.values() if symbol is None or o["symbol"] == symbol][-50:]
+            return _respuesta({"category": category, "list": [dict(o) for o in lista], "nextPageCursor": ""})
+        return self._llamada("get_order_history", funcion)
+
+    def set_trading_stop(self, category="linear", symbol=None, stopLoss=None, **kwargs):
+        def funcion():
+            posicion = self.posiciones.get(symbol)
+            if posicion is None:
+                return _respuesta(ret_code=10001, ret_msg="can not set tp/sl/ts for zero position")
+            if stopLoss is None:
+                return _respuesta()
+            if posicion["stop_loss"] is not None and float(stopLoss) == posicion["stop_loss"]:
+                return _respuesta(ret_code=34040, ret_msg="not modified")
+            error = self._validar_sl(symbol, posicion["side"], stopLoss)
+            if error:
+                return _respuesta(ret_code=10001, ret_msg=error)
+            posicion["stop_loss"] = float(stopLoss)
+            return _respuesta()
+        return self._llamada("set_trading_stop", funcion)
+
+    def get_closed_pnl(self, category="linear", symbol=None, startTime=None, limit=100, cursor="", **kwargs):
+        def funcion():
+            registros = [
+                r for r in reversed(self.pnl_cerrado)
+                if (symbol is None or r["symbol"] == symbol)
+                and (startTime is None or int(r["updatedTime"]) >= int(startTime))
+            ]
+            inicio = int(cursor) if cursor else 0
+            siguiente = str(inicio + limit) if inicio + limit < len(registros) else ""
+            return _respuesta({"category": category, "list": registros[inicio:inicio + limit], "nextPageCursor": siguiente})
+        return self._llamada("get_closed_pnl", funcion)
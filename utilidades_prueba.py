@@ -0,0 +1,29 @@
+"""
+🧰 UTILIDADES DE PRUEBAS Y BENCHMARKS
+Puerto libre para los servidores locales y percentiles para los reportes de latencia
+"""
+
+import socket
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[indice]
+
+
+def percentiles(valores, cuantiles=(50, 90, 99), escala=1000, decimales=1):
+    """'p50 … ms | p90 … ms | p99 … ms | máx … ms' de latencias en segundos (escala=1 si ya están en ms)"""
+    if not valores:
+        return "sin muestras"
+    partes = [f"p{q} {percentil(valores, q) * escala:.{decimales}f} ms" for q in cuantiles]
+    partes.append(f"máx {max(valores) * escala:.{decimales}f} ms")
+    return " | ".join(partes)